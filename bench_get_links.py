@@ -0,0 +1,341 @@
+"""
+Throughput benchmark for get_links.
+
+Generates a synthetic ESTA-like corpus of .json.xz files and times
+get_links.process_files_in_directory over it for every combination of execution
+backend, worker count and scan mode. Each configuration runs in a fresh
+interpreter so peak RSS figures are not polluted by earlier runs.
+
+Usage:
+    python bench_get_links.py                      # generate corpus (if missing) and run
+    python bench_get_links.py --files 64 --size-mb 20 --workers 1 2 4 8
+
+Output:
+    A JSON file (bench_results.json by default) with files/s, decompressed MB/s
+    and peak RSS for every configuration, plus the corpus and machine details.
+"""
+
+import argparse
+import json
+import lzma
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# ─────────── Configuration ─────────── #
+CORPUS_DIR: str = "bench_corpus"
+RESULTS_FILE: str = "bench_results.json"
+DEFAULT_FILES: int = 32
+DEFAULT_SIZE_MB: float = 5.0  # decompressed size per file
+DEFAULT_DEPTH: int = 6  # nesting depth of the per-tick frame objects
+DEFAULT_URL_DEPTHS: List[int] = [0, 4, 12]  # hltvUrl nesting depth, cycled across files
+DEFAULT_WORKERS: List[int] = [1, 2, 4, os.cpu_count() or 1]
+BACKENDS: List[str] = ["thread", "process"]
+MODES: List[str] = ["parse", "streaming"]
+MAPS: List[str] = ["de_ancient", "de_anubis", "de_dust2", "de_inferno", "de_mirage", "de_nuke", "de_vertigo"]
+
+
+def nested_frame(rng: random.Random, depth: int) -> Dict[str, Any]:
+    """
+    Builds one tick-like object nested `depth` levels deep.
+
+    Args:
+        rng (random.Random): Seeded random source.
+        depth (int): Remaining nesting levels.
+
+    Returns:
+        Dict[str, Any]: Frame object with player-style numeric fields.
+    """
+    frame: Dict[str, Any] = {
+        "tick": rng.randint(0, 200_000),
+        "x": round(rng.uniform(-3000, 3000), 3),
+        "y": round(rng.uniform(-3000, 3000), 3),
+        "z": round(rng.uniform(-500, 500), 3),
+        "hp": rng.randint(0, 100),
+        "isAlive": rng.random() > 0.2,
+        "activeWeapon": rng.choice(["AK-47", "M4A1", "AWP", "Desert Eagle", "Knife"]),
+    }
+    if depth > 0:
+        frame["players"] = [nested_frame(rng, depth - 1) for _ in range(2)]
+    return frame
+
+
+def wrap_url(url: str, depth: int) -> Dict[str, Any]:
+    """
+    Places the hltvUrl key `depth` objects deep, e.g. {"meta": {"meta": {"hltvUrl": ...}}}.
+
+    Args:
+        url (str): HLTV match URL.
+        depth (int): Number of wrapping objects.
+
+    Returns:
+        Dict[str, Any]: Wrapped object.
+    """
+    obj: Dict[str, Any] = {"hltvUrl": url}
+    for _ in range(depth):
+        obj = {"meta": obj}
+    return obj
+
+
+def generate_esta_file(path: Path, size_mb: float, depth: int, url_depth: int, seed: int) -> int:
+    """
+    Writes one synthetic .json.xz file, streaming rounds so memory stays small.
+
+    The hltvUrl entry sits after the bulky round data, as in real ESTA files, so
+    a streaming scan has to read most of the document before it finds it.
+
+    Args:
+        path (Path): Output file path.
+        size_mb (float): Approximate decompressed size in MB.
+        depth (int): Nesting depth of each frame.
+        url_depth (int): Nesting depth of the hltvUrl entry.
+        seed (int): Random seed, so corpora are reproducible.
+
+    Returns:
+        int: Decompressed size in bytes.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    match_id = 2_350_000 + seed
+    url = f"https://www.hltv.org/matches/{match_id}/team-{seed}-vs-team-{seed + 1}-synthetic-event"
+
+    written = 0
+    with lzma.open(path, "wt", encoding="utf-8", preset=1) as f:
+        def emit(text: str) -> None:
+            nonlocal written
+            f.write(text)
+            written += len(text.encode("utf-8"))
+
+        emit(json.dumps({"matchID": str(match_id), "mapName": rng.choice(MAPS), "tickRate": 128})[:-1])
+        emit(', "gameRounds": [')
+        round_num = 0
+        while written < target:
+            if round_num:
+                emit(", ")
+            round_data = {
+                "roundNum": round_num + 1,
+                "frames": [nested_frame(rng, depth) for _ in range(8)],
+            }
+            emit(json.dumps(round_data))
+            round_num += 1
+        emit("], ")
+        emit(json.dumps(wrap_url(url, url_depth))[1:])
+
+    return written
+
+
+def generate_corpus(
+    corpus_dir: str, files: int, size_mb: float, depth: int, url_depths: List[int]
+) -> Dict[str, Any]:
+    """
+    Generates the corpus unless one with the same parameters already exists.
+
+    Args:
+        corpus_dir (str): Directory to write files into.
+        files (int): Number of files.
+        size_mb (float): Decompressed size per file in MB.
+        depth (int): Frame nesting depth.
+        url_depths (List[int]): hltvUrl depths, cycled across files.
+
+    Returns:
+        Dict[str, Any]: Corpus description including total decompressed bytes.
+    """
+    directory = Path(corpus_dir)
+    params = {"files": files, "size_mb": size_mb, "depth": depth, "url_depths": url_depths}
+    description_path = directory / "corpus.json"
+
+    if description_path.exists():
+        description = json.loads(description_path.read_text(encoding="utf-8"))
+        if description["params"] == params:
+            print(f"Reusing corpus in {directory}")
+            return description
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for old in directory.glob("*.xz"):
+        old.unlink()
+
+    print(f"Generating {files} file(s) of ~{size_mb} MB in {directory}...")
+    total = 0
+    for i in range(files):
+        total += generate_esta_file(
+            directory / f"synthetic-{i:04d}.json.xz", size_mb, depth, url_depths[i % len(url_depths)], seed=i
+        )
+
+    description = {
+        "params": params,
+        "decompressed_bytes": total,
+        "compressed_bytes": sum(p.stat().st_size for p in directory.glob("*.xz")),
+    }
+    description_path.write_text(json.dumps(description, indent=2), encoding="utf-8")
+    return description
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """
+    Reports peak resident memory of this process and of its largest child.
+
+    Returns:
+        Dict[str, Optional[float]]: Peak RSS in MB, None where the platform cannot tell.
+    """
+    try:
+        import resource
+
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return {
+            "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            "worker": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale or None,
+        }
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+
+        return {"main": psutil.Process().memory_info().peak_wset / (1024 * 1024), "worker": None}
+    except (ImportError, AttributeError):
+        return {"main": None, "worker": None}
+
+
+def round_or_none(value: Optional[float]) -> Optional[float]:
+    """
+    Rounds a measurement to one decimal, passing through missing values.
+    """
+    return None if value is None else round(value, 1)
+
+
+def run_one(corpus_dir: str, backend: str, workers: int, mode: str, result_path: str) -> None:
+    """
+    Times a single configuration. Runs inside a fresh interpreter.
+
+    Args:
+        corpus_dir (str): Corpus directory.
+        backend (str): "thread" or "process".
+        workers (int): Worker count.
+        mode (str): "parse" or "streaming".
+        result_path (str): Where to write the JSON result.
+    """
+    import get_links
+
+    start = time.perf_counter()
+    urls = get_links.process_files_in_directory(
+        corpus_dir, max_workers=workers, streaming=(mode == "streaming"), executor=backend
+    )
+    elapsed = time.perf_counter() - start
+
+    Path(result_path).write_text(
+        json.dumps({"elapsed_s": elapsed, "urls": len(urls), "peak_rss_mb": peak_rss_mb()}),
+        encoding="utf-8",
+    )
+
+
+def run_benchmark(corpus: Dict[str, Any], corpus_dir: str, workers: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Runs every backend × worker count × mode combination in a subprocess.
+
+    Args:
+        corpus (Dict[str, Any]): Corpus description from generate_corpus.
+        corpus_dir (str): Corpus directory.
+        workers (List[int]): Worker counts to try.
+        repeat (int): Runs per configuration; the fastest is reported.
+
+    Returns:
+        List[Dict[str, Any]]: One result per configuration.
+    """
+    files = corpus["params"]["files"]
+    decompressed_mb = corpus["decompressed_bytes"] / (1024 * 1024)
+    results: List[Dict[str, Any]] = []
+
+    for backend in BACKENDS:
+        for worker_count in sorted(set(workers)):
+            for mode in MODES:
+                best: Optional[Dict[str, Any]] = None
+                for _ in range(repeat):
+                    with tempfile.TemporaryDirectory() as tmp:
+                        result_path = os.path.join(tmp, "result.json")
+                        subprocess.run(
+                            [sys.executable, os.path.abspath(__file__), "--run-one",
+                             backend, str(worker_count), mode, result_path, "--corpus", corpus_dir],
+                            check=True,
+                            stdout=subprocess.DEVNULL,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                        )
+                        run = json.loads(Path(result_path).read_text(encoding="utf-8"))
+                    if best is None or run["elapsed_s"] < best["elapsed_s"]:
+                        best = run
+
+                assert best is not None
+                if best["urls"] != files:
+                    print(f"  ! expected {files} URLs, got {best['urls']}")
+                result = {
+                    "backend": backend,
+                    "workers": worker_count,
+                    "mode": mode,
+                    "elapsed_s": round(best["elapsed_s"], 4),
+                    "files_per_s": round(files / best["elapsed_s"], 2),
+                    "decompressed_mb_per_s": round(decompressed_mb / best["elapsed_s"], 2),
+                    "peak_rss_main_mb": round_or_none(best["peak_rss_mb"]["main"]),
+                    "peak_rss_worker_mb": round_or_none(best["peak_rss_mb"]["worker"]),
+                    "urls_found": best["urls"],
+                }
+                results.append(result)
+                print(
+                    f"{backend:>7} × {worker_count:<3} {mode:<9} "
+                    f"{result['files_per_s']:>8} files/s  {result['decompressed_mb_per_s']:>8} MB/s  "
+                    f"peak RSS {result['peak_rss_main_mb']} / {result['peak_rss_worker_mb']} MB"
+                )
+
+    return results
+
+
+def main() -> None:
+    """
+    Parses arguments, generates the corpus and writes the benchmark results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="corpus directory")
+    parser.add_argument("--output", default=RESULTS_FILE, help="JSON results file")
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES)
+    parser.add_argument("--size-mb", type=float, default=DEFAULT_SIZE_MB)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--url-depths", type=int, nargs="+", default=DEFAULT_URL_DEPTHS)
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--run-one", nargs=4, metavar=("BACKEND", "WORKERS", "MODE", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        backend, workers, mode, result_path = args.run_one
+        run_one(args.corpus, backend, int(workers), mode, result_path)
+        return
+
+    corpus = generate_corpus(args.corpus, args.files, args.size_mb, args.depth, args.url_depths)
+    print(
+        f"Corpus: {args.files} file(s), "
+        f"{corpus['decompressed_bytes'] / (1024 * 1024):.1f} MB decompressed, "
+        f"{corpus['compressed_bytes'] / (1024 * 1024):.1f} MB compressed\n"
+    )
+
+    results = run_benchmark(corpus, args.corpus, args.workers, args.repeat)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": corpus,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Shared Chrome WebDriver construction and a pool of warm drivers
+
+Every script used to build Chrome its own way and most launched a new browser
+per URL. This module holds the one place Chrome options are assembled and a
+DriverPool that keeps N browsers already started and past the cookie banner.
+Drivers are handed out with a context manager, recycled after a number of
+uses or an age limit, and replaced in the background when they crash.
+
+Requirements:
+    - selenium
+    - webdriver-manager (unless an explicit chromedriver path is given)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from hltv_http import BASE, USER_AGENT
+
+# ─────────── Configuration ─────────── #
+CHROME_ARGUMENTS: List[str] = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--disable-extensions",
+    "--disable-logging",
+    "--log-level=3",
+    "--window-size=1920,1080",
+    f"--user-agent={USER_AGENT}",
+    "--disable-blink-features=AutomationControlled",
+]
+DOWNLOAD_PREFS: Dict[str, Any] = {
+    "download.prompt_for_download": False,
+    "download.directory_upgrade": True,
+    "safebrowsing.enabled": True,
+}
+# Decline (get_download_*) and allow-all (get_match_urls) buttons of the Cookiebot banner
+COOKIE_BUTTON_IDS: List[str] = [
+    "CybotCookiebotDialogBodyButtonDecline",
+    "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+]
+POOL_SIZE: int = 2
+MAX_USES_PER_DRIVER: int = 50
+MAX_DRIVER_AGE: float = 30 * 60.0  # seconds
+ACQUIRE_TIMEOUT: float = 120.0  # seconds to wait for a free driver
+LAUNCH_ATTEMPTS: int = 4  # tries per driver launch before the slot is given up
+LAUNCH_BACKOFF: float = 2.0  # seconds before the second try, doubling after each failure
+
+_driver_manager_path: Optional[str] = None
+_driver_manager_lock = threading.Lock()
+
+
+def chromedriver_path() -> str:
+    """
+    Resolves chromedriver through webdriver-manager once per process.
+
+    Returns:
+        str: Path to a chromedriver binary matching the installed Chrome.
+    """
+    global _driver_manager_path
+    with _driver_manager_lock:
+        if _driver_manager_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            _driver_manager_path = ChromeDriverManager().install()
+        return _driver_manager_path
+
+
+def build_options(
+    headless: bool = False,
+    download_path: Optional[str] = None,
+    extra_prefs: Optional[Dict[str, Any]] = None,
+) -> Options:
+    """
+    Assembles the Chrome options shared by all scrapers.
+
+    Args:
+        headless (bool): Run without a window.
+        download_path (Optional[str]): Directory downloads should be saved to.
+        extra_prefs (Optional[Dict[str, Any]]): Additional Chrome preferences.
+
+    Returns:
+        Options: Configured Chrome options.
+    """
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+
+    prefs: Dict[str, Any] = {}
+    if download_path:
+        prefs.update(DOWNLOAD_PREFS)
+        prefs["download.default_directory"] = download_path
+    if extra_prefs:
+        prefs.update(extra_prefs)
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def create_driver(
+    headless: bool = False,
+    download_path: Optional[str] = None,
+    driver_path: Optional[str] = None,
+    extra_prefs: Optional[Dict[str, Any]] = None,
+    implicit_wait: float = 10,
+) -> webdriver.Chrome:
+    """
+    Launches a Chrome WebDriver with the shared options.
+
+    Args:
+        headless (bool): Run without a window.
+        download_path (Optional[str]): Directory downloads should be saved to.
+        driver_path (Optional[str]): Explicit chromedriver; resolved via webdriver-manager if None.
+        extra_prefs (Optional[Dict[str, Any]]): Additional Chrome preferences.
+        implicit_wait (float): Implicit element wait in seconds.
+
+    Returns:
+        webdriver.Chrome: A started driver.
+    """
+    options = build_options(headless, download_path, extra_prefs)
+    service = Service(executable_path=driver_path or chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.implicitly_wait(implicit_wait)
+    # Hide the webdriver flag from page scripts
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument",
+        {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"},
+    )
+    return driver
+
+
+def accept_cookies(driver: webdriver.Chrome, timeout: float = 5) -> bool:
+    """
+    Dismisses the Cookiebot banner if it is shown.
+
+    Args:
+        driver (webdriver.Chrome): Driver on an HLTV page.
+        timeout (float): Maximum time to wait for the banner.
+
+    Returns:
+        bool: True if a button was clicked.
+    """
+    selector = ", ".join(f"#{button_id}" for button_id in COOKIE_BUTTON_IDS)
+    try:
+        button = WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+        )
+        button.click()
+        WebDriverWait(driver, timeout).until(EC.invisibility_of_element(button))
+        return True
+    except Exception:
+        return False
+
+
+def is_healthy(driver: webdriver.Chrome) -> bool:
+    """
+    Checks that a driver still has a live browser behind it.
+
+    Args:
+        driver (webdriver.Chrome): Driver to check.
+
+    Returns:
+        bool: True if a trivial script round-trips successfully.
+    """
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+class PooledDriver:
+    """
+    A driver plus the bookkeeping the pool needs to decide when to recycle it.
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def expired(self, max_uses: int, max_age: float) -> bool:
+        """
+        True once the driver has served max_uses checkouts or lived max_age seconds.
+        """
+        return self.uses >= max_uses or time.monotonic() - self.created_at >= max_age
+
+    def quit(self) -> None:
+        """
+        Closes the browser, ignoring errors from an already dead one.
+        """
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """
+    Keeps `size` warm, pre-consented Chrome drivers ready for use.
+
+    Usage:
+        with DriverPool(size=2, headless=True) as pool:
+            with pool.driver() as driver:
+                driver.get(url)
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        headless: bool = False,
+        download_path: Optional[str] = None,
+        driver_path: Optional[str] = None,
+        extra_prefs: Optional[Dict[str, Any]] = None,
+        max_uses: int = MAX_USES_PER_DRIVER,
+        max_age: float = MAX_DRIVER_AGE,
+        warmup_url: Optional[str] = BASE,
+    ):
+        """
+        Args:
+            size (int): Number of drivers kept alive.
+            headless (bool): Run browsers without a window.
+            download_path (Optional[str]): Download directory for every driver.
+            driver_path (Optional[str]): Explicit chromedriver path.
+            extra_prefs (Optional[Dict[str, Any]]): Additional Chrome preferences.
+            max_uses (int): Checkouts before a driver is recycled.
+            max_age (float): Seconds before a driver is recycled.
+            warmup_url (Optional[str]): Page loaded (and cookies accepted) on launch.
+        """
+        self.size = size
+        self.headless = headless
+        self.download_path = download_path
+        self.driver_path = driver_path
+        self.extra_prefs = extra_prefs
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.warmup_url = warmup_url
+
+        self._idle: "queue.Queue[Optional[PooledDriver]]" = queue.Queue()
+        self._launcher = ThreadPoolExecutor(max_workers=size, thread_name_prefix="driver-pool")
+        self._closed = False
+        self._all: List[PooledDriver] = []
+        self._pending = 0  # launches submitted but not finished
+        self._lock = threading.Lock()
+
+        with self._lock:
+            for _ in range(size):
+                self._schedule_launch()
+
+    def _schedule_launch(self) -> None:
+        """
+        Submits a background launch. Must be called with the lock held, so close() cannot
+        shut the launcher down in between.
+        """
+        if self._closed:
+            return
+        self._pending += 1
+        self._launcher.submit(self._launch)
+
+    def _exhausted(self) -> bool:
+        """
+        True if no driver is alive and none is being launched. Must be called with the lock held.
+        """
+        return not self._all and not self._pending
+
+    def _launch(self) -> None:
+        """
+        Starts one browser, warms it up and makes it available. Runs in the background.
+
+        Failed launches are retried with exponential backoff. If every try fails the
+        slot is given up; once no slot is left, waiting checkouts fail immediately.
+        """
+        driver = None
+        for attempt in range(LAUNCH_ATTEMPTS):
+            try:
+                driver = create_driver(self.headless, self.download_path, self.driver_path, self.extra_prefs)
+                break
+            except Exception as e:
+                print(f"Driver launch failed (attempt {attempt + 1}/{LAUNCH_ATTEMPTS}): {e}")
+                if attempt + 1 < LAUNCH_ATTEMPTS and not self._closed:
+                    time.sleep(LAUNCH_BACKOFF * 2 ** attempt)
+
+        if driver is None:
+            with self._lock:
+                self._pending -= 1
+                exhausted = self._exhausted()
+            if exhausted:
+                print("Every browser launch failed; the pool has no drivers left")
+                # Wakes waiting checkouts, which pass it on to each other
+                self._idle.put(None)
+            return
+
+        pooled = PooledDriver(driver)
+        if self.warmup_url:
+            try:
+                driver.get(self.warmup_url)
+                accept_cookies(driver)
+            except Exception as e:
+                print(f"Driver warm-up failed: {e}")
+
+        with self._lock:
+            self._pending -= 1
+            if self._closed:
+                pooled.quit()
+                return
+            self._all.append(pooled)
+        self._idle.put(pooled)
+
+    def _retire(self, pooled: PooledDriver) -> None:
+        """
+        Quits a driver and launches its replacement in the background.
+        """
+        with self._lock:
+            if pooled in self._all:
+                self._all.remove(pooled)
+            self._schedule_launch()
+        pooled.quit()
+
+    @contextmanager
+    def driver(self, timeout: float = ACQUIRE_TIMEOUT) -> Iterator[webdriver.Chrome]:
+        """
+        Checks a warm driver out of the pool for the duration of a with-block.
+
+        A driver that raised a WebDriverException, fails its health check, or has
+        reached its use/age limit is replaced instead of being returned.
+
+        Args:
+            timeout (float): Seconds to wait for a free driver.
+
+        Yields:
+            webdriver.Chrome: The checked-out driver.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DriverPool is closed")
+            if self._exhausted():
+                raise RuntimeError("No browser could be launched")
+        try:
+            pooled = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No browser became available within {timeout} seconds")
+        if pooled is None:
+            self._idle.put(None)
+            raise RuntimeError("No browser could be launched")
+
+        pooled.uses += 1
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            if broken or self._closed or pooled.expired(self.max_uses, self.max_age) or not is_healthy(pooled.driver):
+                self._retire(pooled)
+            else:
+                self._idle.put(pooled)
+
+    def close(self) -> None:
+        """
+        Quits every browser and stops launching new ones.
+        """
+        with self._lock:
+            self._closed = True
+            drivers = list(self._all)
+            self._all.clear()
+        self._launcher.shutdown(wait=True)
+        for pooled in drivers:
+            pooled.quit()
+        # Drivers that finished launching during shutdown
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if pooled is not None:
+                pooled.quit()
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,779 @@
+"""
+Direct HTTP download of HLTV demo archives
+
+/download/demo/<id> answers with a redirect to the archive on HLTV's file
+host, so a browser is not needed to fetch it. This module streams demos over
+the shared keep-alive session (see hltv_http), several at once, names each
+file from Content-Disposition and enforces a per-file time limit. Transfers
+go to resumable .part files that are only renamed once complete; large files
+on servers that accept ranges are fetched over several connections at once
+(segmented). Callers pass
+a fallback (typically a pooled Selenium download) for demos HLTV refuses to
+serve to a plain HTTP client. Jobs are started most urgent first by a
+DownloadScheduler, and every byte received can be drawn from one shared
+bandwidth bucket. With a DiskBudget, each job reserves its size before the
+transfer starts and jobs that do not fit are deferred or rejected (status
+"rejected") without writing a byte.
+
+Requirements:
+    - requests
+"""
+
+import errno
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import requests
+
+import demo_index
+import disk_budget
+import download_scheduler
+import hltv_http
+from rate_limit import HostRateLimiter, TokenBucket
+
+# ─────────── Configuration ─────────── #
+DOWNLOAD_WORKERS: int = download_scheduler.SCHEDULER_WORKERS  # demos transferred at the same time
+CONNECT_TIMEOUT: float = 15.0  # seconds to establish a connection
+READ_TIMEOUT: float = 60.0  # seconds without receiving a single byte
+FILE_TIMEOUT: float = 30 * 60.0  # seconds for a whole transfer
+CHUNK_SIZE: int = 1024 * 1024  # bytes written per read
+PART_SUFFIX: str = ".part"
+PROGRESS_SUFFIX: str = ".part.json"
+PROGRESS_EVERY: int = 8 * 1024 * 1024  # bytes between progress record updates
+RESUME_ATTEMPTS: int = 3  # resumes within one run after a dropped connection
+SEGMENTS: int = 4  # parallel range requests per large file (1 disables segmented downloads)
+SEGMENT_THRESHOLD: int = 64 * 1024 * 1024  # files smaller than this use a single connection
+PROGRESS_INTERVAL: float = 2.0  # seconds between progress record updates of segmented downloads
+PEAK_WINDOW: float = 1.0  # seconds over which peak throughput is measured
+
+FILENAME_STAR_PATTERN = re.compile(r"filename\*\s*=\s*([^']*)'[^']*'([^;]+)", re.IGNORECASE)
+FILENAME_PATTERN = re.compile(r'filename\s*=\s*"?([^";]+)"?', re.IGNORECASE)
+UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+CONTENT_RANGE_PATTERN = re.compile(r"bytes\s+(\d+)-\d+/(\d+|\*)")
+
+
+class DownloadResult:
+    """
+    Outcome of one demo download.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.path: Optional[str] = None
+        self.bytes: int = 0  # transferred in this run
+        self.resumed_from: int = 0  # bytes already on disk from an earlier attempt
+        self.elapsed: float = 0.0
+        self.status: str = "pending"  # "ok", "fallback", "failed", "rejected" (no disk space)
+        self.error: Optional[str] = None
+        self.queue_wait: Optional[float] = None  # seconds the job waited for a worker
+        self.ttfb: Optional[float] = None  # seconds from the first request to the first body byte
+        self.retries: int = 0  # attempts after the first one (resumes and restarts)
+        self.pacing_wait: float = 0.0  # seconds spent waiting for the HLTV rate limiter
+        self.peak_throughput: float = 0.0  # bytes/s over the best PEAK_WINDOW
+        self._requested_at: Optional[float] = None
+        self._window_start = 0.0
+        self._window_bytes = 0
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if the demo ended up on disk, directly or through the fallback.
+        """
+        return self.status in ("ok", "fallback")
+
+    @property
+    def throughput(self) -> float:
+        """
+        Average bytes per second over the whole download.
+        """
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def requesting(self) -> None:
+        """
+        Marks the first request going out (the start of time to first byte).
+        """
+        if self._requested_at is None:
+            self._requested_at = time.monotonic()
+
+    def received(self, count: int) -> None:
+        """
+        Counts body bytes, tracking time to first byte and peak throughput.
+
+        Segmented downloads call this with their lock held.
+        """
+        now = time.monotonic()
+        self.bytes += count
+        if self.ttfb is None:
+            # Windows start after the first chunk, whose arrival took the whole TTFB
+            self.ttfb = now - (self._requested_at or now)
+            self._window_start, self._window_bytes = now, self.bytes
+        elif now - self._window_start >= PEAK_WINDOW:
+            rate = (self.bytes - self._window_bytes) / (now - self._window_start)
+            self.peak_throughput = max(self.peak_throughput, rate)
+            self._window_start, self._window_bytes = now, self.bytes
+
+    def finish(self, elapsed: float) -> None:
+        """
+        Records the total duration. Transfers shorter than PEAK_WINDOW get their only
+        (partial) window as peak; the peak is never below the average.
+        """
+        self.elapsed = elapsed
+        window = time.monotonic() - self._window_start
+        if not self.peak_throughput and self.ttfb is not None and window > 0:
+            self.peak_throughput = (self.bytes - self._window_bytes) / window
+        self.peak_throughput = max(self.peak_throughput, self.throughput)
+
+    def __repr__(self) -> str:
+        return f"DownloadResult({self.url!r}, status={self.status!r}, path={self.path!r}, bytes={self.bytes})"
+
+
+def safe_filename(name: str) -> str:
+    """
+    Strips directory parts and characters that are not allowed in filenames.
+
+    Args:
+        name (str): Proposed filename.
+
+    Returns:
+        str: A filename safe to join onto the download directory.
+    """
+    name = UNSAFE_FILENAME_CHARS.sub("_", os.path.basename(name.replace("\\", "/"))).strip(" .")
+    return name or "demo"
+
+
+def filename_from_response(response: requests.Response, url: str) -> str:
+    """
+    Picks the filename for a download.
+
+    Uses Content-Disposition (RFC 5987 filename* first), then the last path
+    segment of the final URL after redirects, then demo_<id>.
+
+    Args:
+        response (requests.Response): Response of the download request.
+        url (str): The requested /download/demo/<id> URL.
+
+    Returns:
+        str: A safe filename.
+    """
+    disposition = response.headers.get("Content-Disposition", "")
+    match = FILENAME_STAR_PATTERN.search(disposition)
+    if match:
+        return safe_filename(unquote(match.group(2).strip(), encoding=match.group(1) or "utf-8"))
+    match = FILENAME_PATTERN.search(disposition)
+    if match:
+        return safe_filename(match.group(1).strip())
+
+    name = unquote(os.path.basename(urlparse(response.url).path))
+    if name and "." in name:
+        return safe_filename(name)
+
+    demo_id = demo_index.parse_demo_id(url)
+    return f"demo_{demo_id}.dem" if demo_id is not None else f"demo_{int(time.time())}.dem"
+
+
+def check_response(response: requests.Response, url: str, rate_limiter: Optional[HostRateLimiter]) -> None:
+    """
+    Rejects responses that are not a demo archive.
+
+    HLTV answers with an HTML page (challenge or error) instead of a redirect to
+    the archive when it does not want to serve a plain HTTP client.
+
+    Args:
+        response (requests.Response): Streamed response; only the start is read for HTML answers.
+        url (str): Requested URL.
+        rate_limiter (Optional[HostRateLimiter]): Told whether HLTV throttled the request.
+
+    Raises:
+        hltv_http.ChallengeError: If HLTV served a bot challenge or an HTML page.
+        hltv_http.ThrottledError: On a 429.
+        requests.HTTPError: On other HTTP errors.
+    """
+    is_html = "text/html" in response.headers.get("Content-Type", "")
+    head = response.raw.read(20000, decode_content=True).decode("utf-8", errors="replace") if is_html else ""
+    if hltv_http.report_response(rate_limiter, url, response.status_code, response.headers, head):
+        if response.status_code == 429 and not hltv_http.looks_like_challenge(response.status_code, head):
+            raise hltv_http.ThrottledError(url)
+        raise hltv_http.ChallengeError(url, response.status_code)
+    response.raise_for_status()
+    if is_html:
+        raise hltv_http.ChallengeError(url, response.status_code)
+
+
+def part_paths(url: str, download_path: str) -> Tuple[str, str]:
+    """
+    Paths of the partial file and its progress record for a download.
+
+    They are keyed by demo ID, because the final filename is only known once the
+    server has answered.
+
+    Args:
+        url (str): Demo download URL.
+        download_path (str): Target directory.
+
+    Returns:
+        Tuple[str, str]: (.part file, .part.json progress record).
+    """
+    demo_id = demo_index.parse_demo_id(url)
+    key = f"demo_{demo_id}" if demo_id is not None else hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    base = os.path.join(download_path, key)
+    return base + PART_SUFFIX, base + PROGRESS_SUFFIX
+
+
+def load_progress(progress_path: str) -> Dict[str, Any]:
+    """
+    Reads a progress record, returning an empty one if it is missing or unreadable.
+    """
+    try:
+        with open(progress_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_progress(progress_path: str, progress: Dict[str, Any]) -> None:
+    """
+    Writes a progress record atomically.
+    """
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def discard_partial(part_path: str, progress_path: str) -> None:
+    """
+    Removes a partial download and its progress record.
+    """
+    for path in (part_path, progress_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parses a "bytes <start>-<end>/<total>" header.
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: (start, total); None for parts that are missing or "*".
+    """
+    match = CONTENT_RANGE_PATTERN.match(value or "")
+    if not match:
+        return None, None
+    total = match.group(2)
+    return int(match.group(1)), int(total) if total != "*" else None
+
+
+def if_range_validator(progress: Dict[str, Any]) -> Optional[str]:
+    """
+    Picks the If-Range validator: a strong ETag, else Last-Modified.
+    """
+    etag = progress.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return progress.get("last_modified")
+
+
+class RestartDownload(Exception):
+    """
+    The partial file cannot be resumed and the transfer must start from zero.
+    """
+
+
+class IncompleteTransfer(IOError):
+    """
+    The connection ended before all bytes arrived; the .part file can be resumed.
+    """
+
+
+def plan_segments(total: int, segments: int) -> List[List[int]]:
+    """
+    Splits a file into contiguous byte ranges.
+
+    Args:
+        total (int): File size in bytes.
+        segments (int): Number of ranges.
+
+    Returns:
+        List[List[int]]: [start, end (inclusive), bytes done] per range.
+    """
+    size = -(-total // segments)
+    return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+
+def segmentable(response: requests.Response, total: Optional[int], segments: int) -> bool:
+    """
+    True if a fresh download should be split into parallel range requests.
+    """
+    return (
+        segments > 1
+        and response.status_code == 200
+        and total is not None
+        and total >= SEGMENT_THRESHOLD
+        and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    )
+
+
+def resolve_source(url: str, progress: Dict[str, Any], rate_limiter: Optional[HostRateLimiter], timeout: Tuple[float, float]) -> str:
+    """
+    Follows the demo URL's redirect again before resuming a segmented download.
+
+    File host URLs may be short-lived, so they are not reused across runs.
+
+    Raises:
+        RestartDownload: If the file behind the URL is no longer the one being resumed.
+    """
+    if rate_limiter is not None:
+        rate_limiter.acquire(url)
+    response = hltv_http.get_session().head(url, allow_redirects=True, timeout=timeout)
+    check_response(response, url, rate_limiter)
+    length = response.headers.get("Content-Length")
+    etag = response.headers.get("ETag")
+    if length is None or int(length) != progress["total"] or (etag and progress.get("etag") and etag != progress["etag"]):
+        raise RestartDownload("The demo changed since the partial download")
+    return response.url
+
+
+def expected_size(url: str, download_path: str) -> Optional[int]:
+    """
+    Size of a demo as far as it is known before any request: the total of a partial download.
+    """
+    part_path, progress_path = part_paths(url, download_path)
+    if os.path.exists(part_path):
+        return load_progress(progress_path).get("total")
+    return None
+
+
+def probe_size(
+    url: str,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+) -> Optional[int]:
+    """
+    Learns a demo's size with a HEAD request that follows the redirect to the file host.
+
+    Returns:
+        Optional[int]: Content-Length, or None if the server did not tell (or refused).
+    """
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire(url)
+        response = hltv_http.get_session().head(url, allow_redirects=True, timeout=timeout)
+        check_response(response, url, rate_limiter)
+        length = response.headers.get("Content-Length")
+        return int(length) if length is not None and response.headers.get("Content-Encoding") is None else None
+    except Exception:
+        return None
+
+
+def transfer_segments(
+    progress: Dict[str, Any],
+    part_path: str,
+    progress_path: str,
+    result: DownloadResult,
+    deadline: float,
+    timeout: Tuple[float, float],
+    bandwidth: Optional[TokenBucket] = None,
+) -> None:
+    """
+    Fetches the unfinished byte ranges of a segmented download in parallel.
+
+    Every range writes straight into its place in the preallocated .part file;
+    the progress record keeps how far each range got, so an interrupted
+    download resumes every range where it stopped.
+
+    Raises:
+        RestartDownload: If the server stops honouring the ranges or the file changed.
+        IncompleteTransfer: If any range could not be completed.
+    """
+    total = progress["total"]
+    segments = progress["segments"]
+    lock = threading.Lock()
+    last_saved = [time.monotonic()]
+
+    # Preallocate, so every range can write at its own offset
+    with open(part_path, "r+b" if os.path.exists(part_path) else "wb") as f:
+        f.truncate(total)
+
+    def checkpoint(force: bool = False) -> None:
+        with lock:
+            if force or time.monotonic() - last_saved[0] >= PROGRESS_INTERVAL:
+                save_progress(progress_path, progress)
+                last_saved[0] = time.monotonic()
+
+    def fetch(segment: List[int]) -> None:
+        start, end, _ = segment
+        position = start + segment[2]
+        if position > end:
+            return
+        headers = {"Range": f"bytes={position}-{end}"}
+        validator = if_range_validator(progress)
+        if validator:
+            headers["If-Range"] = validator
+
+        with hltv_http.get_session().get(progress["source_url"], headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code != 206:
+                raise RestartDownload(f"Range request answered HTTP {response.status_code}")
+            got_start, got_total = parse_content_range(response.headers.get("Content-Range"))
+            if got_start != position or got_total != total:
+                raise RestartDownload(f"Server sent range {got_start}/{got_total}, expected {position}/{total}")
+
+            # Unbuffered, so the progress record never runs ahead of the bytes on disk
+            with open(part_path, "r+b", buffering=0) as f:
+                f.seek(position)
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    chunk = chunk[:end + 1 - position]
+                    f.write(chunk)
+                    position += len(chunk)
+                    with lock:
+                        segment[2] += len(chunk)
+                        result.received(len(chunk))
+                    checkpoint()
+                    if bandwidth is not None:
+                        bandwidth.acquire(len(chunk))
+                    if position > end:
+                        break
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Transfer exceeded its time limit")
+        if position <= end:
+            raise IncompleteTransfer(f"Range {start}-{end} stopped at {position}")
+
+    errors: List[Exception] = []
+    with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="demo-segment") as executor:
+        for future in [executor.submit(fetch, segment) for segment in segments]:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+    checkpoint(force=True)
+
+    for error in errors:
+        if isinstance(error, RestartDownload):
+            raise error
+    if errors:
+        raise errors[0]
+    done = sum(segment[2] for segment in segments)
+    if done != total:
+        raise IncompleteTransfer(f"{done} of {total} bytes received")
+
+
+def transfer(
+    url: str,
+    download_path: str,
+    result: DownloadResult,
+    rate_limiter: Optional[HostRateLimiter],
+    deadline: float,
+    timeout: Tuple[float, float],
+    segments: int = SEGMENTS,
+    bandwidth: Optional[TokenBucket] = None,
+    reservation: Optional[disk_budget.Reservation] = None,
+) -> str:
+    """
+    One attempt at a download, resuming the .part file if there is one.
+
+    Args:
+        url (str): Demo download URL.
+        download_path (str): Target directory.
+        result (DownloadResult): Updated with the bytes transferred.
+        rate_limiter (Optional[HostRateLimiter]): Paces the request and receives feedback.
+        deadline (float): time.monotonic() value the transfer must finish by.
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds.
+        segments (int): Parallel ranges for large files (1 = single connection).
+        bandwidth (Optional[TokenBucket]): Shared byte budget, drawn from for every chunk received.
+        reservation (Optional[disk_budget.Reservation]): Resized to Content-Length (or the budget's
+            default size if the response has none) before the body is read.
+
+    Returns:
+        str: Path of the completed file.
+
+    Raises:
+        RestartDownload: If the server no longer matches the partial file.
+        IncompleteTransfer: If the connection ended early.
+        disk_budget.InsufficientSpace: If the file does not fit; nothing has been written.
+    """
+    part_path, progress_path = part_paths(url, download_path)
+    progress = load_progress(progress_path) if os.path.exists(part_path) else {}
+
+    if progress.get("segments"):
+        progress["source_url"] = resolve_source(url, progress, rate_limiter, timeout)
+        result.requesting()
+        result.resumed_from = sum(segment[2] for segment in progress["segments"])
+        transfer_segments(progress, part_path, progress_path, result, deadline, timeout, bandwidth)
+        return complete(download_path, part_path, progress_path, progress)
+
+    offset = os.path.getsize(part_path) if progress else 0
+
+    headers: Dict[str, str] = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        validator = if_range_validator(progress)
+        if validator:
+            headers["If-Range"] = validator
+
+    if rate_limiter is not None:
+        result.pacing_wait += rate_limiter.acquire(url)
+    result.requesting()
+    with hltv_http.get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416:
+            raise RestartDownload("Server rejected the resume range")
+        check_response(response, url, rate_limiter)
+
+        if response.status_code == 206:
+            start, total = parse_content_range(response.headers.get("Content-Range"))
+            if start != offset or (progress.get("total") is not None and total != progress["total"]):
+                raise RestartDownload(f"Server sent range {start}/{total}, expected {offset}/{progress.get('total')}")
+            result.resumed_from = offset
+            mode = "ab"
+        else:
+            # Fresh transfer, or the file changed since the partial download (If-Range failed)
+            length = response.headers.get("Content-Length")
+            progress = {
+                "url": url,
+                "filename": filename_from_response(response, url),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "total": int(length) if length is not None and response.headers.get("Content-Encoding") is None else None,
+            }
+            offset = 0
+            mode = "wb"
+            if reservation is not None:
+                # Without Content-Length (chunked) the estimate has to cover the whole file
+                if progress["total"] is not None:
+                    reservation.resize(progress["total"])
+                else:
+                    reservation.resize(max(reservation.size, reservation.budget.default_size))
+
+            if segmentable(response, progress["total"], segments):
+                # Hand over to parallel range requests on the file host, nothing has been read yet
+                progress["source_url"] = response.url
+                progress["segments"] = plan_segments(progress["total"], segments)
+                save_progress(progress_path, progress)
+                response.close()
+                transfer_segments(progress, part_path, progress_path, result, deadline, timeout, bandwidth)
+                return complete(download_path, part_path, progress_path, progress)
+        save_progress(progress_path, progress)
+
+        received = offset
+        next_checkpoint = received + PROGRESS_EVERY
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                received += len(chunk)
+                result.received(len(chunk))
+                if received >= next_checkpoint:
+                    f.flush()
+                    save_progress(progress_path, dict(progress, received=received))
+                    next_checkpoint = received + PROGRESS_EVERY
+                if bandwidth is not None:
+                    bandwidth.acquire(len(chunk))
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Transfer exceeded its time limit")
+
+    size = os.path.getsize(part_path)
+    total = progress.get("total")
+    if total is not None and size < total:
+        save_progress(progress_path, dict(progress, received=size))
+        raise IncompleteTransfer(f"{size} of {total} bytes received")
+    return complete(download_path, part_path, progress_path, progress)
+
+
+def complete(download_path: str, part_path: str, progress_path: str, progress: Dict[str, Any]) -> str:
+    """
+    Verifies the finished .part file against the expected size and renames it into place.
+
+    Returns:
+        str: Path of the completed file.
+
+    Raises:
+        RestartDownload: If the file does not have the expected size.
+    """
+    size = os.path.getsize(part_path)
+    total = progress.get("total")
+    if total is not None and size != total:
+        raise RestartDownload(f"Downloaded file has {size} bytes, expected {total}")
+
+    file_path = os.path.join(download_path, progress["filename"])
+    os.replace(part_path, file_path)
+    discard_partial(part_path, progress_path)
+    return file_path
+
+
+def download_demo(
+    url: str,
+    download_path: str,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    file_timeout: float = FILE_TIMEOUT,
+    timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+    segments: int = SEGMENTS,
+    bandwidth: Optional[TokenBucket] = None,
+    reservation: Optional[disk_budget.Reservation] = None,
+) -> DownloadResult:
+    """
+    Streams one demo archive into download_path over the shared session.
+
+    Bytes go to a .part file with a JSON progress record next to it. Dropped
+    connections are resumed with a Range request guarded by If-Range (so a
+    changed file restarts instead of being spliced), the result is checked
+    against Content-Length/Content-Range, and only then renamed to its final
+    name. A .part file left by an earlier run is picked up the same way.
+    Files of at least SEGMENT_THRESHOLD bytes from a server that advertises
+    Accept-Ranges are fetched as `segments` parallel ranges.
+
+    Args:
+        url (str): Demo download URL (/download/demo/<id>).
+        download_path (str): Target directory.
+        rate_limiter (Optional[HostRateLimiter]): Paces request starts and receives throttling feedback.
+        file_timeout (float): Seconds the whole transfer may take.
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds.
+        segments (int): Parallel ranges for large files (1 = single connection).
+        bandwidth (Optional[TokenBucket]): Shared byte budget for all concurrent transfers.
+        reservation (Optional[disk_budget.Reservation]): Disk space held for the demo; grown to
+            its Content-Length before the body is read, deferring while that does not fit.
+
+    Returns:
+        DownloadResult: status "ok" with path and size, "rejected" if it does not fit on
+            disk, or "failed" with the error.
+    """
+    result = DownloadResult(url)
+    start = time.monotonic()
+    deadline = start + file_timeout
+    part_path, progress_path = part_paths(url, download_path)
+
+    attempt = 0
+    while attempt <= RESUME_ATTEMPTS:
+        attempt += 1
+        try:
+            result.path = transfer(url, download_path, result, rate_limiter, deadline, timeout, segments, bandwidth, reservation)
+            result.status = "ok"
+            result.error = None
+            break
+        except disk_budget.InsufficientSpace as e:
+            result.error = f"{type(e).__name__}: {e}"
+            if not (e.deferrable and reservation is not None):
+                result.status = "rejected"
+                break
+            # Nothing was written; wait for room without using up an attempt or the time limit
+            print(f"Deferring {url}: {e}")
+            try:
+                reservation.resize(reservation.size + e.needed, wait=True)
+            except disk_budget.InsufficientSpace as e:
+                result.error = f"{type(e).__name__}: {e}"
+                result.status = "rejected"
+                break
+            attempt -= 1
+            deadline = time.monotonic() + file_timeout
+        except RestartDownload as e:
+            print(f"Restarting {url}: {e}")
+            discard_partial(part_path, progress_path)
+            result.error = f"{type(e).__name__}: {e}"
+        except (IncompleteTransfer, requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            # Keep the .part file, the next attempt (or run) resumes it
+            result.error = f"{type(e).__name__}: {e}"
+            if time.monotonic() > deadline:
+                break
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+                # Disk filled up behind the budget's back; keep the .part file for a later resume
+                result.status = "rejected"
+            break
+
+    if result.status not in ("ok", "rejected"):
+        result.status = "failed"
+    result.retries = attempt - 1
+    result.finish(time.monotonic() - start)
+    return result
+
+
+def download_demos(
+    urls: Iterable[str],
+    download_path: str,
+    workers: int = DOWNLOAD_WORKERS,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    fallback: Optional[Callable[[str], Optional[str]]] = None,
+    file_timeout: float = FILE_TIMEOUT,
+    priorities: Optional[Dict[int, float]] = None,
+    order: str = download_scheduler.PRIORITY_ORDER,
+    bandwidth: Optional[TokenBucket] = None,
+    budget: Optional[disk_budget.DiskBudget] = None,
+) -> Iterator[DownloadResult]:
+    """
+    Downloads many demos concurrently, most urgent first, yielding results as transfers finish.
+
+    Args:
+        urls (Iterable[str]): Demo download URLs.
+        download_path (str): Target directory.
+        workers (int): Maximum concurrent transfers.
+        rate_limiter (Optional[HostRateLimiter]): Shared pacing for request starts.
+        fallback (Optional[Callable[[str], Optional[str]]]): Called with the URL when the direct
+            download fails (e.g. a bot challenge); returns the downloaded file's path, or None.
+        file_timeout (float): Seconds each transfer may take.
+        priorities (Optional[Dict[int, float]]): Explicit priority per demo ID; higher starts first.
+        order (str): Tie-break within a priority, "newest" or "file" (see download_scheduler).
+        bandwidth (Optional[TokenBucket]): Byte budget shared by all transfers (see
+            download_scheduler.bandwidth_limiter); unlimited if None.
+        budget (Optional[disk_budget.DiskBudget]): Space each job must reserve before it starts;
+            jobs that cannot fit come back with status "rejected".
+
+    Yields:
+        DownloadResult: One per URL, in completion order.
+    """
+    os.makedirs(download_path, exist_ok=True)
+    fallback_lock = threading.Lock()
+
+    def run(job: download_scheduler.DownloadJob) -> DownloadResult:
+        url = job.url
+        reservation = None
+        if budget is not None:
+            # The real size replaces this once the response headers arrive
+            try:
+                reservation = budget.reserve(expected_size(url, download_path) or 0, url)
+            except disk_budget.InsufficientSpace as e:
+                result = DownloadResult(url)
+                result.status = "rejected"
+                result.error = f"{type(e).__name__}: {e}"
+                return result
+
+        try:
+            result = download_demo(url, download_path, rate_limiter, file_timeout, bandwidth=bandwidth, reservation=reservation)
+            if result.status == "failed" and fallback is not None:
+                if reservation is not None and reservation.size == 0:
+                    # The browser does not tell the size up front
+                    try:
+                        reservation.resize(budget.default_size, wait=True)
+                    except disk_budget.InsufficientSpace as e:
+                        result.status = "rejected"
+                        result.error = f"{type(e).__name__}: {e}"
+                        return result
+                print(f"Direct download failed for {url} ({result.error}), falling back to Selenium")
+                # The fallback drives a browser; one at a time is all it can take
+                fallback_start = time.monotonic()
+                with fallback_lock:
+                    path = fallback(url)
+                    if path:
+                        result.status = "fallback"
+                        result.path = path
+                result.elapsed += time.monotonic() - fallback_start
+            return result
+        finally:
+            if reservation is not None:
+                reservation.release()
+
+    with download_scheduler.DownloadScheduler(run, workers, priorities, order) as scheduler:
+        for url in urls:
+            scheduler.submit(url)
+        for job, result in scheduler.results():
+            if result is None:
+                result = DownloadResult(job.url)
+                result.status = "failed"
+                result.error = job.error
+            result.queue_wait = job.queue_wait
+            yield result
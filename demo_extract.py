@@ -0,0 +1,362 @@
+"""
+Pipelined extraction of downloaded demo archives
+
+HLTV ships demos as .rar (older events .zip, .7z or .gz) archives. The
+ExtractionPool unpacks each archive in a worker process as soon as it is
+submitted, so CPU-bound decompression overlaps with the downloads still in
+flight. The .dem files of an archive go to their own per-match directory
+next to it, and the archive can be deleted once extraction succeeded. With a
+DiskBudget, every extraction first reserves an estimate of its output, so
+concurrent downloads are admitted against the space the demos will take.
+
+.zip, .gz and .tar.* use the standard library. .rar and .7z use rarfile /
+py7zr when installed, otherwise (or when the module cannot handle the archive,
+e.g. rarfile without an unrar backend) the first of 7z, unrar or bsdtar
+(tar.exe on Windows 10+) found on PATH.
+
+Requirements:
+    - rarfile, py7zr (optional)
+"""
+
+import gzip
+import os
+import shutil
+import subprocess
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import disk_budget
+
+# ─────────── Configuration ─────────── #
+ARCHIVE_SUFFIXES = (".rar", ".zip", ".7z", ".gz", ".tgz")
+DEMO_SUFFIX: str = ".dem"
+EXTRACT_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+DELETE_ARCHIVES: bool = False  # remove an archive once its demos were extracted
+COPY_BUFFER_SIZE: int = 4 * 1024 * 1024
+EXTRACTED_SIZE_RATIO: float = 4.0  # .dem bytes per archive byte reserved while extracting
+
+
+class ModuleExtractionError(Exception):
+    """
+    rarfile/py7zr could not unpack an archive; a command line tool may still manage.
+    """
+
+
+class ExtractionResult:
+    """
+    Outcome of extracting one archive.
+    """
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self.output_dir: Optional[str] = None
+        self.demos: List[str] = []
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.demos)
+
+    def __repr__(self) -> str:
+        return f"ExtractionResult({self.archive_path!r}, demos={len(self.demos)}, error={self.error!r})"
+
+
+def is_archive(path: str) -> bool:
+    """
+    True if the file is an archive this module can unpack.
+    """
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def match_directory(archive_path: str, output_root: Optional[str] = None) -> str:
+    """
+    Per-match output directory for an archive: its name without the archive suffixes.
+
+    Args:
+        archive_path (str): Archive file.
+        output_root (Optional[str]): Parent directory; the archive's own directory if None.
+
+    Returns:
+        str: Directory path.
+    """
+    name = os.path.basename(archive_path)
+    for suffix in (".tar.gz", ".tgz") + ARCHIVE_SUFFIXES:
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    if name.lower().endswith(DEMO_SUFFIX):
+        # A single compressed demo, e.g. "match.dem.gz"
+        name = name[:-len(DEMO_SUFFIX)]
+    return os.path.join(output_root or os.path.dirname(os.path.abspath(archive_path)), name)
+
+
+def _copy_member(source, target_path: str) -> None:
+    with open(target_path, "wb") as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+
+
+def _extract_with_stdlib(archive_path: str, work_dir: str) -> bool:
+    """
+    Unpacks the .dem members of zip/tar/gz archives into work_dir.
+
+    Returns:
+        bool: False if the format is not handled by the standard library.
+    """
+    lower = archive_path.lower()
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.lower().endswith(DEMO_SUFFIX):
+                    with archive.open(member) as source:
+                        _copy_member(source, os.path.join(work_dir, os.path.basename(member.filename)))
+        return True
+    if lower.endswith((".tar.gz", ".tgz")) or (lower.endswith(".gz") and tarfile.is_tarfile(archive_path)):
+        with tarfile.open(archive_path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(DEMO_SUFFIX):
+                    _copy_member(archive.extractfile(member), os.path.join(work_dir, os.path.basename(member.name)))
+        return True
+    if lower.endswith(".gz"):
+        # A single gzipped demo
+        with gzip.open(archive_path, "rb") as source:
+            _copy_member(source, os.path.join(work_dir, os.path.basename(archive_path)[:-len(".gz")]))
+        return True
+    return False
+
+
+def _extract_with_module(archive_path: str, work_dir: str) -> bool:
+    """
+    Unpacks .rar/.7z archives with rarfile/py7zr if they are installed.
+
+    Returns:
+        bool: False if no suitable module is available.
+
+    Raises:
+        ModuleExtractionError: If the module failed on the archive (no unrar/bsdtar
+            backend for rarfile, an unsupported format variant, ...).
+    """
+    lower = archive_path.lower()
+    if lower.endswith(".rar"):
+        try:
+            import rarfile
+        except ImportError:
+            return False
+        try:
+            with rarfile.RarFile(archive_path) as archive:
+                for member in archive.infolist():
+                    if not member.is_dir() and member.filename.lower().endswith(DEMO_SUFFIX):
+                        with archive.open(member) as source:
+                            _copy_member(source, os.path.join(work_dir, os.path.basename(member.filename)))
+        except rarfile.Error as e:
+            raise ModuleExtractionError(f"rarfile: {type(e).__name__}: {e}") from e
+        return True
+    if lower.endswith(".7z"):
+        try:
+            import py7zr
+            from py7zr.exceptions import ArchiveError, PasswordRequired
+        except ImportError:
+            return False
+        try:
+            with py7zr.SevenZipFile(archive_path) as archive:
+                targets = [name for name in archive.getnames() if name.lower().endswith(DEMO_SUFFIX)]
+                archive.extract(path=work_dir, targets=targets)
+        except (ArchiveError, PasswordRequired) as e:
+            raise ModuleExtractionError(f"py7zr: {type(e).__name__}: {e}") from e
+        return True
+    return False
+
+
+def _extract_with_cli(archive_path: str, work_dir: str) -> bool:
+    """
+    Unpacks an archive with the first suitable command line tool on PATH.
+
+    Returns:
+        bool: False if no tool is available.
+    """
+    commands = [
+        ("7z", ["x", "-y", f"-o{work_dir}", archive_path]),
+        ("7za", ["x", "-y", f"-o{work_dir}", archive_path]),
+        ("unrar", ["x", "-o+", "-idq", archive_path, work_dir + os.sep]),
+        ("bsdtar", ["-x", "-f", archive_path, "-C", work_dir]),
+        ("tar", ["-x", "-f", archive_path, "-C", work_dir]),
+    ]
+    for tool, arguments in commands:
+        executable = shutil.which(tool)
+        if executable is None or (tool == "unrar" and not archive_path.lower().endswith(".rar")):
+            continue
+        completed = subprocess.run([executable] + arguments, capture_output=True, text=True)
+        if completed.returncode == 0:
+            return True
+        error = (completed.stderr or completed.stdout).strip().splitlines()
+        raise RuntimeError(f"{tool} failed: {error[-1] if error else completed.returncode}")
+    return False
+
+
+def extract_archive(
+    archive_path: str,
+    output_root: Optional[str] = None,
+    delete_archive: bool = DELETE_ARCHIVES,
+) -> ExtractionResult:
+    """
+    Extracts the .dem files of one archive into its per-match directory.
+
+    Demos are unpacked into a temporary directory first and only moved into
+    place once the whole archive succeeded. Runs in a worker process.
+
+    Args:
+        archive_path (str): Archive to unpack.
+        output_root (Optional[str]): Parent of the per-match directories; the archive's directory if None.
+        delete_archive (bool): Remove the archive after a successful extraction.
+
+    Returns:
+        ExtractionResult: Extracted demo paths, or the error.
+    """
+    result = ExtractionResult(archive_path)
+    output_dir = match_directory(archive_path, output_root)
+    work_dir = f"{output_dir}.extracting-{os.getpid()}"
+
+    try:
+        os.makedirs(work_dir, exist_ok=True)
+        module_error: Optional[ModuleExtractionError] = None
+        try:
+            extracted = _extract_with_stdlib(archive_path, work_dir) or _extract_with_module(archive_path, work_dir)
+        except ModuleExtractionError as e:
+            # Fall back to the command line tools, starting over from an empty directory
+            module_error = e
+            extracted = False
+            shutil.rmtree(work_dir, ignore_errors=True)
+            os.makedirs(work_dir, exist_ok=True)
+        if not (extracted or _extract_with_cli(archive_path, work_dir)):
+            if module_error is not None:
+                raise module_error
+            raise RuntimeError("No extractor available for this archive type (install rarfile/py7zr or 7-Zip)")
+
+        os.makedirs(output_dir, exist_ok=True)
+        for root, _, files in os.walk(work_dir):
+            for name in files:
+                if name.lower().endswith(DEMO_SUFFIX):
+                    target = os.path.join(output_dir, name)
+                    os.replace(os.path.join(root, name), target)
+                    result.demos.append(target)
+        if not result.demos:
+            raise RuntimeError("Archive contains no .dem files")
+
+        result.output_dir = output_dir
+        if delete_archive:
+            os.remove(archive_path)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+class ExtractionPool:
+    """
+    Worker processes that unpack archives as soon as they are submitted.
+
+    Usage:
+        with ExtractionPool() as extractor:
+            for result in downloads:
+                extractor.submit(result.path)
+        print(extractor.results)
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACT_WORKERS,
+        output_root: Optional[str] = None,
+        delete_archives: bool = DELETE_ARCHIVES,
+        on_done: Optional[Callable[[ExtractionResult], None]] = None,
+        budget: Optional[disk_budget.DiskBudget] = None,
+    ):
+        """
+        Args:
+            workers (int): Concurrent extractions.
+            output_root (Optional[str]): Parent of the per-match directories; next to each archive if None.
+            delete_archives (bool): Remove archives after successful extraction.
+            on_done (Optional[Callable[[ExtractionResult], None]]): Called (in a helper thread) per archive.
+            budget (Optional[disk_budget.DiskBudget]): Budget of the directory the demos go to; each
+                extraction reserves EXTRACTED_SIZE_RATIO times the archive size until it finished.
+        """
+        self.output_root = output_root
+        self.delete_archives = delete_archives
+        self.budget = budget
+        self.on_done = on_done or self._report
+        self.results: List[ExtractionResult] = []
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _report(result: ExtractionResult) -> None:
+        if result.ok:
+            print(f"Extracted {len(result.demos)} demo(s) from {os.path.basename(result.archive_path)} to {result.output_dir}")
+        else:
+            print(f"Extraction failed for {os.path.basename(result.archive_path)}: {result.error}")
+
+    def _collect(self, future: Future) -> None:
+        try:
+            result = future.result()
+        except Exception as e:
+            result = ExtractionResult(future.archive_path)
+            result.error = f"{type(e).__name__}: {e}"
+        if future.reservation is not None:
+            # The demos are on disk now (or nothing was written), the scan sees them
+            future.reservation.release()
+        self._finished(result)
+
+    def _finished(self, result: ExtractionResult) -> None:
+        with self._lock:
+            self.results.append(result)
+        self.on_done(result)
+
+    def submit(self, archive_path: Optional[str]) -> bool:
+        """
+        Queues an archive for extraction; anything that is not an archive is ignored.
+
+        Args:
+            archive_path (Optional[str]): Downloaded file.
+
+        Returns:
+            bool: True if the file was queued; False as well if its output does not fit the
+                budget (the archive is kept and reported as failed).
+        """
+        if not archive_path or not is_archive(archive_path):
+            return False
+        reservation = None
+        if self.budget is not None:
+            try:
+                size = int(os.path.getsize(archive_path) * EXTRACTED_SIZE_RATIO)
+                reservation = self.budget.reserve(size, f"extracting {os.path.basename(archive_path)}", wait=False)
+            except (OSError, disk_budget.InsufficientSpace) as e:
+                result = ExtractionResult(archive_path)
+                result.error = f"{type(e).__name__}: {e}"
+                self._finished(result)
+                return False
+        future = self._executor.submit(extract_archive, archive_path, self.output_root, self.delete_archives)
+        future.archive_path = archive_path
+        future.reservation = reservation
+        future.add_done_callback(self._collect)
+        with self._lock:
+            self._futures.append(future)
+        return True
+
+    def close(self) -> List[ExtractionResult]:
+        """
+        Waits for every queued extraction and stops the workers.
+
+        Returns:
+            List[ExtractionResult]: All results, in completion order.
+        """
+        self._executor.shutdown(wait=True)
+        return self.results
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,189 @@
+"""
+Persistent match ↔ demo index
+
+Maps numeric HLTV demo IDs (from /download/demo/<id>) to the match pages that
+link them, and remembers match pages that have no demo at all. The link stage
+records every lookup here, and the download stages read a deduplicated work
+list from it, so one demo reached from several match URLs is fetched once and
+known-missing matches are never looked up again.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# ─────────── Configuration ─────────── #
+INDEX_FILE: str = "demo_index.json"
+INDEX_VERSION: int = 1
+BASE: str = "https://www.hltv.org"
+DEMO_ID_PATTERN = re.compile(r"/download/demo/(\d+)")
+NO_DEMO_RECHECK_AFTER: float = 24 * 3600.0  # seconds; HLTV uploads demos after the match, so look again
+
+
+def parse_demo_id(link: Any) -> Optional[int]:
+    """
+    Extracts the numeric demo ID from a demo link or URL.
+
+    Args:
+        link (Any): e.g. "/download/demo/68282" or a full URL. Non-strings give None.
+
+    Returns:
+        Optional[int]: The demo ID, or None if the value is not a demo link.
+    """
+    if not isinstance(link, str):
+        return None
+    match = DEMO_ID_PATTERN.search(link)
+    return int(match.group(1)) if match else None
+
+
+def demo_url(demo_id: int) -> str:
+    """
+    Builds the canonical download URL for a demo ID.
+
+    Args:
+        demo_id (int): HLTV demo ID.
+
+    Returns:
+        str: Full download URL.
+    """
+    return f"{BASE}/download/demo/{demo_id}"
+
+
+def dedupe_demo_urls(links: Iterable[Any]) -> List[str]:
+    """
+    Turns raw demo links into canonical URLs, dropping non-demo values and duplicates.
+
+    Args:
+        links (Iterable[Any]): Demo links or URLs, in any form.
+
+    Returns:
+        List[str]: Canonical download URLs in first-seen order.
+    """
+    seen: Set[int] = set()
+    urls: List[str] = []
+    for link in links:
+        demo_id = parse_demo_id(link)
+        if demo_id is not None and demo_id not in seen:
+            seen.add(demo_id)
+            urls.append(demo_url(demo_id))
+    return urls
+
+
+class DemoIndex:
+    """
+    JSON-backed index of demo IDs, their match URLs and matches without demos.
+    """
+
+    def __init__(self, filename: str = INDEX_FILE):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self.demos: Dict[str, Dict[str, Any]] = {}
+        self.no_demo: Dict[str, float] = {}
+        self._match_demos: Dict[str, Set[int]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Reads the index file, starting empty if it is missing or unreadable.
+        """
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                raise ValueError(f"unsupported index version {data.get('version')}")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error reading demo index {self.filename}: {e}")
+            return
+
+        self.demos = data.get("demos", {})
+        self.no_demo = data.get("no_demo", {})
+        for demo_id, entry in self.demos.items():
+            for match_url in entry.get("matches", []):
+                self._match_demos.setdefault(match_url, set()).add(int(demo_id))
+
+    def save(self) -> None:
+        """
+        Writes the index atomically.
+        """
+        with self._lock:
+            data = {"version": INDEX_VERSION, "demos": self.demos, "no_demo": self.no_demo}
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_filename, self.filename)
+
+    def record(self, match_url: str, demo_links: Iterable[Any], checked_at: Optional[float] = None) -> List[int]:
+        """
+        Records the outcome of looking a match page up.
+
+        Args:
+            match_url (str): The match page.
+            demo_links (Iterable[Any]): data-demo-link values found on it (empty if none).
+            checked_at (Optional[float]): When the page was looked at (e.g. replayed from a
+                journal); now if None. A later check already recorded is kept.
+
+        Returns:
+            List[int]: Demo IDs linked from the match.
+        """
+        demo_ids = sorted({demo_id for demo_id in map(parse_demo_id, demo_links) if demo_id is not None})
+        with self._lock:
+            if not demo_ids:
+                checked_at = time.time() if checked_at is None else checked_at
+                self.no_demo[match_url] = max(checked_at, self.no_demo.get(match_url, checked_at))
+                return []
+
+            self.no_demo.pop(match_url, None)
+            for demo_id in demo_ids:
+                entry = self.demos.setdefault(str(demo_id), {"url": demo_url(demo_id), "matches": []})
+                if match_url not in entry["matches"]:
+                    entry["matches"].append(match_url)
+                self._match_demos.setdefault(match_url, set()).add(demo_id)
+        return demo_ids
+
+    def is_resolved(self, match_url: str) -> bool:
+        """
+        True if the match is known to have demos or recently found to have none.
+        """
+        return match_url in self._match_demos or self.has_no_demo(match_url)
+
+    def has_no_demo(self, match_url: str, max_age: float = NO_DEMO_RECHECK_AFTER) -> bool:
+        """
+        True if a lookup within the last `max_age` seconds found no demo on the match page.
+
+        Older results expire, since the demo may have been uploaded in the meantime.
+        """
+        checked_at = self.no_demo.get(match_url)
+        return checked_at is not None and time.time() - checked_at < max_age
+
+    def demo_ids_for(self, match_url: str) -> List[int]:
+        """
+        Demo IDs linked from a match page.
+        """
+        return sorted(self._match_demos.get(match_url, ()))
+
+    def matches_for(self, demo_id: int) -> List[str]:
+        """
+        Match pages that link a demo.
+        """
+        return list(self.demos.get(str(demo_id), {}).get("matches", []))
+
+    def work_list(self, match_urls: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Deduplicated demo download URLs, optionally limited to some matches.
+
+        Args:
+            match_urls (Optional[Iterable[str]]): Matches to include, in order; all demos if None.
+
+        Returns:
+            List[str]: Canonical download URLs, each demo once.
+        """
+        if match_urls is None:
+            demo_ids: Iterable[int] = sorted(int(demo_id) for demo_id in self.demos)
+        else:
+            demo_ids = [demo_id for url in match_urls for demo_id in self.demo_ids_for(url)]
+        return dedupe_demo_urls(demo_url(demo_id) for demo_id in demo_ids)
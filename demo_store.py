@@ -0,0 +1,250 @@
+"""
+Content-addressed store for downloaded demo archives
+
+Every archive is kept once, as a blob named by its SHA-256, and a small
+SQLite catalog maps HLTV demo IDs and match URLs to blobs. Download stages
+ask the store before touching the network and skip demo IDs it already
+holds. Files in the download folders are hardlinks to the blobs, so a demo
+downloaded twice (or reached from two match pages) takes disk space once.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import demo_index
+
+# ─────────── Configuration ─────────── #
+STORE_DIR: str = "demo_store"
+HASH_BLOCK_SIZE: int = 4 * 1024 * 1024
+STORE_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS demos (
+    demo_id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    filename TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS demo_matches (
+    demo_id INTEGER NOT NULL REFERENCES demos(demo_id),
+    match_url TEXT NOT NULL,
+    PRIMARY KEY (demo_id, match_url)
+);
+CREATE INDEX IF NOT EXISTS idx_demos_sha256 ON demos(sha256);
+CREATE INDEX IF NOT EXISTS idx_demo_matches_match_url ON demo_matches(match_url);
+"""
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Hashes a file in fixed-size blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_or_copy(source: str, target: str) -> bool:
+    """
+    Makes `target` a hardlink to `source`, copying if the filesystem cannot link.
+
+    Args:
+        source (str): Existing file.
+        target (str): Path to create (replaced if it exists).
+
+    Returns:
+        bool: True if a hardlink was made, False if the file was copied.
+    """
+    # The .tmp suffix keeps download_watch from taking the link for a browser download
+    tmp_target = f"{target}.link-{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        os.link(source, tmp_target)
+        linked = True
+    except OSError:
+        shutil.copy2(source, tmp_target)
+        linked = False
+    os.replace(tmp_target, target)
+    return linked
+
+
+class DemoStore:
+    """
+    SHA-256 addressed blobs plus a catalog of demo IDs and match URLs.
+
+    Usage:
+        store = DemoStore()
+        urls = [url for url in urls if not store.has_url(url)]
+        ...
+        store.add(downloaded_path, demo_id=68282, match_urls=[match_url])
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "store.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(STORE_SCHEMA)
+
+    def _blob_path(self, sha256: str, filename: str) -> str:
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(self.blob_dir, sha256[:2], sha256 + extension)
+
+    def has_demo(self, demo_id: int) -> bool:
+        """
+        True if the demo's archive is in the store (and its blob still exists).
+        """
+        return self.demo_path(demo_id) is not None
+
+    def has_url(self, url: str) -> bool:
+        """
+        True if the demo behind a /download/demo/<id> URL is in the store.
+        """
+        demo_id = demo_index.parse_demo_id(url)
+        return demo_id is not None and self.has_demo(demo_id)
+
+    def demo_path(self, demo_id: int) -> Optional[str]:
+        """
+        Blob path of a demo's archive.
+
+        Args:
+            demo_id (int): HLTV demo ID.
+
+        Returns:
+            Optional[str]: The blob, or None if the demo is not stored.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blobs.path FROM demos JOIN blobs USING (sha256) WHERE demo_id = ?", (demo_id,)
+            ).fetchone()
+        return row[0] if row and os.path.exists(row[0]) else None
+
+    def demos_for_match(self, match_url: str) -> List[int]:
+        """
+        Stored demo IDs that belong to a match page.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT demo_id FROM demo_matches WHERE match_url = ? ORDER BY demo_id", (match_url,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def missing(self, urls: Iterable[str]) -> List[str]:
+        """
+        Filters download URLs down to demos that are not stored yet.
+        """
+        return [url for url in urls if not self.has_url(url)]
+
+    def add(
+        self,
+        file_path: str,
+        demo_id: Optional[int] = None,
+        match_urls: Iterable[str] = (),
+    ) -> str:
+        """
+        Moves a downloaded file into the store and leaves a hardlink in its place.
+
+        If a byte-identical blob already exists, the file is replaced by a link
+        to it and the duplicate bytes are freed.
+
+        Args:
+            file_path (str): Downloaded file.
+            demo_id (Optional[int]): HLTV demo ID the file was downloaded for.
+            match_urls (Iterable[str]): Match pages that link the demo.
+
+        Returns:
+            str: The blob path.
+        """
+        sha256 = file_sha256(file_path)
+        filename = os.path.basename(file_path)
+        blob_path = self._blob_path(sha256, filename)
+
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if row and os.path.exists(row[0]):
+                blob_path = row[0]
+                if not os.path.samefile(blob_path, file_path):
+                    link_or_copy(blob_path, file_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                link_or_copy(file_path, blob_path)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha256, size, path, added_at) VALUES (?, ?, ?, ?)",
+                    (sha256, os.path.getsize(blob_path), blob_path, time.time()),
+                )
+
+            if demo_id is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO demos (demo_id, sha256, filename) VALUES (?, ?, ?)",
+                    (demo_id, sha256, filename),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO demo_matches (demo_id, match_url) VALUES (?, ?)",
+                    [(demo_id, match_url) for match_url in match_urls],
+                )
+            self._conn.commit()
+        return blob_path
+
+    def link_matches(self, demo_id: int, match_urls: Iterable[str]) -> bool:
+        """
+        Records match pages that link an already stored demo.
+
+        Args:
+            demo_id (int): HLTV demo ID.
+            match_urls (Iterable[str]): Match pages that link the demo.
+
+        Returns:
+            bool: False if the demo is not stored (nothing is recorded then).
+        """
+        with self._lock:
+            if not self._conn.execute("SELECT 1 FROM demos WHERE demo_id = ?", (demo_id,)).fetchone():
+                return False
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO demo_matches (demo_id, match_url) VALUES (?, ?)",
+                [(demo_id, match_url) for match_url in match_urls],
+            )
+            self._conn.commit()
+        return True
+
+    def materialize(self, demo_id: int, directory: str) -> Optional[str]:
+        """
+        Hardlinks a stored demo into a directory under its original filename.
+
+        Args:
+            demo_id (int): HLTV demo ID.
+            directory (str): Target directory.
+
+        Returns:
+            Optional[str]: The linked file, or None if the demo is not stored.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blobs.path, demos.filename FROM demos JOIN blobs USING (sha256) WHERE demo_id = ?",
+                (demo_id,),
+            ).fetchone()
+        if not row or not os.path.exists(row[0]):
+            return None
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, row[1])
+        if not (os.path.exists(target) and os.path.samefile(row[0], target)):
+            link_or_copy(row[0], target)
+        return target
+
+    def close(self) -> None:
+        """
+        Closes the catalog.
+        """
+        with self._lock:
+            self._conn.close()
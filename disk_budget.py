@@ -0,0 +1,253 @@
+"""
+Disk space admission control for demo downloads
+
+Every download reserves its size against a DiskBudget before any bytes are
+transferred. The budget admits a reservation only if it fits both a
+configurable quota for the download directory and the free space on its
+filesystem (keeping MIN_FREE_BYTES untouched). A reservation that does not
+fit yet is deferred while other downloads are transferring, since they may
+fail or turn out smaller, and is rejected at once when nothing is left that
+could make room (deferred reservations cannot), so large backfills skip
+what cannot fit instead of failing halfway through a file.
+
+Files that are still being written (.part, .crdownload) are covered by
+their reservations, so they count neither against the quota nor against
+the free space.
+"""
+
+import os
+import shutil
+import threading
+import time
+from typing import Optional, Set, Tuple
+
+# ─────────── Configuration ─────────── #
+QUOTA_BYTES: Optional[int] = None  # max bytes of downloads in the directory, None for no quota
+MIN_FREE_BYTES: int = 2 * 1024 ** 3  # free space always left on the filesystem
+DEFAULT_DOWNLOAD_SIZE: int = 512 * 1024 ** 2  # assumed when the size cannot be learned up front
+ADMISSION_TIMEOUT: float = 60 * 60.0  # seconds a deferred reservation waits for room
+SCAN_TTL: float = 5.0  # seconds a scan of the download directory is reused
+IN_FLIGHT_SUFFIXES = (".part", ".crdownload")  # files covered by reservations
+
+
+class InsufficientSpace(Exception):
+    """
+    A download does not fit the quota or the free disk space.
+
+    `deferrable` is True if other downloads are transferring, so waiting may help.
+    """
+
+    def __init__(self, label: Optional[str], needed: int, available: int, deferrable: bool = False):
+        self.label = label
+        self.needed = needed
+        self.available = available
+        self.deferrable = deferrable
+        super().__init__(
+            f"{label or 'download'} needs {needed / 1024 ** 2:.1f} MB, "
+            f"only {max(available, 0) / 1024 ** 2:.1f} MB available"
+        )
+
+
+class Reservation:
+    """
+    Space held for one download until it is released.
+    """
+
+    def __init__(self, budget: "DiskBudget", label: Optional[str], size: int):
+        self.budget = budget
+        self.label = label
+        self.size = size
+        self.released = False
+
+    def resize(self, size: int, wait: bool = False, timeout: float = ADMISSION_TIMEOUT) -> None:
+        """
+        Changes the reserved size, e.g. once Content-Length is known.
+
+        Args:
+            size (int): New size in bytes.
+            wait (bool): Defer until the growth fits instead of raising right away.
+            timeout (float): Seconds to wait when deferring.
+
+        Raises:
+            InsufficientSpace: If the growth does not fit.
+        """
+        self.budget._resize(self, size, wait, timeout)
+
+    def release(self) -> None:
+        """
+        Returns the space to the budget; safe to call more than once.
+        """
+        self.budget._release(self)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"Reservation({self.label!r}, {self.size})"
+
+
+class DiskBudget:
+    """
+    Admits downloads into a directory against a quota and the free disk space.
+
+    Usage:
+        budget = DiskBudget(download_dir, quota=200 * 1024 ** 3)
+        with budget.reserve(size, label=url) as reservation:
+            ...  # transfer; reservation.resize(content_length) once it is known
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        quota: Optional[int] = QUOTA_BYTES,
+        min_free: int = MIN_FREE_BYTES,
+        default_size: int = DEFAULT_DOWNLOAD_SIZE,
+    ):
+        """
+        Args:
+            directory (str): Download directory the quota applies to.
+            quota (Optional[int]): Max bytes of finished downloads in the directory; None for no quota.
+            min_free (int): Bytes to keep free on the filesystem.
+            default_size (int): Reserved for downloads whose size is unknown.
+        """
+        self.directory = directory
+        self.quota = quota
+        self.min_free = min_free
+        self.default_size = default_size
+        self.reserved = 0
+        self.in_flight = 0
+        self._waiting = 0  # reservations deferred in a resize (in flight, but not transferring)
+        self._scanned: Optional[Tuple[float, int, int]] = None  # (time, finished, pending)
+        self._cond = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def _scan(self) -> Tuple[int, int]:
+        """
+        Sizes of finished and in-flight files in the directory tree (hardlinks counted once).
+
+        Walks the tree at most once per SCAN_TTL; a release invalidates the cached result.
+        """
+        if self._scanned is not None and time.monotonic() - self._scanned[0] < SCAN_TTL:
+            return self._scanned[1], self._scanned[2]
+        finished = pending = 0
+        seen: Set[Tuple[int, int]] = set()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                if (stat.st_dev, stat.st_ino) in seen:
+                    continue
+                seen.add((stat.st_dev, stat.st_ino))
+                if name.endswith(IN_FLIGHT_SUFFIXES):
+                    pending += stat.st_size
+                else:
+                    finished += stat.st_size
+        self._scanned = (time.monotonic(), finished, pending)
+        return finished, pending
+
+    def usage(self) -> int:
+        """
+        Bytes of finished downloads in the directory.
+        """
+        with self._cond:
+            return self._scan()[0]
+
+    def available(self) -> int:
+        """
+        Bytes that can still be reserved (negative if the budget is overcommitted).
+        """
+        with self._cond:
+            return self._available()
+
+    def _available(self) -> int:
+        finished, pending = self._scan()
+        room = shutil.disk_usage(self.directory).free + pending - self.min_free
+        if self.quota is not None:
+            room = min(room, self.quota - finished)
+        return room - self.reserved
+
+    def _admit(self, label: Optional[str], growth: int, wait: bool, timeout: float, holding: bool = False) -> None:
+        """
+        Blocks until `growth` more bytes fit. Must be called with the condition held.
+
+        Args:
+            holding (bool): The caller already holds a reservation (a resize), so it is
+                counted as waiting rather than transferring while deferred.
+        """
+        deadline = time.monotonic() + timeout
+        if holding:
+            self._waiting += 1
+        try:
+            while True:
+                available = self._available()
+                if growth <= available:
+                    self.reserved += growth
+                    return
+                # Only transferring downloads can make room (by failing or turning out
+                # smaller); deferred ones just wait on each other
+                deferrable = self.in_flight - self._waiting > 0
+                remaining = deadline - time.monotonic()
+                if not (wait and deferrable and remaining > 0):
+                    raise InsufficientSpace(label, growth, available, deferrable)
+                self._cond.wait(remaining)
+        finally:
+            if holding:
+                self._waiting -= 1
+                # Other deferred reservations may have been waiting on this one
+                self._cond.notify_all()
+
+    def reserve(
+        self,
+        size: Optional[int],
+        label: Optional[str] = None,
+        wait: bool = True,
+        timeout: float = ADMISSION_TIMEOUT,
+    ) -> Reservation:
+        """
+        Reserves space for a download before it starts.
+
+        Args:
+            size (Optional[int]): Expected size in bytes; default_size if None.
+            label (Optional[str]): Name for messages (e.g. the URL).
+            wait (bool): Defer while other downloads are in flight instead of raising right away.
+            timeout (float): Seconds to wait when deferring.
+
+        Returns:
+            Reservation: Release it when the download finished or failed.
+
+        Raises:
+            InsufficientSpace: If the download does not fit (and waiting did not help).
+        """
+        size = self.default_size if size is None else max(int(size), 0)
+        with self._cond:
+            self._admit(label, size, wait, timeout)
+            self.in_flight += 1
+        return Reservation(self, label, size)
+
+    def _resize(self, reservation: Reservation, size: int, wait: bool, timeout: float) -> None:
+        with self._cond:
+            if reservation.released:
+                raise ValueError("Reservation was already released")
+            growth = size - reservation.size
+            if growth > 0:
+                self._admit(reservation.label, growth, wait, timeout, holding=True)
+            else:
+                self.reserved += growth
+                self._cond.notify_all()
+            reservation.size = size
+
+    def _release(self, reservation: Reservation) -> None:
+        with self._cond:
+            if reservation.released:
+                return
+            reservation.released = True
+            self.reserved -= reservation.size
+            self.in_flight -= 1
+            # The download's file is finished (or gone) now
+            self._scanned = None
+            self._cond.notify_all()
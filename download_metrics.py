@@ -0,0 +1,314 @@
+"""
+Per-transfer download metrics
+
+Every finished download is recorded with its queue wait, time to first
+byte, total duration, size, average and peak throughput, retries, the time
+it spent waiting for HLTV's rate limiter, and its outcome. DownloadMetrics
+feeds them into prometheus_client histograms and counters, served on a local
+port while a run is in progress, and writes a JSON summary (with percentiles
+estimated from the histogram buckets) when the run ends.
+
+Telling the bottlenecks apart:
+    - HLTV throttling: high pacing wait and queue wait, low pacing rate gauge
+    - Our link: peak throughput flat at the same value across transfers
+    - The browser: "fallback"/"browser" transfers dominating durations
+
+Requirements:
+    - prometheus-client
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+# ─────────── Configuration ─────────── #
+METRICS_PORT: Optional[int] = 9464  # local port for the Prometheus endpoint, None to disable
+METRICS_HOST: str = "127.0.0.1"
+SUMMARY_FILE: str = "download_metrics.json"
+PREFIX: str = "hltv_download"
+MB: int = 1024 * 1024
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(MB * size for size in (1, 16, 64, 128, 256, 512, 1024, 2048, 4096))
+THROUGHPUT_BUCKETS = tuple(MB * rate for rate in (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100))
+QUANTILES = (0.5, 0.9, 0.99)
+
+# name: (help, buckets)
+HISTOGRAMS: Dict[str, Tuple[str, Tuple[float, ...]]] = {
+    "queue_wait_seconds": ("Seconds a download waited for a worker", SECONDS_BUCKETS),
+    "pacing_wait_seconds": ("Seconds a download waited for the HLTV rate limiter", SECONDS_BUCKETS),
+    "ttfb_seconds": ("Seconds from the first request to the first byte", SECONDS_BUCKETS),
+    "duration_seconds": ("Seconds from the start of a download to its end", SECONDS_BUCKETS),
+    "size_bytes": ("Bytes transferred per download", BYTES_BUCKETS),
+    "throughput_bytes_per_second": ("Average throughput per download", THROUGHPUT_BUCKETS),
+    "peak_throughput_bytes_per_second": ("Peak one-second throughput per download", THROUGHPUT_BUCKETS),
+}
+
+
+class SummaryStats:
+    """
+    Count, sum, extremes and bucket counts of one metric, for the JSON summary.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile by linear interpolation within its bucket, like PromQL's histogram_quantile.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else min(self.min, self.buckets[0])
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return min(max(estimate, self.min), self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = self.quantile(q)
+        return summary
+
+
+class _GaugeCollector:
+    """
+    Reads the registered gauge callbacks at scrape time.
+    """
+
+    def __init__(self, gauges: Dict[str, Tuple[str, str, Callable[[], Dict[str, float]]]]):
+        self.gauges = gauges
+
+    def collect(self):
+        for name, (help, label, read) in list(self.gauges.items()):
+            family = GaugeMetricFamily(f"{PREFIX}_{name}", help, labels=[label])
+            try:
+                values = read()
+            except Exception:
+                values = {}
+            for key, value in sorted(values.items()):
+                family.add_metric([str(key)], value)
+            yield family
+
+
+class DownloadMetrics:
+    """
+    Thread-safe collector for download metrics, with its own Prometheus registry.
+
+    Usage:
+        metrics = DownloadMetrics()
+        metrics.serve()  # http://127.0.0.1:9464/metrics
+        metrics.observe_result(result)
+        ...
+        metrics.close()  # writes download_metrics.json
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.registry = CollectorRegistry()
+        self._transfers = Counter(f"{PREFIX}_transfers", "Finished downloads", ["source", "outcome"], registry=self.registry)
+        self._bytes = Counter(f"{PREFIX}_bytes", "Bytes downloaded", ["source"], registry=self.registry)
+        self._retries = Counter(f"{PREFIX}_retries", "Download attempts after the first", ["source"], registry=self.registry)
+        self._histograms = {
+            name: Histogram(f"{PREFIX}_{name}", help, ["source"], buckets=buckets, registry=self.registry)
+            for name, (help, buckets) in HISTOGRAMS.items()
+        }
+        self._gauges: Dict[str, Tuple[str, str, Callable[[], Dict[str, float]]]] = {}
+        self.registry.register(_GaugeCollector(self._gauges))
+        # For the JSON summary
+        self._stats: Dict[Tuple[str, str], SummaryStats] = {}
+        self._totals: Dict[Tuple[str, str], int] = {}
+        self._bytes_total: Dict[str, int] = {}
+        self._retries_total: Dict[str, int] = {}
+        self._server = None
+        self.started_at = time.time()
+
+    def observe(
+        self,
+        source: str,
+        outcome: str,
+        size: int,
+        duration: float,
+        queue_wait: Optional[float] = None,
+        ttfb: Optional[float] = None,
+        peak_throughput: Optional[float] = None,
+        retries: int = 0,
+        pacing_wait: Optional[float] = None,
+    ) -> None:
+        """
+        Records one finished download.
+
+        Args:
+            source (str): How it was downloaded: "http", "fallback" or "browser".
+            outcome (str): "ok", "failed", "rejected", ...
+            size (int): Bytes transferred.
+            duration (float): Seconds the download took.
+            queue_wait (Optional[float]): Seconds it waited for a worker.
+            ttfb (Optional[float]): Seconds from the first request to the first byte.
+            peak_throughput (Optional[float]): Best one-second throughput in bytes/s.
+            retries (int): Attempts after the first one.
+            pacing_wait (Optional[float]): Seconds spent waiting for the rate limiter.
+        """
+        values = {
+            "queue_wait_seconds": queue_wait,
+            "pacing_wait_seconds": pacing_wait,
+            "ttfb_seconds": ttfb,
+            "duration_seconds": duration,
+        }
+        if size:
+            values["size_bytes"] = size
+            values["throughput_bytes_per_second"] = size / duration if duration > 0 else None
+            values["peak_throughput_bytes_per_second"] = peak_throughput or None
+
+        self._transfers.labels(source, outcome).inc()
+        self._bytes.labels(source).inc(size)
+        self._retries.labels(source).inc(retries)
+        with self._lock:
+            self._totals[(source, outcome)] = self._totals.get((source, outcome), 0) + 1
+            self._bytes_total[source] = self._bytes_total.get(source, 0) + size
+            self._retries_total[source] = self._retries_total.get(source, 0) + retries
+            for name, value in values.items():
+                if value is None:
+                    continue
+                self._histograms[name].labels(source).observe(value)
+                key = (name, source)
+                if key not in self._stats:
+                    self._stats[key] = SummaryStats(HISTOGRAMS[name][1])
+                self._stats[key].observe(value)
+
+    def observe_result(self, result: Any) -> None:
+        """
+        Records a demo_download.DownloadResult.
+        """
+        source = "fallback" if result.status == "fallback" else "http"
+        size = result.bytes
+        if result.status == "fallback" and result.path and os.path.exists(result.path):
+            size = os.path.getsize(result.path)
+        self.observe(
+            source, result.status, size, result.elapsed,
+            queue_wait=result.queue_wait,
+            ttfb=result.ttfb if source == "http" else None,
+            peak_throughput=result.peak_throughput if source == "http" else None,
+            retries=result.retries,
+            pacing_wait=result.pacing_wait,
+        )
+
+    def observe_ticket(self, ticket: Any, queue_wait: Optional[float] = None) -> None:
+        """
+        Records a resolved download_watch.DownloadTicket (a browser download).
+        """
+        path = ticket.path
+        size = os.path.getsize(path) if path and os.path.exists(path) else 0
+        end = ticket.finished_at or time.monotonic()
+        self.observe(
+            "browser", "ok" if path else "failed", size, end - ticket.created_at,
+            queue_wait=queue_wait,
+            ttfb=ticket.started_at - ticket.created_at if ticket.started_at is not None else None,
+        )
+
+    def gauge(self, name: str, help: str, label: str, read: Callable[[], Dict[str, float]]) -> None:
+        """
+        Registers a gauge read at scrape time, e.g. the current pacing rate per host.
+
+        Args:
+            name (str): Metric name without the prefix.
+            help (str): Description.
+            label (str): Label name for the keys returned by `read`.
+            read (Callable[[], Dict[str, float]]): Returns the current value per label value.
+        """
+        self._gauges[name] = (help, label, read)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Counters and per-source histogram summaries (count, sum, mean, min, max, percentiles).
+        """
+        with self._lock:
+            histograms: Dict[str, Dict[str, Any]] = {}
+            for (name, source), stats in sorted(self._stats.items()):
+                histograms.setdefault(name, {})[source] = stats.summary()
+            return {
+                "started_at": self.started_at,
+                "finished_at": time.time(),
+                "transfers": [
+                    {"source": source, "outcome": outcome, "count": count}
+                    for (source, outcome), count in sorted(self._totals.items())
+                ],
+                "bytes": dict(self._bytes_total),
+                "retries": dict(self._retries_total),
+                "histograms": histograms,
+            }
+
+    def write_summary(self, filename: str = SUMMARY_FILE) -> None:
+        """
+        Writes the JSON summary atomically.
+        """
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=1)
+        os.replace(tmp_filename, filename)
+
+    def serve(self, port: Optional[int] = METRICS_PORT, host: str = METRICS_HOST) -> bool:
+        """
+        Serves the registry at http://<host>:<port>/metrics from a daemon thread.
+
+        Returns:
+            bool: False if disabled or the port is unavailable.
+        """
+        if port is None:
+            return False
+        try:
+            self._server = start_http_server(port, addr=host, registry=self.registry)
+        except OSError as e:
+            print(f"Metrics endpoint unavailable on {host}:{port}: {e}")
+            return False
+        print(f"Download metrics at http://{host}:{port}/metrics")
+        return True
+
+    def close(self, filename: Optional[str] = SUMMARY_FILE) -> None:
+        """
+        Stops the endpoint and writes the JSON summary.
+
+        Args:
+            filename (Optional[str]): Summary file, None to skip it.
+        """
+        if isinstance(self._server, tuple):
+            server, thread = self._server
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self._server = None
+        if filename:
+            try:
+                self.write_summary(filename)
+                print(f"Download metrics written to {filename}")
+            except OSError as e:
+                print(f"Could not write download metrics to {filename}: {e}")
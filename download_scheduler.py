@@ -0,0 +1,285 @@
+"""
+Priority scheduling of demo downloads under a global bandwidth cap
+
+DownloadScheduler keeps pending jobs in a priority queue and runs the most
+urgent ones on a fixed number of worker threads; jobs submitted while it is
+running overtake queued jobs of lower priority. A download list may carry an
+explicit priority as a second column (higher runs first); within the same
+priority newer demos go first, since HLTV demo IDs grow over time.
+
+All transfers draw from one shared byte TokenBucket, so the combined download
+rate stays under the cap no matter how many transfers run at once.
+"""
+
+import heapq
+import itertools
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import demo_index
+from rate_limit import TokenBucket
+
+# ─────────── Configuration ─────────── #
+SCHEDULER_WORKERS: int = 4  # jobs run at the same time
+PRIORITY_ORDER: str = "newest"  # tie-break within a priority: "newest" (highest demo ID first) or "file" (list order)
+MAX_BYTES_PER_SECOND: Optional[float] = None  # global download cap, None for unlimited
+BANDWIDTH_BURST_SECONDS: float = 1.0  # seconds of traffic the cap lets through at once
+FIELD_SEPARATOR = re.compile(r"[\s,;]+")
+
+
+class DownloadJob:
+    """
+    One queued download. Jobs compare by priority, then by the tie-break order.
+    """
+
+    def __init__(self, url: str, priority: float = 0.0, order: str = PRIORITY_ORDER, sequence: int = 0):
+        self.url = url
+        self.priority = float(priority)
+        self.sequence = sequence
+        demo_id = demo_index.parse_demo_id(url)
+        newest_first = -demo_id if order == "newest" and demo_id is not None else 0
+        self._key = (-self.priority, newest_first, sequence)
+        self.queued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        """
+        Seconds the job waited in the queue, or None if it has not started.
+        """
+        return None if self.started_at is None else self.started_at - self.queued_at
+
+    def __lt__(self, other: "DownloadJob") -> bool:
+        return self._key < other._key
+
+    def __repr__(self) -> str:
+        return f"DownloadJob({self.url!r}, priority={self.priority:g})"
+
+
+def bandwidth_limiter(bytes_per_second: Optional[float] = MAX_BYTES_PER_SECOND, burst_seconds: float = BANDWIDTH_BURST_SECONDS) -> Optional[TokenBucket]:
+    """
+    Builds the shared byte bucket for a download cap.
+
+    Args:
+        bytes_per_second (Optional[float]): Combined cap for all transfers; None or 0 for unlimited.
+        burst_seconds (float): Seconds of traffic that may pass at once after an idle period.
+
+    Returns:
+        Optional[TokenBucket]: Bucket holding bytes, or None if downloads are not capped.
+    """
+    if not bytes_per_second:
+        return None
+    return TokenBucket(bytes_per_second, bytes_per_second * burst_seconds)
+
+
+def parse_job_line(line: str) -> Tuple[Optional[int], Optional[float]]:
+    """
+    Parses one line of a download list: a demo URL, optionally followed by a priority.
+
+    Args:
+        line (str): e.g. "https://www.hltv.org/download/demo/68282 10".
+
+    Returns:
+        Tuple[Optional[int], Optional[float]]: Demo ID (None if the line has no demo link)
+            and the explicit priority (None if there is no priority column).
+    """
+    fields = FIELD_SEPARATOR.split(line.strip())
+    demo_id = demo_index.parse_demo_id(fields[0])
+    priority = None
+    if len(fields) > 1:
+        try:
+            priority = float(fields[1])
+        except ValueError:
+            pass
+    return demo_id, priority
+
+
+def load_priorities(filename: str) -> Dict[int, float]:
+    """
+    Reads explicit priorities from a download list.
+
+    Args:
+        filename (str): Download list, one URL (and optional priority) per line.
+
+    Returns:
+        Dict[int, float]: Priority per demo ID; demos listed twice keep their highest priority.
+    """
+    priorities: Dict[int, float] = {}
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            for line in f:
+                demo_id, priority = parse_job_line(line)
+                if demo_id is not None and priority is not None:
+                    priorities[demo_id] = max(priority, priorities.get(demo_id, priority))
+    except FileNotFoundError:
+        pass
+    return priorities
+
+
+def prioritize(
+    urls: List[str],
+    priorities: Optional[Dict[int, float]] = None,
+    order: str = PRIORITY_ORDER,
+) -> List[str]:
+    """
+    Sorts URLs into the order a scheduler would start them.
+
+    Args:
+        urls (List[str]): Demo download URLs.
+        priorities (Optional[Dict[int, float]]): Explicit priority per demo ID (default 0).
+        order (str): Tie-break within a priority, "newest" or "file".
+
+    Returns:
+        List[str]: URLs, most urgent first.
+    """
+    priorities = priorities or {}
+    jobs = [
+        DownloadJob(url, priorities.get(demo_index.parse_demo_id(url), 0.0), order, sequence)
+        for sequence, url in enumerate(urls)
+    ]
+    return [job.url for job in sorted(jobs)]
+
+
+class DownloadScheduler:
+    """
+    Runs queued jobs most-urgent-first on a fixed pool of worker threads.
+
+    Usage:
+        scheduler = DownloadScheduler(run, workers=4, priorities={68282: 10})
+        for url in urls:
+            scheduler.submit(url)
+        for job, result in scheduler.results():
+            ...
+        scheduler.close()
+    """
+
+    def __init__(
+        self,
+        run: Callable[[DownloadJob], Any],
+        workers: int = SCHEDULER_WORKERS,
+        priorities: Optional[Dict[int, float]] = None,
+        order: str = PRIORITY_ORDER,
+    ):
+        """
+        Args:
+            run (Callable[[DownloadJob], Any]): Executes one job; its return value is reported by results().
+            workers (int): Jobs run at the same time.
+            priorities (Optional[Dict[int, float]]): Explicit priority per demo ID (default 0).
+            order (str): Tie-break within a priority, "newest" or "file".
+        """
+        self.run = run
+        self.priorities = priorities or {}
+        self.order = order
+        self._heap: List[DownloadJob] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._done: "queue.Queue[Tuple[DownloadJob, Any]]" = queue.Queue()
+        self._submitted = 0
+        self._reported = 0
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"demo-scheduler-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, url: str, priority: Optional[float] = None) -> DownloadJob:
+        """
+        Queues a download.
+
+        Args:
+            url (str): Demo download URL.
+            priority (Optional[float]): Overrides the priority from the priorities table.
+
+        Returns:
+            DownloadJob: The queued job.
+        """
+        if priority is None:
+            priority = self.priorities.get(demo_index.parse_demo_id(url), 0.0)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            job = DownloadJob(url, priority, self.order, next(self._sequence))
+            heapq.heappush(self._heap, job)
+            self._submitted += 1
+            self._cond.notify()
+        return job
+
+    def pending(self) -> int:
+        """
+        Number of jobs waiting to start.
+        """
+        with self._cond:
+            return len(self._heap)
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                job = heapq.heappop(self._heap)
+            job.started_at = time.monotonic()
+            result = None
+            try:
+                result = self.run(job)
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+            job.finished_at = time.monotonic()
+            self._done.put((job, result))
+
+    def results(self) -> Iterator[Tuple[DownloadJob, Any]]:
+        """
+        Yields (job, result) pairs as jobs finish, until every submitted job is reported.
+
+        Jobs submitted while iterating are waited for as well.
+        """
+        while True:
+            with self._cond:
+                if self._reported >= self._submitted:
+                    return
+            item = self._done.get()
+            with self._cond:
+                self._reported += 1
+            yield item
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stops the workers once the queue is empty.
+
+        Args:
+            wait (bool): Block until running jobs have finished.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def cancel_pending(self) -> List[DownloadJob]:
+        """
+        Drops every job that has not started yet.
+
+        Returns:
+            List[DownloadJob]: The dropped jobs.
+        """
+        with self._cond:
+            dropped, self._heap = sorted(self._heap), []
+            self._submitted -= len(dropped)
+        return dropped
+
+    def __enter__(self) -> "DownloadScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if exc_info[0] is not None:
+            self.cancel_pending()
+        self.close()
@@ -0,0 +1,389 @@
+"""
+Event-driven tracking of browser downloads
+
+Chrome writes every download to a .crdownload file and renames it to its
+final name when the transfer is done. DownloadTracker follows those file
+system events for one directory and hands each download job a ticket that
+is resolved the moment its own temp file is renamed (or removed, if the
+download was cancelled), so callers wait exactly as long as the transfer
+takes instead of sleeping and polling.
+
+Events come from watchdog when it is installed (Windows, macOS, Linux),
+otherwise from inotify on Linux, and only as a last resort from a fast
+directory scan.
+
+Requirements:
+    - watchdog (optional)
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# ─────────── Configuration ─────────── #
+TEMP_SUFFIXES = (".crdownload",)  # Chrome's in-progress downloads
+IGNORED_SUFFIXES = (".part", ".json", ".tmp")  # our own HTTP downloads and bookkeeping files
+START_TIMEOUT: float = 60.0  # seconds for a download to show up at all
+DOWNLOAD_TIMEOUT: float = 30 * 60.0  # seconds for a download to finish
+SCAN_INTERVAL: float = 0.2  # seconds between scans when no event source is available
+
+
+class DownloadTicket:
+    """
+    One expected download: started once its temp file appears, done once it is renamed.
+    """
+
+    def __init__(self, label: Optional[str], baseline: Set[str]):
+        self.label = label
+        self.baseline = baseline
+        self.temp: Optional[str] = None
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started = threading.Event()
+        self.done = threading.Event()
+        # time.monotonic() of registration, first file event and resolution
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"DownloadTicket({self.label!r}, temp={self.temp!r}, path={self.path!r}, error={self.error!r})"
+
+
+class DownloadTracker:
+    """
+    Attributes download files appearing in a directory to the jobs that triggered them.
+
+    Usage:
+        with DownloadTracker(download_dir) as tracker:
+            ticket = tracker.expect(url)
+            driver.get(url)
+            path = tracker.wait(ticket)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._resolved = threading.Condition(self._lock)  # notified whenever a ticket resolves
+        self._pending: List[DownloadTicket] = []
+        self._closed = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+        self.backend = self._start()
+
+    # ─────────── Event sources ─────────── #
+
+    def _start(self) -> str:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            pass
+        else:
+            tracker = self
+
+            class Handler(FileSystemEventHandler):
+                def on_created(self, event):
+                    if not event.is_directory:
+                        tracker._on_created(os.path.basename(event.src_path))
+
+                def on_moved(self, event):
+                    if not event.is_directory:
+                        tracker._on_moved(os.path.basename(event.src_path), os.path.basename(event.dest_path))
+
+                def on_deleted(self, event):
+                    if not event.is_directory:
+                        tracker._on_deleted(os.path.basename(event.src_path))
+
+            self._observer = Observer()
+            self._observer.schedule(Handler(), self.directory, recursive=False)
+            self._observer.start()
+            return "watchdog"
+
+        if sys.platform.startswith("linux"):
+            fd = _inotify_watch(self.directory)
+            if fd is not None:
+                self._thread = threading.Thread(target=self._inotify_loop, args=(fd,), daemon=True)
+                self._thread.start()
+                return "inotify"
+
+        self._thread = threading.Thread(target=self._scan_loop, daemon=True)
+        self._thread.start()
+        return "scan"
+
+    def _inotify_loop(self, fd: int) -> None:
+        try:
+            while not self._closed.is_set():
+                readable, _, _ = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+                moved_from: Dict[int, str] = {}
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    _, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+                    name = data[offset + 16:offset + 16 + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                    offset += 16 + length
+                    if mask & IN_ISDIR:
+                        continue
+                    if mask & IN_CREATE:
+                        self._on_created(name)
+                    elif mask & IN_MOVED_FROM:
+                        moved_from[cookie] = name
+                    elif mask & IN_MOVED_TO:
+                        if cookie in moved_from:
+                            self._on_moved(moved_from.pop(cookie), name)
+                        else:
+                            self._on_created(name)
+                    elif mask & IN_DELETE:
+                        self._on_deleted(name)
+                # Moved out of the directory
+                for name in moved_from.values():
+                    self._on_deleted(name)
+        finally:
+            os.close(fd)
+
+    def _scan_loop(self) -> None:
+        previous = self._listdir()
+        ignored = self._ignored_inodes(previous)
+        while not self._closed.wait(SCAN_INTERVAL):
+            current = self._listdir()
+            appeared = current - previous
+            vanished = previous - current
+            finals = sorted(name for name in appeared if not _is_temp(name))
+            temps = sorted(name for name in appeared if _is_temp(name))
+
+            # Our own .part files renamed into place: same inode (or the .part's stem), not a download
+            part_stems = {name[:-len(suffix)] for name in vanished for suffix in IGNORED_SUFFIXES if name.endswith(suffix)}
+            for name in list(finals):
+                if name in part_stems or self._inode(name) in ignored:
+                    finals.remove(name)
+            ignored = self._ignored_inodes(current)
+
+            for temp in sorted(name for name in vanished if _is_temp(name)):
+                # Pair each vanished temp file with what it was renamed to: its final
+                # file, or a temp file with the real filename
+                stem = _strip_temp(temp)
+                if stem in finals:
+                    dest = stem
+                elif len(finals) == 1:
+                    dest = finals[0]
+                elif len(temps) == 1:
+                    dest = temps[0]
+                else:
+                    self._on_deleted(temp)
+                    continue
+                (finals if dest in finals else temps).remove(dest)
+                self._on_moved(temp, dest)
+            for name in temps + finals:
+                self._on_created(name)
+            previous = current
+
+    def _inode(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _ignored_inodes(self, names: Set[str]) -> Set[Tuple[int, int]]:
+        """
+        Inodes of the files the tracker ignores, so the scan can recognise them after a rename.
+        """
+        inodes = {self._inode(name) for name in names if name.endswith(IGNORED_SUFFIXES)}
+        inodes.discard(None)
+        return inodes
+
+    # ─────────── Attribution ─────────── #
+
+    def _on_created(self, name: str) -> None:
+        if name.startswith(".") or name.endswith(IGNORED_SUFFIXES):
+            return
+        with self._lock:
+            if _is_temp(name):
+                for ticket in self._pending:
+                    if ticket.temp is None:
+                        ticket.temp = name
+                        ticket.started_at = time.monotonic()
+                        ticket.started.set()
+                        return
+            else:
+                # A download that skipped the temp file (tiny files)
+                for ticket in self._pending:
+                    if ticket.temp is None and name not in ticket.baseline:
+                        self._finish(ticket, name)
+                        return
+
+    def _on_moved(self, src: str, dest: str) -> None:
+        with self._lock:
+            for ticket in self._pending:
+                if ticket.temp == src:
+                    if _is_temp(dest):
+                        # Chrome renames "Unconfirmed 123.crdownload" once it knows the filename
+                        ticket.temp = dest
+                    else:
+                        self._finish(ticket, dest)
+                    return
+        # Renames of untracked Chrome downloads or of our own .part files are not ours to claim
+        if not _is_temp(src) and not src.endswith(IGNORED_SUFFIXES):
+            self._on_created(dest)
+
+    def _on_deleted(self, name: str) -> None:
+        with self._lock:
+            for ticket in self._pending:
+                if ticket.temp == name:
+                    self._finish(ticket, None, "download was cancelled")
+                    return
+
+    def _finish(self, ticket: DownloadTicket, name: Optional[str], error: Optional[str] = None) -> None:
+        """
+        Resolves a ticket. Must be called with the lock held.
+        """
+        ticket.path = os.path.join(self.directory, name) if name else None
+        ticket.error = error
+        ticket.finished_at = time.monotonic()
+        if ticket.started_at is None and name:
+            ticket.started_at = ticket.finished_at
+        self._pending.remove(ticket)
+        ticket.started.set()
+        ticket.done.set()
+        self._resolved.notify_all()
+
+    # ─────────── Public API ─────────── #
+
+    def expect(self, label: Optional[str] = None) -> DownloadTicket:
+        """
+        Registers a download that is about to be triggered.
+
+        Call this before the click/navigation that starts the download, so the
+        ticket cannot miss its events. Tickets are matched to new downloads in
+        the order they were registered.
+
+        Args:
+            label (Optional[str]): Free-form name for logging (e.g. the URL).
+
+        Returns:
+            DownloadTicket: Resolved when the download finishes.
+        """
+        with self._lock:
+            ticket = DownloadTicket(label, self._listdir())
+            self._pending.append(ticket)
+        return ticket
+
+    def wait(
+        self,
+        ticket: DownloadTicket,
+        timeout: float = DOWNLOAD_TIMEOUT,
+        start_timeout: float = START_TIMEOUT,
+    ) -> Optional[str]:
+        """
+        Blocks until a ticket's download has finished.
+
+        Args:
+            ticket (DownloadTicket): Ticket from expect().
+            timeout (float): Seconds the whole download may take.
+            start_timeout (float): Seconds to wait for the download to start at all.
+
+        Returns:
+            Optional[str]: Path of the finished file, or None (see ticket.error).
+        """
+        deadline = time.monotonic() + timeout
+        if not ticket.started.wait(min(start_timeout, timeout)):
+            self.cancel(ticket, f"download did not start within {start_timeout:.0f} seconds")
+            return None
+        if not ticket.done.wait(max(0.0, deadline - time.monotonic())):
+            self.cancel(ticket, f"download did not finish within {timeout:.0f} seconds")
+            return None
+        return ticket.path
+
+    def wait_any(self, tickets: List[DownloadTicket], timeout: Optional[float] = None) -> List[DownloadTicket]:
+        """
+        Blocks until at least one of several tickets has resolved.
+
+        Args:
+            tickets (List[DownloadTicket]): Tickets from expect().
+            timeout (Optional[float]): Seconds to wait; None waits indefinitely.
+
+        Returns:
+            List[DownloadTicket]: The resolved tickets, empty if the timeout passed first.
+        """
+        with self._resolved:
+            self._resolved.wait_for(lambda: any(ticket.done.is_set() for ticket in tickets), timeout)
+        return [ticket for ticket in tickets if ticket.done.is_set()]
+
+    def cancel(self, ticket: DownloadTicket, error: str) -> None:
+        """
+        Gives up on a ticket so later downloads are not attributed to it.
+        """
+        with self._lock:
+            if ticket in self._pending:
+                self._finish(ticket, None, error)
+
+    def _listdir(self) -> Set[str]:
+        try:
+            return {entry.name for entry in os.scandir(self.directory) if entry.is_file()}
+        except OSError:
+            return set()
+
+    def close(self) -> None:
+        """
+        Stops watching the directory.
+        """
+        self._closed.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "DownloadTracker":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _is_temp(name: str) -> bool:
+    return name.endswith(TEMP_SUFFIXES)
+
+
+def _strip_temp(name: str) -> str:
+    for suffix in TEMP_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+# ─────────── inotify (Linux) ─────────── #
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+def _inotify_watch(directory: str) -> Optional[int]:
+    """
+    Opens an inotify descriptor watching a directory, or None if inotify is unavailable.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CREATE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
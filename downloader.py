@@ -1,19 +1,26 @@
 import lzma
 import json
-from typing import Any, List, Union
+from typing import Any, Dict, Iterable, List, Union
 
 import os
 import time
 from typing import Optional
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+import browser_pool
+import demo_download
+import demo_extract
+import demo_index
+import demo_store
+import disk_budget
+import download_metrics
+import download_watch
+import hltv_http
+
 # This might not be used. Forgot //change
 
 # def find_match_ids(data: Union[dict, list]) -> List[Any]:
@@ -62,325 +69,479 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 #     main()
 
 DRIVER_LOCATION = "chromedriver-win64/chromedriver-win64/chromedriver.exe"
+PAGE_TIMEOUT = 15  # seconds for a match page (and its demo links) to load
+MAX_PARALLEL_DOWNLOADS = 6  # browser downloads in flight before the next click waits for one to finish
 
-def download_hltv_demos(
-    match_url: str = "https://www.hltv.org/matches/2354343/wisla-krakow-vs-fnatic-iem-katowice-2022-play-in",
-    download_dir: Optional[str] = None
-) -> None:
+# Updated selectors specifically for HLTV demo links
+DEMO_SELECTORS = [
+    # Primary selector for HLTV demo links with data-demo-link attribute
+    "//a[@data-demo-link-button]",
+    "//a[contains(@data-demo-link, '/download/demo')]",
+    "//a[@class='stream-box'][@data-demo-link-button]",
+
+    # Fallback selectors
+    "//a[contains(@href, '/download/demo')]",
+    "//a[contains(@data-demo-link, 'demo')]",
+    "//a[@data-demo-link]",
+
+    # Additional fallback selectors
+    "//a[contains(text(), 'Demo')]",
+    "//div[contains(text(), 'Demo')]/..//a",
+    "//div[contains(text(), 'GOTV')]/..//a",
+]
+
+
+def read_match_urls(match_urls: Union[str, Iterable[str]]) -> List[str]:
     """
-    Download demo files from a given HLTV match page using Selenium.
+    Normalizes the batch input: a file with one match URL per line, a single URL, or a list.
+
+    Args:
+        match_urls (Union[str, Iterable[str]]): File path, URL, or iterable of URLs.
+
+    Returns:
+        List[str]: Match URLs in order, without duplicates or blank lines.
+    """
+    if isinstance(match_urls, str):
+        if os.path.isfile(match_urls):
+            with open(match_urls, "r", encoding="utf-8") as f:
+                match_urls = [line.strip() for line in f]
+        else:
+            match_urls = [match_urls]
+    return list(dict.fromkeys(url for url in match_urls if url))
+
+
+def find_demo_links(driver, match_url: str) -> list:
+    """
+    Loads a match page and returns its demo link elements.
+
+    Waits for the document and then for the first demo link to appear, instead
+    of sleeping for a fixed time, so fast pages are not held up.
 
     Args:
+        driver: Selenium WebDriver.
         match_url (str): URL of the HLTV match page.
+
+    Returns:
+        list: Demo link WebElements (empty if none were found).
+    """
+    print(f"Loading page: {match_url}")
+    driver.get(match_url)
+
+    # Wait for page to load properly
+    wait = WebDriverWait(driver, PAGE_TIMEOUT)
+    wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
+
+    # Scroll to bottom to ensure all content is loaded
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+    # Dynamic content: wait until the first demo link exists (pages without demos time out here)
+    try:
+        wait.until(lambda d: d.find_elements(By.XPATH, " | ".join(DEMO_SELECTORS[:3])))
+    except TimeoutException:
+        pass
+    # Lets get_download_links reuse the page instead of fetching it again
+    hltv_http.store_html(match_url, driver.page_source)
+
+    demo_links = []
+    successful_selector = None
+
+    for selector in DEMO_SELECTORS:
+        try:
+            print(f"Trying selector: {selector}")
+            links = driver.find_elements(By.XPATH, selector)
+            if links:
+                demo_links.extend(links)
+                successful_selector = selector
+                print(f"✓ Found {len(links)} demo link(s) with selector: {selector}")
+                break
+            else:
+                print(f"✗ No links found with selector: {selector}")
+        except NoSuchElementException:
+            print(f"✗ Selector failed: {selector}")
+            continue
+
+    if not demo_links:
+        print("\nNo demo links found with any selector.")
+        print("Debugging information:")
+        print(f"Page title: {driver.title}")
+        print(f"Current URL: {driver.current_url}")
+
+        # Check if we can find demo-related elements
+        demo_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'Demo') or contains(text(), 'GOTV')]")
+        if demo_elements:
+            print(f"Found {len(demo_elements)} elements containing 'Demo' or 'GOTV' text")
+            for i, elem in enumerate(demo_elements[:3]):  # Print first 3
+                try:
+                    print(f"  Element {i+1}: {elem.tag_name} - '{elem.text[:50]}...'")
+                except:
+                    print(f"  Element {i+1}: Unable to get text")
+
+        # Check page source for demo-related content
+        page_source = driver.page_source
+        if "data-demo-link" in page_source:
+            print("✓ Found 'data-demo-link' in page source")
+            # Extract demo links from page source for debugging
+            import re
+            demo_pattern = r'data-demo-link="([^"]*)"'
+            matches = re.findall(demo_pattern, page_source)
+            if matches:
+                print(f"Found demo links in source: {matches}")
+        else:
+            print("✗ No 'data-demo-link' found in page source")
+
+        if "demo" in page_source.lower():
+            print("✓ Found 'demo' text in page source")
+        else:
+            print("✗ No 'demo' text found in page source")
+        return []
+
+    print(f"\nFound {len(demo_links)} demo link(s) total using selector: {successful_selector}")
+    return demo_links
+
+
+def click_demo_link(driver, link, full_url: str, ticket: download_watch.DownloadTicket) -> bool:
+    """
+    Triggers a demo download: regular click, then JavaScript click, then a new tab.
+
+    Args:
+        driver: Selenium WebDriver.
+        link: Demo link WebElement.
+        full_url (str): Absolute download URL (for the new-tab fallback).
+        ticket (download_watch.DownloadTicket): Ticket registered for this download.
+
+    Returns:
+        bool: False if every method failed.
+    """
+    # Method 1: Try clicking the original element first
+    try:
+        print(f"  Method 1: Clicking original demo button...")
+        # Scroll element into view
+        driver.execute_script("arguments[0].scrollIntoView(true);", link)
+
+        # Try regular click first
+        link.click()
+        print(f"  ✓ Regular click successful")
+        return True
+    except Exception as click_error:
+        print(f"  ✗ Regular click failed: {click_error}")
+
+    # Try JavaScript click
+    try:
+        print(f"  Method 2: JavaScript click...")
+        driver.execute_script("arguments[0].click();", link)
+        print(f"  ✓ JavaScript click successful")
+        return True
+    except Exception as js_error:
+        print(f"  ✗ JavaScript click failed: {js_error}")
+
+    # Method 3: Direct navigation as last resort
+    try:
+        print(f"  Method 3: Direct navigation to download URL...")
+        # Open in new tab to avoid losing current page
+        driver.execute_script(f"window.open('{full_url}', '_blank');")
+
+        # Switch to new tab and keep it open until the download has started
+        driver.switch_to.window(driver.window_handles[-1])
+        ticket.started.wait(download_watch.START_TIMEOUT)
+
+        # Close the tab and switch back
+        driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+
+        print(f"  ✓ Direct navigation completed")
+        return True
+    except Exception as nav_error:
+        print(f"  ✗ Direct navigation failed: {nav_error}")
+        return False
+
+
+def download_hltv_demos_batch(
+    match_urls: Union[str, Iterable[str]],
+    download_dir: Optional[str] = None,
+    extract: bool = True,
+    delete_archives: bool = demo_extract.DELETE_ARCHIVES,
+    quota: Optional[int] = disk_budget.QUOTA_BYTES,
+    max_parallel: int = MAX_PARALLEL_DOWNLOADS,
+    download_timeout: float = download_watch.DOWNLOAD_TIMEOUT,
+) -> Dict[str, List[str]]:
+    """
+    Download the demos of many HLTV match pages in one browser session.
+
+    Match pages are visited back to back: each demo is clicked, and as soon as
+    its download has started the next one is queued, so all downloads run
+    concurrently (up to `max_parallel`) while further pages load. Finished
+    downloads are stored, extracted and measured as they complete, and the
+    batch ends when the slowest download does.
+
+    Args:
+        match_urls (Union[str, Iterable[str]]): Match page URLs, or a file with one per line.
         download_dir (Optional[str]): Directory to save the downloaded demos.
+        extract (bool): Unpack each archive into a per-match folder as soon as it finishes.
+        delete_archives (bool): Remove archives after successful extraction.
+        quota (Optional[int]): Max bytes of downloads in download_dir; demos that would exceed
+            it (or the free disk space) are skipped before they are clicked.
+        max_parallel (int): Browser downloads in flight at once.
+        download_timeout (float): Seconds each download may take once clicked.
+
+    Returns:
+        Dict[str, List[str]]: Downloaded files per match URL.
     """
+    match_urls = read_match_urls(match_urls)
     if download_dir is None:
         download_dir = os.path.join(os.getcwd(), "hltv_demos")
 
     os.makedirs(download_dir, exist_ok=True)
     print(f"Download directory: {download_dir}")
-
-    # Chrome options configuration
-    chrome_options = Options()
-    chrome_options.add_experimental_option("prefs", {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": False,  # Disable safe browsing that might block downloads
-        "safebrowsing.disable_download_protection": True,
-        "profile.default_content_setting_values.automatic_downloads": 1,
-        "profile.default_content_settings.popups": 0,
-        "profile.managed_default_content_settings.images": 2  # Don't load images to speed up
-    })
-    # Remove headless mode to see what's happening
-    # chrome_options.add_argument("--headless=new")  # Commented out for debugging
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Hide automation
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-    # Use the correct driver path
-    service = Service(executable_path=DRIVER_LOCATION)
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    # Execute script to hide webdriver property
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    print(f"Matches to process: {len(match_urls)}")
+
+    # Launch Chrome through the shared builder, with download-friendly preferences
+    driver = browser_pool.create_driver(
+        download_path=download_dir,
+        driver_path=DRIVER_LOCATION,
+        extra_prefs={
+            "safebrowsing.enabled": False,  # Disable safe browsing that might block downloads
+            "safebrowsing.disable_download_protection": True,
+            "profile.default_content_setting_values.automatic_downloads": 1,
+            "profile.default_content_settings.popups": 0,
+            "profile.managed_default_content_settings.images": 2  # Don't load images to speed up
+        },
+        implicit_wait=0,
+    )
+    # Resolves each clicked demo the moment Chrome renames its .crdownload file
+    tracker = download_watch.DownloadTracker(download_dir)
+    # Space is reserved per demo before its click, and released once the download is resolved
+    budget = disk_budget.DiskBudget(download_dir, quota=quota)
+    # Unpacks finished archives in worker processes while other demos are still downloading
+    extractor = demo_extract.ExtractionPool(delete_archives=delete_archives, budget=budget) if extract else None
+    # Demos already in the content-addressed store are not downloaded again
+    store = demo_store.DemoStore()
+    # Time to first byte, duration and throughput per demo; JSON summary at the end
+    metrics = download_metrics.DownloadMetrics()
+    metrics.serve()
+
+    in_flight: List[download_watch.DownloadTicket] = []
+    reservations: Dict[download_watch.DownloadTicket, disk_budget.Reservation] = {}
+    demo_matches: Dict[int, List[str]] = {}  # every match page linking a demo, for the store
+    clicked_demos = set()
+    downloaded: Dict[str, List[str]] = {url: [] for url in match_urls}
+    ticket_matches: Dict[download_watch.DownloadTicket, str] = {}
+    failed = []
+
+    def finish(ticket: download_watch.DownloadTicket) -> None:
+        """Hand a resolved download to the store, the extractor and the metrics."""
+        reservations[ticket].release()
+        metrics.observe_ticket(ticket)
+        path = ticket.path
+        if path is None:
+            print(f"  ✗ {ticket.label}: {ticket.error}")
+            failed.append(ticket.label)
+            return
+        size_mb = os.path.getsize(path) / (1024 * 1024) if os.path.exists(path) else 0.0
+        seconds = ticket.finished_at - ticket.created_at
+        print(f"  ✓ {os.path.basename(path)} finished ({size_mb:.2f} MB in {seconds:.1f}s, {size_mb / max(seconds, 1e-3):.2f} MB/s)")
+        demo_id = demo_index.parse_demo_id(ticket.label)
+        downloaded[ticket_matches[ticket]].append(path)
+        try:
+            store.add(path, demo_id, demo_matches.get(demo_id, [ticket_matches[ticket]]))
+        except Exception as e:
+            print(f"  ? Could not add {path} to the demo store: {e}")
+        if extractor is not None:
+            extractor.submit(path)
+
+    def collect(block: bool) -> None:
+        """Finish resolved downloads; with block, first wait until at least one resolves."""
+        # Tickets resolve from the tracker's thread, which wakes us; the timeout only
+        # enforces the time limit of the oldest download
+        while block and in_flight:
+            deadline = min(ticket.created_at for ticket in in_flight) + download_timeout
+            if tracker.wait_any(in_flight, deadline - time.monotonic()):
+                break
+            for ticket in in_flight:
+                if time.monotonic() - ticket.created_at > download_timeout:
+                    tracker.cancel(ticket, f"download did not finish within {download_timeout:.0f} seconds")
+        for ticket in [ticket for ticket in in_flight if ticket.done.is_set()]:
+            in_flight.remove(ticket)
+            finish(ticket)
 
     try:
-        print(f"Loading page: {match_url}")
-        driver.get(match_url)
-        
-        # Wait for page to load properly
-        wait = WebDriverWait(driver, 15)
-        wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
-        
-        # Additional wait for dynamic content
-        time.sleep(5)  # Increased wait time
-        
-        # Scroll to bottom to ensure all content is loaded
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(3)
-
-        # Updated selectors specifically for HLTV demo links
-        demo_selectors = [
-            # Primary selector for HLTV demo links with data-demo-link attribute
-            "//a[@data-demo-link-button]",
-            "//a[contains(@data-demo-link, '/download/demo')]",
-            "//a[@class='stream-box'][@data-demo-link-button]",
-            
-            # Fallback selectors
-            "//a[contains(@href, '/download/demo')]",
-            "//a[contains(@data-demo-link, 'demo')]",
-            "//a[@data-demo-link]",
-            
-            # Additional fallback selectors
-            "//a[contains(text(), 'Demo')]",
-            "//div[contains(text(), 'Demo')]/..//a",
-            "//div[contains(text(), 'GOTV')]/..//a",
-        ]
-        
-        demo_links = []
-        successful_selector = None
-        
-        for selector in demo_selectors:
+        for match_number, match_url in enumerate(match_urls, start=1):
+            print(f"\n{'='*60}")
+            print(f"Match {match_number}/{len(match_urls)}")
             try:
-                print(f"Trying selector: {selector}")
-                links = driver.find_elements(By.XPATH, selector)
-                if links:
-                    demo_links.extend(links)
-                    successful_selector = selector
-                    print(f"✓ Found {len(links)} demo link(s) with selector: {selector}")
-                    break
-                else:
-                    print(f"✗ No links found with selector: {selector}")
-            except NoSuchElementException:
-                print(f"✗ Selector failed: {selector}")
+                demo_links = find_demo_links(driver, match_url)
+            except TimeoutException:
+                print("Page load timeout. The page might be taking too long to load.")
+                continue
+            except Exception as e:
+                print(f"✗ Could not load {match_url}: {e}")
                 continue
-        
-        if not demo_links:
-            print("\nNo demo links found with any selector.")
-            print("Debugging information:")
-            print(f"Page title: {driver.title}")
-            print(f"Current URL: {driver.current_url}")
-            
-            # Check if we can find demo-related elements
-            demo_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'Demo') or contains(text(), 'GOTV')]")
-            if demo_elements:
-                print(f"Found {len(demo_elements)} elements containing 'Demo' or 'GOTV' text")
-                for i, elem in enumerate(demo_elements[:3]):  # Print first 3
-                    try:
-                        print(f"  Element {i+1}: {elem.tag_name} - '{elem.text[:50]}...'")
-                    except:
-                        print(f"  Element {i+1}: Unable to get text")
-            
-            # Check page source for demo-related content
-            page_source = driver.page_source
-            if "data-demo-link" in page_source:
-                print("✓ Found 'data-demo-link' in page source")
-                # Extract demo links from page source for debugging
-                import re
-                demo_pattern = r'data-demo-link="([^"]*)"'
-                matches = re.findall(demo_pattern, page_source)
-                if matches:
-                    print(f"Found demo links in source: {matches}")
-            else:
-                print("✗ No 'data-demo-link' found in page source")
-            
-            if "demo" in page_source.lower():
-                print("✓ Found 'demo' text in page source")
-            else:
-                print("✗ No 'demo' text found in page source")
-                
-            return
-
-        print(f"\nFound {len(demo_links)} demo link(s) total using selector: {successful_selector}")
 
-        # Remove duplicates while preserving order
-        unique_links = []
-        seen_identifiers = set()
-        
-        for link in demo_links:
-            # Use data-demo-link attribute or href as identifier
-            identifier = link.get_attribute("data-demo-link") or link.get_attribute("href")
-            if identifier and identifier not in seen_identifiers:
+            # Remove duplicates while preserving order
+            unique_links = []
+            for link in demo_links:
+                # Use the demo ID (or the raw data-demo-link/href) as identifier
+                identifier = link.get_attribute("data-demo-link") or link.get_attribute("href")
+                demo_id = demo_index.parse_demo_id(identifier)
+                key = demo_id if demo_id is not None else identifier
+                if not identifier:
+                    continue
+                if demo_id is not None:
+                    if match_url not in demo_matches.setdefault(demo_id, []):
+                        demo_matches[demo_id].append(match_url)
+                    # Stored demos (including ones finished earlier in this batch) are
+                    # skipped below, so their association is recorded right away
+                    try:
+                        store.link_matches(demo_id, [match_url])
+                    except Exception as e:
+                        print(f"  ? Could not record {match_url} for demo {demo_id}: {e}")
+                if key in clicked_demos:
+                    continue
+                clicked_demos.add(key)
+                if demo_id is not None and store.has_demo(demo_id):
+                    print(f"  Demo link: {identifier} (already in store: {store.demo_path(demo_id)})")
+                    continue
                 unique_links.append(link)
-                seen_identifiers.add(identifier)
                 print(f"  Demo link: {identifier}")
 
-        print(f"Unique demo links to download: {len(unique_links)}")
+            print(f"Unique demo links to download: {len(unique_links)}")
 
-        # Download each demo
-        for index, link in enumerate(unique_links, start=1):
-            try:
-                # Get both data-demo-link and href attributes
-                demo_link = link.get_attribute("data-demo-link")
-                href = link.get_attribute("href")
-                
-                print(f"\nAttempting to download demo {index}:")
-                print(f"  data-demo-link: {demo_link}")
-                print(f"  href: {href}")
-                
-                # For HLTV, if there's a data-demo-link, we need to construct the full URL
-                if demo_link:
-                    # Construct the full download URL
-                    if demo_link.startswith('/'):
-                        full_url = f"https://www.hltv.org{demo_link}"
-                    else:
-                        full_url = demo_link
-                    
+            # Queue each demo; downloads keep running while the next ones are clicked
+            for index, link in enumerate(unique_links, start=1):
+                ticket = None
+                try:
+                    # Get both data-demo-link and href attributes
+                    demo_link = link.get_attribute("data-demo-link")
+                    href = link.get_attribute("href")
+
+                    print(f"\nAttempting to download demo {index}:")
+                    print(f"  data-demo-link: {demo_link}")
+                    print(f"  href: {href}")
+
+                    # For HLTV, if there's a data-demo-link, we need to construct the full URL
+                    if not demo_link:
+                        continue
+                    full_url = f"https://www.hltv.org{demo_link}" if demo_link.startswith('/') else demo_link
                     print(f"  Full download URL: {full_url}")
-                    
-                    # Method 1: Try clicking the original element first
-                    try:
-                        print(f"  Method 1: Clicking original demo button...")
-                        # Scroll element into view
-                        driver.execute_script("arguments[0].scrollIntoView(true);", link)
-                        time.sleep(1)
-                        
-                        # Try regular click first
-                        link.click()
-                        print(f"  ✓ Regular click successful")
-                        time.sleep(10)  # Wait longer for download to start
-                        
-                    except Exception as click_error:
-                        print(f"  ✗ Regular click failed: {click_error}")
-                        
-                        # Try JavaScript click
-                        try:
-                            print(f"  Method 2: JavaScript click...")
-                            driver.execute_script("arguments[0].click();", link)
-                            print(f"  ✓ JavaScript click successful")
-                            time.sleep(10)
-                        except Exception as js_error:
-                            print(f"  ✗ JavaScript click failed: {js_error}")
-                            
-                            # Method 3: Direct navigation as last resort
-                            try:
-                                print(f"  Method 3: Direct navigation to download URL...")
-                                # Open in new tab to avoid losing current page
-                                driver.execute_script(f"window.open('{full_url}', '_blank');")
-                                
-                                # Switch to new tab
-                                driver.switch_to.window(driver.window_handles[-1])
-                                time.sleep(10)
-                                
-                                # Close the tab and switch back
-                                driver.close()
-                                driver.switch_to.window(driver.window_handles[0])
-                                
-                                print(f"  ✓ Direct navigation completed")
-                            except Exception as nav_error:
-                                print(f"  ✗ Direct navigation failed: {nav_error}")
-                                continue
-                
-                # Check if download started by looking for new files
-                current_files = set(os.listdir(download_dir)) if os.path.exists(download_dir) else set()
-                time.sleep(2)
-                new_files = set(os.listdir(download_dir)) if os.path.exists(download_dir) else set()
-                
-                if new_files - current_files:
-                    print(f"  ✓ Download appears to have started (new files detected)")
-                else:
-                    print(f"  ? No new files detected immediately")
-                
-            except Exception as e:
-                print(f"  ✗ Error with demo {index}: {e}")
-                continue
 
-        # Wait for downloads to complete with more thorough checking
-        print("\nWaiting for downloads to complete...")
-        max_wait_time = 600  # 10 minutes max wait (demos can be large)
-        wait_time = 0
-        check_interval = 5  # Check every 5 seconds
-        
-        initial_files = set(os.listdir(download_dir)) if os.path.exists(download_dir) else set()
-        
-        while wait_time < max_wait_time:
-            try:
-                current_files = set(os.listdir(download_dir)) if os.path.exists(download_dir) else set()
-                
-                # Check for temporary download files
-                temp_files = [f for f in current_files if f.endswith(('.crdownload', '.tmp', '.part', '.download'))]
-                
-                # Check for new files (completed or in progress)
-                new_files = current_files - initial_files
-                
-                if temp_files:
-                    print(f"Downloads in progress: {len(temp_files)} file(s)")
-                    for temp_file in temp_files:
-                        temp_path = os.path.join(download_dir, temp_file)
-                        if os.path.exists(temp_path):
-                            size_mb = os.path.getsize(temp_path) / (1024 * 1024)
-                            print(f"  - {temp_file} ({size_mb:.2f} MB)")
-                elif new_files:
-                    print(f"New files detected: {len(new_files)}")
-                    break
-                elif wait_time == 0:
-                    print("No downloads detected yet, continuing to wait...")
-                
-                time.sleep(check_interval)
-                wait_time += check_interval
-                
-                # Print progress every 30 seconds
-                if wait_time % 30 == 0 and wait_time > 0:
-                    print(f"Still waiting... ({wait_time}/{max_wait_time} seconds elapsed)")
-                
-            except OSError:
-                time.sleep(check_interval)
-                wait_time += check_interval
-
-        if wait_time >= max_wait_time:
-            print(f"Timeout reached ({max_wait_time} seconds). Stopping wait.")
-
-        # Check final results
-        try:
-            final_files = os.listdir(download_dir)
-            demo_files = [f for f in final_files if f.endswith(('.dem', '.zip', '.rar', '.7z', '.gz'))]
-            
-            print(f"\n{'='*50}")
-            print(f"DOWNLOAD SUMMARY")
-            print(f"{'='*50}")
-            print(f"Download directory: {download_dir}")
-            print(f"Total files found: {len(final_files)}")
-            print(f"Demo files: {len(demo_files)}")
-            print(f"{'='*50}")
-            
-            if demo_files:
-                for file in demo_files:
-                    file_path = os.path.join(download_dir, file)
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)  # Size in MB
-                    print(f"✓ {file} ({file_size:.2f} MB)")
-            else:
-                print("No demo files found. Possible issues:")
-                print("- Downloads may still be in progress")
-                print("- Files may have different extensions")
-                print("- Download may have failed")
-                print("\nAll files in directory:")
-                for file in final_files:
-                    print(f"  - {file}")
-                
-        except OSError as e:
-            print(f"Error checking download directory: {e}")
+                    # Finish what is done, and wait for a free slot if too many are running
+                    collect(block=False)
+                    while len(in_flight) >= max_parallel:
+                        collect(block=True)
+
+                    size = demo_download.probe_size(full_url)
+                    while True:
+                        try:
+                            reservation = budget.reserve(size, full_url, wait=False)
+                            break
+                        except disk_budget.InsufficientSpace as e:
+                            if not (e.deferrable and in_flight):
+                                raise
+                            # Running downloads may fail or turn out smaller; see once one is done
+                            print(f"  … Deferred: {e}")
+                            collect(block=True)
+                    print(f"  Reserved {reservation.size / (1024 * 1024):.2f} MB{'' if size is not None else ' (estimated)'}")
+
+                    # Registered before the click so the download's first event cannot be missed
+                    ticket = tracker.expect(full_url)
+                    reservations[ticket] = reservation
+                    ticket_matches[ticket] = match_url
+                    if not click_demo_link(driver, link, full_url, ticket):
+                        tracker.cancel(ticket, "every click method failed")
+                        finish(ticket)
+                        continue
+
+                    # Wait only for the start, so the file is attributed to this click
+                    if ticket.started.wait(download_watch.START_TIMEOUT):
+                        print(f"  ✓ Download started ({ticket.temp or ticket.path})")
+                        in_flight.append(ticket)
+                    else:
+                        tracker.cancel(ticket, f"download did not start within {download_watch.START_TIMEOUT:.0f} seconds")
+                        finish(ticket)
+                except disk_budget.InsufficientSpace as e:
+                    print(f"  ✗ Skipped: {e}")
+                except Exception as e:
+                    print(f"  ✗ Error with demo {index}: {e}")
+                    if ticket is not None and not ticket.done.is_set():
+                        tracker.cancel(ticket, str(e))
+                        finish(ticket)
+
+        # All clicks are queued; the batch takes as long as the slowest download
+        print(f"\nWaiting for {len(in_flight)} download(s) to complete...")
+        while in_flight:
+            collect(block=True)
+
+        if extractor is not None:
+            extractor.close()
+
+        # Summary
+        files = [path for paths in downloaded.values() for path in paths]
+        print(f"\n{'='*50}")
+        print(f"DOWNLOAD SUMMARY")
+        print(f"{'='*50}")
+        print(f"Download directory: {download_dir}")
+        print(f"Matches processed: {len(match_urls)}")
+        print(f"Demos downloaded: {len(files)}")
+        print(f"Demos failed: {len(failed)}")
+        print(f"{'='*50}")
+        for match_url, paths in downloaded.items():
+            for path in paths:
+                file_size = os.path.getsize(path) / (1024 * 1024) if os.path.exists(path) else 0.0  # Size in MB
+                print(f"✓ {os.path.basename(path)} ({file_size:.2f} MB) <- {match_url}")
+        return downloaded
 
-    except TimeoutException:
-        print("Page load timeout. The page might be taking too long to load.")
     except Exception as e:
         print(f"An error occurred: {e}")
         import traceback
         traceback.print_exc()
+        return downloaded
     finally:
+        tracker.close()
         driver.quit()
+        for reservation in reservations.values():
+            reservation.release()
+        metrics.close()
+        if extractor is not None:
+            extractor.close()
+        store.close()
+
+
+def download_hltv_demos(
+    match_url: str = "https://www.hltv.org/matches/2354343/wisla-krakow-vs-fnatic-iem-katowice-2022-play-in",
+    download_dir: Optional[str] = None,
+    extract: bool = True,
+    delete_archives: bool = demo_extract.DELETE_ARCHIVES,
+    quota: Optional[int] = disk_budget.QUOTA_BYTES,
+) -> None:
+    """
+    Download demo files from a given HLTV match page using Selenium.
+
+    Args:
+        match_url (str): URL of the HLTV match page.
+        download_dir (Optional[str]): Directory to save the downloaded demos.
+        extract (bool): Unpack each archive into a per-match folder as soon as it finishes.
+        delete_archives (bool): Remove archives after successful extraction.
+        quota (Optional[int]): Max bytes of downloads in download_dir; demos that would exceed
+            it (or the free disk space) are skipped before they are clicked.
+    """
+    download_hltv_demos_batch([match_url], download_dir, extract, delete_archives, quota)
 
 
 if __name__ == "__main__":
-    # Example usage
-    download_hltv_demos()
-    
+    import sys
+
+    if len(sys.argv) > 1:
+        # Batch: match URLs and/or files with one match URL per line
+        batch = []
+        for argument in sys.argv[1:]:
+            batch.extend(read_match_urls(argument))
+        download_hltv_demos_batch(batch)
+    else:
+        # Example usage
+        download_hltv_demos()
+
     # Or with custom parameters:
     # download_hltv_demos(
     #     match_url="https://www.hltv.org/matches/2354343/wisla-krakow-vs-fnatic-iem-katowice-2022-play-in",
     #     download_dir=r"C:\path\to\your\demo\folder"
-    # )
\ No newline at end of file
+    # )
+    # download_hltv_demos_batch("all_match_urls.txt")
@@ -1,52 +1,40 @@
 import time
 import os
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import threading
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 from urllib.parse import urlparse
 import shutil
 
-def setup_driver(headless=False, download_path=None):
-    """Setup and return Chrome WebDriver with download preferences."""
-    chrome_options = Options()
-    
-    if headless:
-        chrome_options.add_argument("--headless")
-    
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-software-rasterizer")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-logging")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
+import browser_pool
+import demo_download
+import demo_extract
+import demo_index
+import demo_store
+import disk_budget
+import download_metrics
+import download_scheduler
+import download_watch
+import hltv_http
+from rate_limit import AdaptiveRateLimiter
 
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    # Set download preferences
-    if download_path:
-        prefs = {
-            "download.default_directory": download_path,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
+DOWNLOADS_PER_SECOND = 0.2  # starting rate, adapted to 429s and challenge pages at runtime
+MAX_DOWNLOADS_PER_SECOND = 1.0
+DOWNLOAD_BURST = 1
+DOWNLOAD_WORKERS = download_scheduler.SCHEDULER_WORKERS  # concurrent direct HTTP transfers
+MAX_BYTES_PER_SECOND = download_scheduler.MAX_BYTES_PER_SECOND  # combined cap for all direct transfers, e.g. 5 * 1024 * 1024; None for unlimited
+DISK_QUOTA = None  # max bytes of demos in the download folder, e.g. 500 * 1024 ** 3; None for no quota
+MIN_FREE_SPACE = disk_budget.MIN_FREE_BYTES  # downloads that would leave less free space are deferred or rejected
+METRICS_PORT = download_metrics.METRICS_PORT  # Prometheus endpoint while downloading, None to disable
+PRIORITY_ORDER = download_scheduler.PRIORITY_ORDER  # within a priority: "newest" demo first or "file" order; an optional second column in the URL file sets the priority
+DOWNLOAD_TIMEOUT = 30 * 60  # seconds a browser download may take
+EXTRACT_ARCHIVES = True  # unpack each archive into a per-match folder as soon as it is downloaded
+DELETE_ARCHIVES = False  # remove archives after successful extraction
+ENGINE = "http"  # "http" streams demos directly (Selenium as fallback); "selenium" uses the browser for every demo
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.implicitly_wait(10)
-    return driver
+rate_limiter = AdaptiveRateLimiter(DOWNLOADS_PER_SECOND, DOWNLOAD_BURST, max_rate=MAX_DOWNLOADS_PER_SECOND)
+driver_pool = None
+driver_pool_lock = threading.Lock()
+download_tracker = None
 
 def create_download_folder():
     """Create hltv_demos folder if it doesn't exist."""
@@ -56,32 +44,24 @@ def create_download_folder():
     return folder_path
 
 def read_urls(filename="all_match_download_url.txt"):
-    """Read URLs from file."""
+    """Read URLs from file (optionally followed by a priority), one per demo ID. Falls back to the demo index if the file is missing."""
     if not os.path.exists(filename):
         print(f"File {filename} not found.")
-        return []
+        urls = demo_index.DemoIndex().work_list()
+        if urls:
+            print(f"Using {len(urls)} demos from '{demo_index.INDEX_FILE}'.")
+        return urls
     
     try:
         with open(filename, 'r', encoding='utf-8') as file:
-            urls = [line.strip() for line in file if line.strip()]
-            print(f"Found {len(urls)} URLs to process.")
+            lines = [line.strip() for line in file if line.strip()]
+            urls = demo_index.dedupe_demo_urls(lines)
+            print(f"Found {len(urls)} URLs to process ({len(lines) - len(urls)} duplicate or invalid lines skipped).")
             return urls
     except Exception as e:
         print(f"Error reading file: {e}")
         return []
 
-def handle_cookie_banner(driver):
-    """Handle cookie consent banner if present."""
-    try:
-        cookie_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.ID, "CybotCookiebotDialogBodyButtonDecline"))
-        )
-        cookie_button.click()
-        time.sleep(1)
-        print("Cookie banner handled.")
-    except:
-        pass
-
 def get_filename_from_url(url):
     """Extract filename from URL or generate one."""
     parsed_url = urlparse(url)
@@ -89,100 +69,95 @@ def get_filename_from_url(url):
     
     # If no filename in URL, generate one
     if not filename or '.' not in filename:
-        # Extract match ID or use timestamp
-        if 'download' in url and 'demoid' in url:
+        # Use the demo ID (/download/demo/<id> or ?demoid=<id>), timestamp as a last resort
+        demo_id = demo_index.parse_demo_id(url)
+        if demo_id is None and 'demoid=' in url:
             demo_id = url.split('demoid=')[-1].split('&')[0]
+        if demo_id is not None:
             filename = f"demo_{demo_id}.dem"
         else:
             filename = f"demo_{int(time.time())}.dem"
     
     return filename
 
-def download_file_requests(url, download_path, filename):
-    """Download file using requests library."""
-    try:
-        print(f"Downloading {filename}...")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        file_path = os.path.join(download_path, filename)
-        
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        file_size = os.path.getsize(file_path)
-        print(f"Downloaded {filename} ({file_size} bytes)")
+def download_file_requests(url, download_path, filename=None):
+    """Download file over the shared keep-alive session, named from Content-Disposition."""
+    print(f"Downloading {filename or url}...")
+    result = demo_download.download_demo(url, download_path, rate_limiter)
+    if result.ok:
+        print(f"Downloaded {os.path.basename(result.path)} ({result.bytes} bytes)")
         return True
-        
-    except Exception as e:
-        print(f"Error downloading {filename}: {e}")
-        return False
-
-def wait_for_download_selenium(download_path, timeout=None):
-    """Wait for download to complete when using Selenium."""
-    start_time = time.time()
-    
-    while timeout is None or  time.time() - start_time < timeout:
-        # Check for .crdownload files (Chrome partial downloads)
-        temp_files = [f for f in os.listdir(download_path) if f.endswith('.crdownload')]
-        if not temp_files:
-            # No partial downloads, check if any new files were created
-            files = os.listdir(download_path)
-            if files:
-                return True
-        time.sleep(1)
-    
+    print(f"Error downloading {url}: {result.error}")
     return False
 
-def process_download_url_with_fresh_driver(url, download_path, headless=False):
-    """Process single download URL with a fresh driver instance."""
-    driver = None
+def get_download_tracker(download_path):
+    """Return the shared download tracker for the demo folder, starting it on first use."""
+    global download_tracker
+    with driver_pool_lock:
+        if download_tracker is None:
+            download_tracker = download_watch.DownloadTracker(download_path)
+        return download_tracker
+
+def wait_for_download_selenium(ticket, download_path, timeout=DOWNLOAD_TIMEOUT):
+    """Wait until the download registered as `ticket` has finished. Returns its path, or None."""
+    path = get_download_tracker(download_path).wait(ticket, timeout)
+    if path is None:
+        print(f"Download failed: {ticket.error}")
+        return None
+    print(f"Saved {os.path.basename(path)}")
+    return path
+
+def process_download_url_with_pool(url, download_path, pool):
+    """Process single download URL on a warm, already consented driver from the pool."""
     try:
         print(f"\nProcessing: {url}")
-        
-        # # First try with requests (faster and more reliable)
-        # filename = get_filename_from_url(url)
-        # if download_file_requests(url, download_path, filename):
-        #     return True
-        
-        # print("Requests method failed, trying with Selenium...")
-        
-        # Fallback to Selenium
-        driver = setup_driver(headless, download_path)
-        
-        # Navigate to URL
-        driver.get(url)
-        WebDriverWait(driver, 30).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        
-        # Handle cookie consent banner
-        handle_cookie_banner(driver)
-        
-        # The navigation to the URL should trigger the download
-        # Wait for download to complete
-        if wait_for_download_selenium(download_path):
-            print("Download completed via Selenium")
-            return True
-        else:
-            print("Download timeout via Selenium")
-            return False
-            
+
+        tracker = get_download_tracker(download_path)
+        with pool.driver() as driver:
+            # The navigation to the URL should trigger the download
+            rate_limiter.acquire(url)
+            ticket = tracker.expect(url)
+            try:
+                driver.get(url)
+            except Exception as e:
+                tracker.cancel(ticket, str(e))
+                raise
+            if hltv_http.report_response(rate_limiter, url, 200, {}, driver.page_source):
+                tracker.cancel(ticket, "bot challenge")
+                print(f"HLTV served a challenge for {url}, backing off")
+                return False
+
+            # Wait for download to complete
+            path = wait_for_download_selenium(ticket, download_path)
+            if path:
+                print("Download completed via Selenium")
+                return path
+            else:
+                print("Download timeout via Selenium")
+                return None
+
     except Exception as e:
         print(f"Error processing {url}: {e}")
         return False
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+
+def get_driver_pool(headless, download_path):
+    """Return the shared warm driver pool, launching it on first use."""
+    global driver_pool
+    with driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = browser_pool.DriverPool(size=1, headless=headless, download_path=download_path)
+        return driver_pool
+
+def close_driver_pool():
+    """Quit all pooled browsers and stop the download tracker, if they were started."""
+    global driver_pool, download_tracker
+    with driver_pool_lock:
+        if driver_pool is not None:
+            driver_pool.close()
+            driver_pool = None
+        if download_tracker is not None:
+            download_tracker.close()
+            download_tracker = None
 
 def main():
     """Main function."""
@@ -191,12 +166,7 @@ def main():
     # headless = False
     headless = True
     
-    # wait_input = input("Wait time between downloads (seconds) [default: 5]: ").strip()
-    wait_input = "5"
-    try:
-        wait_time = int(wait_input) if wait_input else 5
-    except ValueError:
-        wait_time = 5
+    # Downloads are paced by the adaptive rate limiter instead of a fixed wait
     
     # interactive_input = input("Interactive mode? (y/n) [default: n]: ").strip().lower()
     # interactive = interactive_input in ['y', 'yes']
@@ -214,39 +184,117 @@ def main():
         print("No URLs found. Please check the file 'all_match_download_url.txt'")
         return
     
+    # Demos already in the content-addressed store are skipped before any network traffic
+    store = demo_store.DemoStore()
+    index = demo_index.DemoIndex()
+    stored = len(urls)
+    urls = store.missing(urls)
+    print(f"{stored - len(urls)} demos already in '{demo_store.STORE_DIR}', {len(urls)} to download")
+    
+    # Most urgent demos first: explicit priority column, then newest (or file order)
+    priorities = download_scheduler.load_priorities(filename)
+    if priorities:
+        print(f"{len(priorities)} demos have an explicit priority")
+    bandwidth = download_scheduler.bandwidth_limiter(MAX_BYTES_PER_SECOND)
+    if bandwidth is not None:
+        print(f"Downloads capped at {MAX_BYTES_PER_SECOND / (1024 * 1024):.2f} MB/s")
+    
+    # Every download reserves its size before it starts, so a full disk rejects jobs instead of truncating files
+    budget = disk_budget.DiskBudget(download_path, quota=DISK_QUOTA, min_free=MIN_FREE_SPACE)
+    print(f"Disk space available for downloads: {budget.available() / 1024 ** 3:.2f} GB")
+    
+    # Per-transfer metrics: Prometheus endpoint while running, JSON summary at exit
+    metrics = download_metrics.DownloadMetrics()
+    metrics.gauge("pacing_rate_requests_per_second", "Current request rate per host", "host", rate_limiter.rates)
+    metrics.gauge("disk_available_bytes", "Bytes the disk budget can still admit", "directory", lambda: {download_path: budget.available()})
+    metrics.serve(METRICS_PORT)
+    
+    def keep(url, path):
+        """Move a finished download into the store (hardlinked back in place)."""
+        demo_id = demo_index.parse_demo_id(url)
+        try:
+            store.add(path, demo_id, index.matches_for(demo_id) if demo_id is not None else ())
+        except Exception as e:
+            print(f"Could not add {path} to the demo store: {e}")
+    
     successful_downloads = 0
     failed_downloads = 0
+    rejected_downloads = 0
+
+    # Archives are unpacked in worker processes while the next downloads run
+    extractor = demo_extract.ExtractionPool(delete_archives=DELETE_ARCHIVES, budget=budget) if EXTRACT_ARCHIVES else None
+
+    # Warm browsers with downloads pointed at the demo folder, launched on first Selenium use
+    def selenium_download(url):
+        return process_download_url_with_pool(url, download_path, get_driver_pool(headless, download_path))
     
     try:
-        for i, url in enumerate(urls, 1):
-            print(f"\n{'='*60}")
-            print(f"Processing {i}/{len(urls)}")
-            
-            # Process URL with fresh driver
-            success = process_download_url_with_fresh_driver(url, download_path, headless)
-            
-            if success:
-                successful_downloads += 1
-            else:
-                failed_downloads += 1
-            
-            if interactive:
-                user_input = input(f"\nPress Enter to continue (or 'q' to quit): ").strip().lower()
-                if user_input == 'q':
-                    break
-            
-            # Wait between downloads (except for last one)
-            if i < len(urls):
-                print(f"Waiting {wait_time} seconds before next download...")
-                time.sleep(wait_time)
+        if ENGINE == "http":
+            results = demo_download.download_demos(
+                urls, download_path, DOWNLOAD_WORKERS, rate_limiter, fallback=selenium_download,
+                priorities=priorities, order=PRIORITY_ORDER, bandwidth=bandwidth, budget=budget
+            )
+            for i, result in enumerate(results, 1):
+                print(f"[{i}/{len(urls)}] {result.status}: {result.url} -> {result.path or result.error}")
+                metrics.observe_result(result)
+                if result.ok:
+                    successful_downloads += 1
+                    keep(result.url, result.path)
+                    if extractor is not None:
+                        extractor.submit(result.path)
+                elif result.status == "rejected":
+                    rejected_downloads += 1
+                else:
+                    failed_downloads += 1
+        else:
+            for i, url in enumerate(download_scheduler.prioritize(urls, priorities, PRIORITY_ORDER), 1):
+                print(f"\n{'='*60}")
+                print(f"Processing {i}/{len(urls)}")
+                
+                # Chrome does not report the size up front; a HEAD probe does, else an estimate is reserved
+                try:
+                    reservation = budget.reserve(demo_download.probe_size(url, rate_limiter), url, wait=False)
+                except disk_budget.InsufficientSpace as e:
+                    print(f"Skipping {url}: {e}")
+                    rejected_downloads += 1
+                    continue
+                
+                # Process URL on a warm pooled driver
+                started = time.monotonic()
+                try:
+                    success = selenium_download(url)
+                finally:
+                    reservation.release()
+                size = os.path.getsize(success) if success and os.path.exists(success) else 0
+                metrics.observe("browser", "ok" if success else "failed", size, time.monotonic() - started)
+                
+                if success:
+                    successful_downloads += 1
+                    keep(url, success)
+                    if extractor is not None:
+                        extractor.submit(success)
+                else:
+                    failed_downloads += 1
+                
+                if interactive:
+                    user_input = input(f"\nPress Enter to continue (or 'q' to quit): ").strip().lower()
+                    if user_input == 'q':
+                        break
         
         # Summary
         print(f"\n{'='*60}")
         print("Download Summary:")
         print(f"Successful downloads: {successful_downloads}")
         print(f"Failed downloads: {failed_downloads}")
-        print(f"Total processed: {successful_downloads + failed_downloads}")
+        print(f"Rejected for lack of disk space: {rejected_downloads}")
+        print(f"Total processed: {successful_downloads + failed_downloads + rejected_downloads}")
         print(f"Files saved to: {download_path}")
+        if extractor is not None:
+            print("Waiting for archive extraction to finish...")
+            extracted = [result for result in extractor.close() if result.ok]
+            print(f"Archives extracted: {len(extracted)} ({sum(len(result.demos) for result in extracted)} demos)")
+        for host, rate in rate_limiter.rates().items():
+            print(f"Final pacing for {host}: {rate:.2f} downloads/s")
         
         # List downloaded files
         demo_files = [f for f in os.listdir(download_path) if f.endswith('.dem')]
@@ -261,6 +309,12 @@ def main():
         print("\nDownload interrupted by user.")
     except Exception as e:
         print(f"Unexpected error: {e}")
+    finally:
+        close_driver_pool()
+        if extractor is not None:
+            extractor.close()
+        store.close()
+        metrics.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
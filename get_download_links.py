@@ -1,45 +1,35 @@
 import time
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import re
+import html
+import itertools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 
-def setup_driver(headless=False):
-    """Setup and return Chrome WebDriver."""
-    chrome_options = Options()
-    
-    if headless:
-        chrome_options.add_argument("--headless")
-    
-    # chrome_options.add_argument("--no-sandbox")
-    # chrome_options.add_argument("--disable-dev-shm-usage")
-    # chrome_options.add_argument("--disable-gpu")
-    # chrome_options.add_argument("--window-size=1920,1080")
-    # chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-software-rasterizer")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-logging")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
-
-
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.implicitly_wait(10)
-    return driver
+import browser_pool
+import demo_index
+import hltv_http
+from rate_limit import AdaptiveRateLimiter
+
+DEMO_LINK_PATTERN = re.compile(rb'data-demo-link="([^"]*)"')
+STREAM_CHUNK_SIZE = 8192
+STREAM_TAIL_SIZE = 512  # bytes kept between chunks so an attribute split across them is still matched
+DEMO_BLOCK_TAIL = 16384  # bytes read past the first demo link to catch sibling links before closing
+RESOLVE_WORKERS = 4
+REQUESTS_PER_SECOND = 1.0  # starting rate per host, adapted to 429s and challenge pages at runtime
+MAX_REQUESTS_PER_SECOND = 4.0
+REQUEST_BURST = 3
+SELENIUM_POOL_SIZE = 1  # warm browsers kept for Selenium lookups and stream fallbacks
+JOURNAL_FILE = "demo_links_journal.jsonl"
+COMPACT_EVERY = 50  # journal entries between compactions
+
+rate_limiter = AdaptiveRateLimiter(REQUESTS_PER_SECOND, REQUEST_BURST, max_rate=MAX_REQUESTS_PER_SECOND)
+driver_pool = None
+driver_pool_lock = threading.Lock()
 
 def read_urls(filename="all_match_urls.txt"):
     """Read URLs from file."""
@@ -53,101 +43,223 @@ def read_urls(filename="all_match_urls.txt"):
         return []
 
 def extract_demo_link(driver, url):
-    """Extract demo links from current page."""
-    # demo_links = []
-    
-    try:
-        elements = driver.find_elements(By.CSS_SELECTOR, "[data-demo-link]")
-        
-        for element in elements:
-            demo_link = element.get_attribute("data-demo-link")
-            # if demo_link:
-            #     full_url = f"https://www.hltv.org{demo_link}" if demo_link.startswith('/') else demo_link
-            #     demo_links.append({
-            #         'source_url': url,
-            #         'demo_link': demo_link,
-            #         'full_demo_url': full_url
-            #     })
-    except:
-        pass
-    
-    # return demo_links
-    return demo_link
+    """Extract all demo links from current page. Empty list when the match has no demo."""
+    demo_links = []
 
-def handle_cookie_banner(driver):
-    """Handle cookie consent banner if present."""
-    try:
-        # Wait for cookie banner and click decline button
-        cookie_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "CybotCookiebotDialogBodyButtonDecline"))
-        )
-        cookie_button.click()
-        time.sleep(1)  # Brief pause after clicking
-    except:
-        # Cookie banner not present or already handled
-        pass
+    elements = driver.find_elements(By.CSS_SELECTOR, "[data-demo-link]")
+    for element in elements:
+        demo_link = element.get_attribute("data-demo-link")
+        if demo_link and demo_link not in demo_links:
+            demo_links.append(demo_link)
 
-def process_url(driver, url):
-    """Process single URL and return demo links."""
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 30).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        
-        # Handle cookie consent banner
-        handle_cookie_banner(driver)
+    return demo_links
 
-        # driver.close()
-        
-        return extract_demo_link(driver, url)
-    except:
-        return "None"
+def load_match_page(driver, url):
+    """Load a match page under the shared pacing. Returns False if HLTV served a challenge instead."""
+    rate_limiter.acquire(url)
+    driver.get(url)
+    WebDriverWait(driver, 30).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    return not hltv_http.report_response(rate_limiter, url, 200, {}, driver.page_source)
 
 def save_demo_links(demo_links, filename="all_match_download_url.txt"):
-    """Save demo links to file."""
+    """Save demo links to file, one download URL per demo ID. Non-demo values are dropped."""
     try:
         with open(filename, 'w', encoding='utf-8') as file:
-            for demo_data in demo_links:
-                # file.write(f"Source: {demo_data['source_url']}\n")
-                # file.write(f"Demo Link: {demo_data['demo_link']}\n")
-                # file.write(f"Full URL: {demo_data['full_demo_url']}\n")
-                # file.write("-" * 80 + "\n")
-                file.write(f"https://www.hltv.org{demo_data}\n")
-    except:
-        pass
+            for demo_url in demo_index.dedupe_demo_urls(demo_links):
+                file.write(f"{demo_url}\n")
+    except Exception as e:
+        print(f"Error saving demo links: {e}")
+
+def get_driver_pool(headless=False):
+    """Return the shared warm driver pool, launching it on first use."""
+    global driver_pool
+    with driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = browser_pool.DriverPool(size=SELENIUM_POOL_SIZE, headless=headless)
+        return driver_pool
 
-def process_single_url_with_fresh_driver(url, headless=False):
-    """Process single URL with a fresh driver instance."""
-    driver = None
+def close_driver_pool():
+    """Quit all pooled browsers, if any were launched."""
+    global driver_pool
+    with driver_pool_lock:
+        if driver_pool is not None:
+            driver_pool.close()
+            driver_pool = None
+
+def process_url_with_pool(url, headless=False):
+    """Process single URL on a warm, already consented driver from the pool."""
     try:
-        # Create fresh driver for this URL
-        driver = setup_driver(headless)
-        
-        # Navigate to URL
-        driver.get(url)
-        WebDriverWait(driver, 30).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        
-        # Handle cookie consent banner
-        handle_cookie_banner(driver)
-        
-        # Extract demo links
-        demo_link = extract_demo_link(driver, url)
-        print(demo_link)
-        
-        return demo_link
-        
+        with get_driver_pool(headless).driver() as driver:
+            if not load_match_page(driver, url):
+                return None
+
+            demo_link = extract_demo_link(driver, url)
+            hltv_http.store_html(url, driver.page_source)
+            print(demo_link)
+
+            return demo_link
+
     except:
-        return []
-    finally:
-        # Always close driver
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+        return None
+
+def demo_links_from_html(page):
+    """Extract every data-demo-link value from a full page."""
+    return [html.unescape(link.decode("utf-8")) for link in DEMO_LINK_PATTERN.findall(page.encode("utf-8"))]
+
+def stream_demo_links(url, timeout=15):
+    """Stream the raw match page and return its data-demo-link values.
+
+    The connection is closed as soon as DEMO_BLOCK_TAIL bytes have been read past the
+    first demo link, so most of the page (and none of its scripts/embeds) is never
+    transferred. What was read is stored in the page cache; it always covers the demo
+    block, which is all a rerun needs. Raises hltv_http.ChallengeError if HLTV serves a
+    bot challenge and hltv_http.ThrottledError on a 429; both are reported to the
+    adaptive rate limiter. Any other error status raises requests.HTTPError, so the
+    URL is retried instead of recorded as having no demo.
+    """
+    cached = hltv_http.cached_html(url)
+    if cached is not None:
+        return demo_links_from_html(cached)
+
+    rate_limiter.acquire(url)
+    demo_links = []
+    buffer = b""
+    chunks = []
+    received = 0
+    first_seen_at = None
+
+    with hltv_http.get_session().get(url, stream=True, timeout=timeout) as response:
+        # Judge the response before reading on: an error page may have an empty body,
+        # and must be retried rather than recorded as a match without demo
+        body = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        first = next(body, b"")
+        head = first.decode("utf-8", errors="replace")
+        throttled = hltv_http.report_response(rate_limiter, url, response.status_code, response.headers, head)
+        if response.headers.get("cf-mitigated") == "challenge" or hltv_http.looks_like_challenge(response.status_code, head):
+            raise hltv_http.ChallengeError(url, response.status_code)
+        if throttled:
+            raise hltv_http.ThrottledError(url)
+        response.raise_for_status()
+
+        for chunk in itertools.chain([first], body):
+            buffer += chunk
+            chunks.append(chunk)
+            received += len(chunk)
+
+            consumed = 0
+            for match in DEMO_LINK_PATTERN.finditer(buffer):
+                demo_links.append(html.unescape(match.group(1).decode("utf-8")))
+                consumed = match.end()
+
+            if demo_links and first_seen_at is None:
+                first_seen_at = received
+            if first_seen_at is not None and received - first_seen_at >= DEMO_BLOCK_TAIL:
+                break
+
+            buffer = buffer[max(consumed, len(buffer) - STREAM_TAIL_SIZE):]
+
+    hltv_http.store_html(url, b"".join(chunks).decode("utf-8", errors="replace"))
+    return demo_links
+
+def resolve_url(url, headless=False):
+    """Resolve one match URL by streaming, falling back to Selenium on a bot challenge.
+
+    A 429 is retried after the rate limiter has backed off. Returns (url, demo_links),
+    with demo_links None when the lookup failed and should be retried.
+    """
+    for attempt in range(hltv_http.THROTTLE_RETRIES + 1):
+        try:
+            return url, stream_demo_links(url)
+        except hltv_http.ThrottledError as e:
+            print(f"{e}, retrying at {rate_limiter.current_rate(url):.2f} req/s")
+        except hltv_http.ChallengeError as e:
+            print(f"{e}, falling back to Selenium")
+            break
+        except Exception as e:
+            print(f"Error streaming {url}: {e}")
+            return url, None
+    else:
+        return url, None
+
+    # The pool hands out one warm browser at a time, the fallback is heavy
+    return url, process_url_with_pool(url, headless)
+
+def resolve_demo_links(urls, headless=False, workers=RESOLVE_WORKERS):
+    """Resolve many match URLs concurrently, yielding (url, demo_links) in input order."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(lambda url: resolve_url(url, headless), urls)
+
+class DemoLinkJournal:
+    """Append-only log of resolved match URLs, so an interrupted run can resume.
+
+    Every result is written and fsynced as soon as it arrives. Every COMPACT_EVERY
+    entries the log is rewritten with one line per match URL. A torn last line from
+    a crash is ignored on load.
+    """
+
+    def __init__(self, filename=JOURNAL_FILE, compact_every=COMPACT_EVERY):
+        self.filename = filename
+        self.compact_every = compact_every
+        self.times = {}  # match_url: when it was resolved
+        self.results = self.load()
+        self.since_compact = 0
+        self.file = open(self.filename, 'a', encoding='utf-8')
+        # Start from a clean file so new lines never follow a torn one
+        self.compact()
+
+    def load(self):
+        """Read the journal into {match_url: demo_links}, later lines winning."""
+        results = {}
+        if not os.path.exists(self.filename):
+            return results
+
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    results[entry['match_url']] = entry['demo_links']
+                    self.times[entry['match_url']] = entry.get('time')
+                except (ValueError, KeyError):
+                    # Partially written line from an interrupted run
+                    continue
+        return results
+
+    def __contains__(self, url):
+        return url in self.results
+
+    def record(self, url, demo_links):
+        """Durably append one resolved URL."""
+        self.results[url] = demo_links
+        self.times[url] = time.time()
+        self.file.write(json.dumps({'match_url': url, 'demo_links': demo_links, 'time': self.times[url]}) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self.since_compact += 1
+        if self.since_compact >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal with one line per URL and swap it in atomically."""
+        self.file.close()
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as file:
+            for url, demo_links in self.results.items():
+                file.write(json.dumps({'match_url': url, 'demo_links': demo_links, 'time': self.times.get(url)}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_filename, self.filename)
+        self.file = open(self.filename, 'a', encoding='utf-8')
+        self.since_compact = 0
+
+    def close(self):
+        """Compact and close the journal."""
+        try:
+            self.compact()
+        finally:
+            self.file.close()
 
 def main():
     """Main function."""
@@ -155,16 +267,14 @@ def main():
     # headless = headless_input in ['y', 'yes']
     headless = False
     
-    # wait_input = input("Wait time between URLs (seconds) [default: 3]: ").strip()
-    wait_input = "5"
-    try:
-        wait_time = int(wait_input) if wait_input else 3
-    except ValueError:
-        wait_time = 3
+    # Page loads are paced by the shared adaptive rate limiter instead of a fixed wait
     
     # interactive_input = input("Interactive mode? (y/n) [default: n]: ").strip().lower()
     # interactive = interactive_input in ['y', 'yes']
     interactive = False
+
+    # "stream" reads the raw match HTML over HTTP; "selenium" renders every page in Chrome
+    resolver = "stream"
     
     filename = "all_match_urls.txt"
     
@@ -174,36 +284,64 @@ def main():
         print("No URLs found.")
         return
     
-    # Setup driver
-    driver = setup_driver(headless)
-    all_demo_links = []
+    # Skip everything an earlier (possibly interrupted) run already resolved, except
+    # matches whose "no demo" result has expired: their demo may be uploaded by now
+    journal = DemoLinkJournal()
+    index = demo_index.DemoIndex()
+    for url, demo_links in journal.results.items():
+        # Lines from before times were journaled count as expired
+        index.record(url, demo_links, journal.times.get(url) or 0.0)
+    remaining = [url for url in urls if not journal.results.get(url) and not index.has_no_demo(url)]
+    print(f"{len(urls) - len(remaining)} URLs already resolved, {len(remaining)} to go")
+
+    def record(url, demo_links):
+        journal.record(url, demo_links)
+        index.record(url, demo_links)
     
     try:
-        for i, url in enumerate(urls, 1):
+        if resolver == "stream":
+            for url, demo_links in resolve_demo_links(remaining, headless):
+                print(f"{url}: {demo_links}")
+                if demo_links is not None:
+                    record(url, demo_links)
+        else:
+            for i, url in enumerate(remaining, 1):
             
             # if i < 9:
                 # # Process URL
                 # demo_link = process_url(driver, url)
                 # all_demo_links.append(demo_link)
 
-                # Process URL with fresh driver
-                demo_links = process_single_url_with_fresh_driver(url, headless)
-                all_demo_links.append(demo_links)
+                # Process URL on a warm pooled driver
+                demo_links = process_url_with_pool(url, headless)
+                if demo_links is not None:
+                    record(url, demo_links)
                 
                 if interactive:
                     user_input = input(f"\nPress Enter to continue (or 'q' to quit): ").strip().lower()
                     if user_input == 'q':
                         break
-                
-                if i < len(urls):
-                    time.sleep(wait_time)
 
             # else: 
             #     break
 
         
         print("works")
-        # Output results
+            
+    except KeyboardInterrupt:
+        print("\nInterrupted, progress so far is kept in the journal.")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        close_driver_pool()
+        journal.close()
+        index.save()
+
+        for host, rate in rate_limiter.rates().items():
+            print(f"Final pacing for {host}: {rate:.2f} req/s")
+
+        # Output results, in input order, one URL per demo ID, from everything resolved so far
+        all_demo_links = index.work_list(urls)
         if all_demo_links:
             # print(all_demo_links)
             print(f"Extracted {len(all_demo_links)} demo links:")
@@ -214,13 +352,6 @@ def main():
             print(f"Demo links saved to 'all_match_download_url.txt'")
         else:
             print("No demo links found.")
-            
-    except KeyboardInterrupt:
-        pass
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        driver.quit()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
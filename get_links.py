@@ -2,19 +2,72 @@
 Made by Howie Lo
 The purpose of this file is to just grab all the ids in the esta dataset. This code is really meant to be used once so there is a lack of documentation and such.
 """
+import hashlib
 import json
 import lzma
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 import threading
 from collections import defaultdict
+from datetime import datetime, timezone
 
 # Thread-safe list to collect all match IDs
 all_match_ids = []
 match_ids_lock = threading.Lock()
 
+# Streaming scan settings. The tail keeps a partially read "hltvUrl" entry alive
+# across chunk boundaries; values longer than this are not expected (they are URLs).
+STREAM_CHUNK_SIZE: int = 1 << 20  # 1 MiB of decompressed data per read
+STREAM_TAIL_SIZE: int = 4096
+HLTV_URL_PATTERN = re.compile(rb'"hltvUrl"\s*:\s*(null|"(?:[^"\\]|\\.)*")')
+
+# Process-pool settings. Files are handed to worker processes in chunks to amortise
+# pickling/IPC, and only a bounded number of chunks are in flight at once.
+EXECUTORS: Tuple[str, ...] = ("thread", "process")
+MAX_CHUNK_SIZE: int = 16
+CHUNKS_IN_FLIGHT_PER_WORKER: int = 2
+
+# Incremental runs. The manifest remembers size, mtime and sha256 of every processed
+# file together with its hltvUrl values and the extraction mode (streaming or not, which
+# may yield different values), so unchanged files are never decoded twice in one mode.
+MANIFEST_FILE: str = "get_links_manifest.json"
+MANIFEST_VERSION: int = 1
+MANIFEST_SAVE_EVERY: int = 200  # files; bounds the work lost if a run is interrupted
+HASH_BLOCK_SIZE: int = 1 << 20
+
+# Metadata catalog. Candidate keys are tried in order; the first one present wins.
+CATALOG_FILE: str = "esta_catalog.sqlite"
+MAP_KEYS: Tuple[str, ...] = ("mapName", "map")
+DATE_KEYS: Tuple[str, ...] = ("matchDate", "date", "startTime")
+EVENT_KEYS: Tuple[str, ...] = ("eventName", "event")
+MATCH_ID_PATTERN = re.compile(r"/matches/(\d+)(?:/([^/?#]+))?")
+CATALOG_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS files (
+    source_file TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    source_file TEXT NOT NULL REFERENCES files(source_file) ON DELETE CASCADE,
+    hltv_url TEXT,
+    match_id INTEGER,
+    match_slug TEXT,
+    event_name TEXT,
+    map_name TEXT,
+    match_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_matches_match_id ON matches(match_id);
+CREATE INDEX IF NOT EXISTS idx_matches_hltv_url ON matches(hltv_url);
+CREATE INDEX IF NOT EXISTS idx_matches_source_file ON matches(source_file);
+CREATE INDEX IF NOT EXISTS idx_matches_event_name ON matches(event_name);
+CREATE INDEX IF NOT EXISTS idx_matches_map_name ON matches(map_name);
+CREATE INDEX IF NOT EXISTS idx_matches_match_date ON matches(match_date);
+"""
+
 def find_match_ids(data: Union[dict, list]) -> List[Any]:
     """Recursively search for all occurrences of 'hltvUrl' in the given JSON structure."""
     """hltv should just be 1 parameter in the json file lol. Oh well -Howie"""
@@ -34,21 +87,84 @@ def find_match_ids(data: Union[dict, list]) -> List[Any]:
     recursive_search(data)
     return match_ids
 
-def process_file(file_path: Path) -> List[str]:
+def find_first_value(data: Any, keys: Tuple[str, ...]) -> Any:
+    """Return the value of the first of keys found, checking the top level before recursing."""
+    if isinstance(data, dict):
+        for key in keys:
+            if data.get(key) is not None:
+                return data[key]
+        children = list(data.values())
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+
+    for child in children:
+        if isinstance(child, (dict, list)):
+            value = find_first_value(child, keys)
+            if value is not None:
+                return value
+    return None
+
+def normalize_date(value: Any) -> Optional[str]:
+    """Turn unix seconds/milliseconds or a date string into an ISO 8601 string."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+    return str(value)
+
+def stream_match_ids(file_path: Path, first_only: bool = True, chunk_size: int = STREAM_CHUNK_SIZE) -> List[Any]:
+    """Scan the decompressed byte stream for 'hltvUrl' values without loading the whole file.
+
+    Only chunk_size + STREAM_TAIL_SIZE bytes are held at a time, so memory does not grow
+    with the file. With first_only the scan stops at the first value found.
+    """
+    match_ids: List[Any] = []
+    buffer = b""
+
+    with lzma.open(file_path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            buffer += chunk
+
+            consumed = 0
+            for match in HLTV_URL_PATTERN.finditer(buffer):
+                match_ids.append(json.loads(match.group(1)))
+                consumed = match.end()
+                if first_only:
+                    return match_ids
+
+            if not chunk:
+                break
+
+            # Keep only the tail, in case a key/value pair is split across chunks
+            buffer = buffer[max(consumed, len(buffer) - STREAM_TAIL_SIZE):]
+
+    return match_ids
+
+def extract_match_ids(file_path: Path, streaming: bool = False) -> List[Any]:
+    """Extract match IDs from a single compressed file. Errors are left to the caller."""
+    if streaming:
+        # Scan the decompressed stream directly, stopping at the first hltvUrl
+        return stream_match_ids(file_path)
+
+    # Step 1: Decompress the .xz file
+    with lzma.open(file_path, "rt", encoding="utf-8") as file:
+        decompressed_data: str = file.read()
+
+    # Step 2: Load the JSON data
+    json_data: Any = json.loads(decompressed_data)
+
+    # Step 3: Find Match IDs
+    return find_match_ids(json_data)
+
+def process_file(file_path: Path, streaming: bool = False) -> List[str]:
     """Process a single compressed file and extract match IDs."""
     try:
         print(f"Processing: {file_path.name}")
-        
-        # Step 1: Decompress the .xz file
-        with lzma.open(file_path, "rt", encoding="utf-8") as file:
-            decompressed_data: str = file.read()
-        
-        # Step 2: Load the JSON data
-        json_data: Any = json.loads(decompressed_data)
-        
-        # Step 3: Find Match IDs
-        match_ids: List[Any] = find_match_ids(json_data)
-        
+        match_ids: List[Any] = extract_match_ids(file_path, streaming)
         print(f"Found {len(match_ids)} match IDs in {file_path.name}")
         return match_ids
         
@@ -56,8 +172,98 @@ def process_file(file_path: Path) -> List[str]:
         print(f"Error processing {file_path}: {e}")
         return []
 
-def process_files_in_directory(directory_path: str, max_workers: int = 4) -> List[str]:
-    """Process all .xz files in the directory using multithreading."""
+def file_sha256(file_path: Path) -> str:
+    """Hash the compressed file contents in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def process_file_with_hash(file_path: Path, streaming: bool = False) -> Optional[Tuple[List[str], str]]:
+    """Process a file and hash it in the same task. Returns None on failure so it is not cached."""
+    try:
+        print(f"Processing: {file_path.name}")
+        digest = file_sha256(file_path)
+        match_ids: List[Any] = extract_match_ids(file_path, streaming)
+        print(f"Found {len(match_ids)} match IDs in {file_path.name}")
+        return match_ids, digest
+
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return None
+
+def process_file_chunk(
+    file_paths: List[Path],
+    streaming: bool = False,
+    task: Callable[[Path, bool], Any] = process_file,
+) -> List[Tuple[Path, Any]]:
+    """Process a batch of files in one task. Module level so the process pool can pickle it."""
+    return [(file_path, task(file_path, streaming)) for file_path in file_paths]
+
+def iter_file_results(
+    xz_files: List[Path],
+    max_workers: Optional[int] = None,
+    executor: str = "thread",
+    streaming: bool = False,
+    task: Callable[[Path, bool], Any] = process_file,
+) -> Iterator[Tuple[Path, Any]]:
+    """Yield (file, task result) pairs as soon as each chunk of files completes.
+
+    task must be a module-level function when executor="process".
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
+
+    workers = max_workers or os.cpu_count() or 1
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+
+    # Threads share memory so one file per task is fine; processes get chunks small
+    # enough that every worker still sees several of them (keeps the tail balanced)
+    if executor == "process":
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, len(xz_files) // (workers * 4)))
+    else:
+        chunk_size = 1
+    chunks = [xz_files[i:i + chunk_size] for i in range(0, len(xz_files), chunk_size)]
+    max_in_flight = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+
+    with pool_class(max_workers=workers) as pool:
+        future_to_chunk: dict = {}
+        pending: Set[Future] = set()
+
+        def drain(done: Set[Future]) -> Iterator[Tuple[Path, Any]]:
+            for future in done:
+                chunk = future_to_chunk.pop(future)
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    print(f"Error processing chunk starting at {chunk[0]}: {e}")
+
+        for chunk in chunks:
+            future = pool.submit(process_file_chunk, chunk, streaming, task)
+            future_to_chunk[future] = chunk
+            pending.add(future)
+
+            # Bound the number of queued chunks and stream results back meanwhile
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from drain(done)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from drain(done)
+
+def process_files_in_directory(
+    directory_path: str,
+    max_workers: Optional[int] = None,
+    streaming: bool = False,
+    executor: str = "thread",
+) -> List[str]:
+    """Process all .xz files in the directory using a thread or process pool.
+
+    max_workers defaults to the number of CPU cores. Use executor="process" for the
+    CPU-bound LZMA/JSON work, which threads cannot parallelise under the GIL.
+    """
     directory = Path(directory_path)
     
     if not directory.exists():
@@ -75,23 +281,223 @@ def process_files_in_directory(directory_path: str, max_workers: int = 4) -> Lis
     
     all_urls = []
     
-    # Use ThreadPoolExecutor for multithreading
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all files for processing
-        future_to_file = {executor.submit(process_file, file_path): file_path 
-                         for file_path in xz_files}
-        
-        # Collect results as they complete
-        for future in as_completed(future_to_file):
-            file_path = future_to_file[future]
-            try:
-                match_ids = future.result()
-                all_urls.extend(match_ids)
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+    # Collect results as they complete
+    for file_path, match_ids in iter_file_results(xz_files, max_workers, executor, streaming):
+        all_urls.extend(match_ids)
     
     return all_urls
 
+def load_manifest(manifest_path: str = MANIFEST_FILE) -> Dict[str, Any]:
+    """Load the manifest, starting fresh if it is missing, unreadable or from another version."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        print(f"Manifest {manifest_path} has an old format, rebuilding it")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading manifest {manifest_path}: {e}")
+    return {"version": MANIFEST_VERSION, "directory": None, "files": {}}
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: str = MANIFEST_FILE) -> None:
+    """Write the manifest atomically so an interrupted save never corrupts it."""
+    tmp_path = f"{manifest_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    except Exception as e:
+        print(f"Error writing manifest {manifest_path}: {e}")
+
+def process_files_incremental(
+    directory_path: str,
+    manifest_path: str = MANIFEST_FILE,
+    max_workers: Optional[int] = None,
+    streaming: bool = False,
+    executor: str = "thread",
+) -> List[str]:
+    """Like process_files_in_directory, but only decodes files that are new or changed.
+
+    A file is reused from the manifest when its size and mtime are unchanged, or when
+    only its mtime changed and the sha256 still matches, and it was extracted in the same
+    streaming mode. Entries for deleted files are evicted. Returns the URLs of all current
+    files, cached and fresh, in path order.
+    """
+    directory = Path(directory_path)
+
+    if not directory.exists():
+        print(f"Directory {directory_path} does not exist.")
+        return []
+
+    manifest = load_manifest(manifest_path)
+    if manifest["directory"] != str(directory.resolve()):
+        # Keys are relative to the directory, so they mean nothing for another one
+        manifest = {"version": MANIFEST_VERSION, "directory": str(directory.resolve()), "files": {}}
+    cached: Dict[str, Any] = manifest["files"]
+
+    current: Dict[str, Any] = {}
+    stats: Dict[Path, os.stat_result] = {}
+    to_process: List[Path] = []
+
+    for file_path in sorted(directory.glob("*.xz")):
+        key = file_path.relative_to(directory).as_posix()
+        stat = file_path.stat()
+        entry = cached.get(key)
+
+        if entry and entry["size"] == stat.st_size and entry.get("streaming") == streaming:
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                current[key] = entry
+                continue
+            # Touched but possibly identical, a hash is far cheaper than a decode
+            try:
+                if file_sha256(file_path) == entry["sha256"]:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    current[key] = entry
+                    continue
+            except OSError as e:
+                print(f"Error hashing {file_path}: {e}")
+
+        stats[file_path] = stat
+        to_process.append(file_path)
+
+    evicted = len(set(cached) - set(current))
+    print(f"Manifest: {len(current)} unchanged, {len(to_process)} new or changed, {evicted} evicted")
+
+    manifest["files"] = current
+    processed = 0
+    for file_path, result in iter_file_results(to_process, max_workers, executor, streaming, process_file_with_hash):
+        if result is None:
+            continue
+        match_ids, digest = result
+        stat = stats[file_path]
+        current[file_path.relative_to(directory).as_posix()] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "urls": match_ids,
+            "streaming": streaming,
+        }
+        processed += 1
+        if processed % MANIFEST_SAVE_EVERY == 0:
+            save_manifest(manifest, manifest_path)
+
+    save_manifest(manifest, manifest_path)
+
+    all_urls: List[str] = []
+    for key in sorted(current):
+        all_urls.extend(current[key]["urls"])
+    return all_urls
+
+def process_file_metadata(file_path: Path, streaming: bool = False) -> Optional[Dict[str, Any]]:
+    """Decode a file once and pull out everything the catalog stores.
+
+    streaming is ignored: map and date need the parsed document, not just hltvUrl.
+    """
+    try:
+        print(f"Processing: {file_path.name}")
+        with lzma.open(file_path, "rt", encoding="utf-8") as file:
+            json_data: Any = json.load(file)
+
+        return {
+            "urls": find_match_ids(json_data),
+            "map_name": find_first_value(json_data, MAP_KEYS),
+            "match_date": normalize_date(find_first_value(json_data, DATE_KEYS)),
+            "event_name": find_first_value(json_data, EVENT_KEYS),
+        }
+
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return None
+
+def open_catalog(db_path: str = CATALOG_FILE) -> sqlite3.Connection:
+    """Open (and create if needed) the metadata catalog."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(CATALOG_SCHEMA)
+    return conn
+
+def build_catalog(
+    directory_path: str,
+    db_path: str = CATALOG_FILE,
+    max_workers: Optional[int] = None,
+    executor: str = "thread",
+) -> int:
+    """Index every .xz file in the directory into the SQLite catalog in one decode per file.
+
+    Files whose size and mtime match the catalog are skipped and rows for deleted files
+    are removed. Returns the number of files (re)indexed.
+    """
+    directory = Path(directory_path)
+
+    if not directory.exists():
+        print(f"Directory {directory_path} does not exist.")
+        return 0
+
+    conn = open_catalog(db_path)
+    try:
+        known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT source_file, size, mtime_ns FROM files")}
+
+        stats: Dict[Path, os.stat_result] = {}
+        to_process: List[Path] = []
+        for file_path in sorted(directory.glob("*.xz")):
+            stat = file_path.stat()
+            if known.pop(file_path.name, None) != (stat.st_size, stat.st_mtime_ns):
+                stats[file_path] = stat
+                to_process.append(file_path)
+
+        # Whatever is left in known no longer exists on disk
+        with conn:
+            conn.executemany("DELETE FROM files WHERE source_file = ?", [(name,) for name in known])
+        print(f"Catalog: {len(to_process)} file(s) to index, {len(known)} removed")
+
+        indexed = 0
+        for file_path, metadata in iter_file_results(to_process, max_workers, executor, False, process_file_metadata):
+            if metadata is None:
+                continue
+            stat = stats[file_path]
+            rows = []
+            for url in metadata["urls"] or [None]:
+                id_match = MATCH_ID_PATTERN.search(url) if isinstance(url, str) else None
+                rows.append((
+                    file_path.name,
+                    url,
+                    int(id_match.group(1)) if id_match else None,
+                    id_match.group(2) if id_match else None,
+                    metadata["event_name"],
+                    metadata["map_name"],
+                    metadata["match_date"],
+                ))
+
+            with conn:
+                conn.execute("DELETE FROM files WHERE source_file = ?", (file_path.name,))
+                conn.execute(
+                    "INSERT INTO files (source_file, size, mtime_ns) VALUES (?, ?, ?)",
+                    (file_path.name, stat.st_size, stat.st_mtime_ns),
+                )
+                conn.executemany(
+                    "INSERT INTO matches (source_file, hltv_url, match_id, match_slug, event_name, map_name, match_date)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            indexed += 1
+    finally:
+        conn.close()
+
+    return indexed
+
+def catalog_urls(db_path: str = CATALOG_FILE) -> List[str]:
+    """All hltvUrl values in the catalog, ordered by source file."""
+    conn = open_catalog(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT hltv_url FROM matches WHERE hltv_url IS NOT NULL ORDER BY source_file, rowid"
+        )]
+    finally:
+        conn.close()
+
 def write_urls_to_file(urls: List[str], output_file: str = "extracted_urls.txt") -> None:
     """Write all URLs to a single file."""
     try:
@@ -106,13 +512,19 @@ def main() -> None:
     """Main function to process all files and extract URLs."""
     # directory_path: str = "compressed_files"
     directory_path: str = "../esta/data/lan/"
+    # "urls" only extracts hltvUrl; "catalog" also indexes map/date/source file into CATALOG_FILE
+    mode: str = "urls"
 
     print(f"Current working directory: {os.getcwd()}")
     print(f"Target directory: {os.path.abspath(directory_path)}")
     
     # Process all files in the directory
-    print("Starting multithreaded processing...")
-    all_urls = process_files_in_directory(directory_path, max_workers=8)
+    print("Starting multiprocess processing...")
+    if mode == "catalog":
+        build_catalog(directory_path, executor="process")
+        all_urls = catalog_urls()
+    else:
+        all_urls = process_files_incremental(directory_path, streaming=True, executor="process")
     
     if all_urls:
         # Remove duplicates while preserving order
@@ -5,9 +5,11 @@ This script scrapes HLTV.org for international LAN CS2 events within a specified
 extracting all match result URLs for those events.
 
 Requirements:
+    - requests
     - selenium
     - beautifulsoup4
-    - ChromeDriver installed and in PATH
+    - ChromeDriver installed and in PATH (only used when HLTV serves a bot challenge,
+      or when ENGINE is set to "selenium")
 
 Output:
     A text file containing all unique match URLs found within the date range.
@@ -15,33 +17,53 @@ Output:
 
 import time
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Tuple, Set, Optional
+from typing import Dict, List, Tuple, Set, Optional
 
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
+
+import browser_pool
+import hltv_http
+from rate_limit import AdaptiveRateLimiter
 
 # ─────────── Configuration ─────────── #
 START_DATE: datetime = datetime(2025, 6, 1)
 END_DATE: datetime = datetime(2025, 6, 30)
-BASE: str = "https://www.hltv.org"
+BASE: str = hltv_http.BASE
 EVENTS_URL: str = f"{BASE}/events/archive?eventType=INTLLAN"
-REQUEST_DELAY: float = 1.0  # seconds
+ARCHIVE_PAGE_SIZE: int = 50  # events per archive page (HLTV "offset" step)
+ARCHIVE_PREFETCH: int = 3  # archive pages fetched ahead concurrently (HTTP engine only)
+ARCHIVE_MAX_PAGES: int = 500  # hard stop in case the archive never runs out
+REQUESTS_PER_SECOND: float = 1.0  # starting page loads per second, per host (adapted at runtime)
+MAX_REQUESTS_PER_SECOND: float = 4.0  # ceiling the adaptive pacing may ramp up to
+REQUEST_BURST: int = 3  # page loads allowed back to back before the rate applies
+CONCURRENT_EVENTS: int = 4  # events scraped in parallel (1 = one after another)
 OUTPUT_FILE: str = f"match_urls_{START_DATE.date()}_{END_DATE.date()}.txt"
+REUSE_DRIVER: bool = True  # keep one warm browser for the whole crawl
+MAX_PAGES_PER_DRIVER: int = 50  # recycle the browser after this many page loads
+PAGE_LOAD_RETRIES: int = 1  # relaunches allowed per page after a browser failure
+ENGINE: str = "http"  # "http" fetches pages directly; "selenium" always uses the browser
 
 # ─────────── Global WebDriver ─────────── #
 driver: Optional[webdriver.Chrome] = None
+pages_loaded: int = 0
+cookies_accepted: bool = False
+# The browser can only serve one caller at a time, even when events run in parallel
+driver_lock = threading.Lock()
+
+# ─────────── Shared rate limiter ─────────── #
+rate_limiter = AdaptiveRateLimiter(REQUESTS_PER_SECOND, REQUEST_BURST, max_rate=MAX_REQUESTS_PER_SECOND)
 
 
 def relaunch_driver() -> None:
     """
     Launches or restarts a Selenium Chrome WebDriver with appropriate options.
     """
-    global driver
+    global driver, pages_loaded, cookies_accepted
     try:
         if driver:
             driver.quit()
@@ -49,13 +71,68 @@ def relaunch_driver() -> None:
         pass
     time.sleep(1)
 
-    options = Options()
-    # options.add_argument("--headless") # Uncomment to run without GUI
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--log-level=3") # Suppress logs: INFO=0, WARNING=1, LOG_ERROR=2, LOG_FATAL=3
+    # No implicit wait: the cookie check below relies on its own explicit timeout
+    driver = browser_pool.create_driver(implicit_wait=0)
+    pages_loaded = 0
+    cookies_accepted = False
+
+
+def driver_is_healthy() -> bool:
+    """
+    Checks that the current driver still has a live browser behind it.
+
+    Returns:
+        bool: True if a trivial script round-trips successfully.
+    """
+    return driver is not None and browser_pool.is_healthy(driver)
+
+
+def get_driver() -> webdriver.Chrome:
+    """
+    Returns the shared driver, relaunching it only when needed.
+
+    A new browser is started when reuse is disabled, when the current one has
+    served MAX_PAGES_PER_DRIVER pages, or when it fails the health check.
+
+    Returns:
+        webdriver.Chrome: A ready-to-use driver.
+    """
+    if (
+        not REUSE_DRIVER
+        or driver is None
+        or pages_loaded >= MAX_PAGES_PER_DRIVER
+        or not driver_is_healthy()
+    ):
+        relaunch_driver()
+    return driver
 
-    driver = webdriver.Chrome(options=options)
+
+def load_page(url: str) -> None:
+    """
+    Navigates the shared driver to a URL, accepting cookies once per browser.
+
+    If the browser fails during navigation it is relaunched and the page is
+    retried, up to PAGE_LOAD_RETRIES times.
+
+    Args:
+        url (str): Page to load.
+    """
+    global pages_loaded, cookies_accepted
+    for attempt in range(PAGE_LOAD_RETRIES + 1):
+        get_driver()
+        try:
+            driver.get(url)
+        except WebDriverException:
+            if attempt == PAGE_LOAD_RETRIES:
+                raise
+            relaunch_driver()
+            continue
+
+        pages_loaded += 1
+        if not cookies_accepted:
+            accept_cookies()
+            cookies_accepted = True
+        return
 
 
 def accept_cookies(timeout: int = 5) -> None:
@@ -65,42 +142,58 @@ def accept_cookies(timeout: int = 5) -> None:
     Args:
         timeout (int): Maximum time to wait for cookie prompt.
     """
-    cookie_button_ids = [
-        "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll"
-    ]
+    browser_pool.accept_cookies(driver, timeout)
 
-    for btn_id in cookie_button_ids:
-        try:
-            btn = WebDriverWait(driver, timeout).until(
-                EC.element_to_be_clickable((By.ID, btn_id))
-            )
-            btn.click()
-            WebDriverWait(driver, timeout).until(
-                EC.invisibility_of_element((By.ID, btn_id))
-            )
-            return
-        except Exception:
-            continue
 
-
-def fetch_event_list(start: datetime, end: datetime) -> List[Tuple[str, str]]:
+def get_page_source(url: str, settle: float = 2.0) -> str:
     """
-    Fetches a list of HLTV event names and URLs that occurred within a given date range.
+    Returns the HTML of a page using the configured engine.
+
+    With the "http" engine the page is fetched over the shared keep-alive
+    session, and the browser is only used if HLTV answers with a bot challenge.
+    Fresh pages come from the shared on-disk cache; every real page load, by
+    either engine, first takes a token from the per-host rate limiter and then
+    reports whether HLTV throttled it, so the pacing adapts.
 
     Args:
-        start (datetime): Start date.
-        end (datetime): End date.
+        url (str): Page to fetch.
+        settle (float): Seconds to let the page settle when the browser is used.
 
     Returns:
-        List[Tuple[str, str]]: List of event name and URL tuples.
+        str: Page HTML.
     """
-    relaunch_driver()
-    driver.get(EVENTS_URL)
-    accept_cookies()
-    time.sleep(2)
+    if ENGINE == "http":
+        try:
+            return hltv_http.fetch_html(url, rate_limiter=rate_limiter)
+        except hltv_http.ChallengeError as e:
+            print(f"({e}, falling back to Selenium)", end=" ")
+    else:
+        cached = hltv_http.cached_html(url)
+        if cached is not None:
+            return cached
+
+    rate_limiter.acquire(url)
+    with driver_lock:
+        load_page(url)
+        time.sleep(settle)
+        html = driver.page_source
+    hltv_http.report_response(rate_limiter, url, 200, {}, html)
+    hltv_http.store_html(url, html)
+    return html
+
+
+def parse_archive_page(html: str) -> List[Tuple[str, str, datetime, datetime]]:
+    """
+    Parses every event listed on an events archive page.
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    events: List[Tuple[str, str]] = []
+    Args:
+        html (str): Archive page HTML.
+
+    Returns:
+        List[Tuple[str, str, datetime, datetime]]: Event name, URL, start and end.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    events: List[Tuple[str, str, datetime, datetime]] = []
 
     for ev in soup.select("a.small-event.standard-box"):
         link = BASE + ev["href"]
@@ -112,49 +205,105 @@ def fetch_event_list(start: datetime, end: datetime) -> List[Tuple[str, str]]:
 
         start_ts = datetime.fromtimestamp(int(spans[0]["data-unix"]) / 1000)
         end_ts = datetime.fromtimestamp(int(spans[1]["data-unix"]) / 1000)
+        events.append((name, link, start_ts, end_ts))
 
-        if end_ts < start or start_ts > end:
-            continue
+    return events
+
+
+def archive_page_url(page: int) -> str:
+    """
+    Builds the URL of an events archive page.
+
+    Args:
+        page (int): Zero-based page number.
+
+    Returns:
+        str: Archive URL with the matching offset.
+    """
+    return EVENTS_URL if page == 0 else f"{EVENTS_URL}&offset={page * ARCHIVE_PAGE_SIZE}"
 
-        events.append((name, link))
+
+def fetch_event_list(start: datetime, end: datetime) -> List[Tuple[str, str]]:
+    """
+    Fetches a list of HLTV event names and URLs that occurred within a given date range.
+
+    The archive is newest-first, so it is walked page by page until a page whose
+    events all ended before `start` (or an empty page). With the HTTP engine up
+    to ARCHIVE_PREFETCH pages are fetched ahead concurrently; pages beyond the
+    stopping point are cancelled or discarded.
+
+    Args:
+        start (datetime): Start date.
+        end (datetime): End date.
+
+    Returns:
+        List[Tuple[str, str]]: List of event name and URL tuples.
+    """
+    events: List[Tuple[str, str]] = []
+    seen: Set[str] = set()
+    # The Selenium engine shares one browser, so it can only load a page at a time
+    window = ARCHIVE_PREFETCH if ENGINE == "http" else 1
+
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        pending: Dict[int, Future] = {}
+        next_page = 0
+
+        for page in range(ARCHIVE_MAX_PAGES):
+            while next_page < ARCHIVE_MAX_PAGES and len(pending) < window:
+                pending[next_page] = pool.submit(get_page_source, archive_page_url(next_page), 2)
+                next_page += 1
+
+            page_events = parse_archive_page(pending.pop(page).result())
+
+            for name, link, start_ts, end_ts in page_events:
+                if end_ts < start or start_ts > end or link in seen:
+                    continue
+                seen.add(link)
+                events.append((name, link))
+
+            if not page_events or all(end_ts < start for *_, end_ts in page_events):
+                break
+        else:
+            print(f"Stopped after {ARCHIVE_MAX_PAGES} archive pages")
+
+        for future in pending.values():
+            future.cancel()
 
     return events
 
 
-def extract_match_urls(event_url: str) -> List[str]:
+def find_results_url(html: str, event_url: str) -> str:
     """
-    Extracts all match result URLs from an HLTV event.
+    Finds the results page link on an event page.
 
     Args:
-        event_url (str): URL to the HLTV event.
+        html (str): Event page HTML.
+        event_url (str): URL of the event page, used to build a fallback.
 
     Returns:
-        List[str]: Sorted list of unique match result URLs.
+        str: Results page URL.
     """
-    relaunch_driver()
-    driver.get(event_url)
-    accept_cookies()
-    time.sleep(1)
+    soup = BeautifulSoup(html, "html.parser")
+    result_link = soup.select_one("a.sidebar-single-line-item[href^='/results?event=']")
+    if result_link is not None:
+        href = result_link["href"]
+        return href if href.startswith("http") else BASE + href
 
-    # Attempt to find the event results page
-    try:
-        result_link = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "a.sidebar-single-line-item[href^='/results?event=']"))
-        )
-        href = result_link.get_attribute("href")
-        results_url = href if href.startswith("http") else BASE + href
-    except Exception:
-        event_id_match = re.search(r"/events/(\d+)/", event_url)
-        results_url = (
-            f"{BASE}/results?event={event_id_match.group(1)}" if event_id_match else event_url
-        )
+    event_id_match = re.search(r"/events/(\d+)/", event_url)
+    return f"{BASE}/results?event={event_id_match.group(1)}" if event_id_match else event_url
 
-    relaunch_driver()
-    driver.get(results_url)
-    accept_cookies()
-    time.sleep(2)
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+def parse_match_urls(html: str) -> List[str]:
+    """
+    Parses a results page into match URLs.
+
+    Args:
+        html (str): Results page HTML.
+
+    Returns:
+        List[str]: Sorted list of unique match result URLs.
+    """
+    soup = BeautifulSoup(html, "html.parser")
     match_urls: Set[str] = {
         BASE + a["href"]
         for a in soup.select(".results-holder a.a-reset[href^='/matches/']")
@@ -163,6 +312,22 @@ def extract_match_urls(event_url: str) -> List[str]:
     return sorted(match_urls)
 
 
+def extract_match_urls(event_url: str) -> List[str]:
+    """
+    Extracts all match result URLs from an HLTV event.
+
+    Args:
+        event_url (str): URL to the HLTV event.
+
+    Returns:
+        List[str]: Sorted list of unique match result URLs.
+    """
+    # Attempt to find the event results page
+    results_url = find_results_url(get_page_source(event_url, settle=1), event_url)
+
+    return parse_match_urls(get_page_source(results_url, settle=2))
+
+
 def main() -> None:
     """
     Main function to fetch events and extract all associated match URLs.
@@ -177,15 +342,27 @@ def main() -> None:
 
     all_matches: Set[str] = set()
 
-    for name, url in events:
-        print(f"→ Scraping matches for '{name}'…", end=" ")
-        try:
-            matches = extract_match_urls(url)
-            all_matches.update(matches)
-            print(f"{len(matches)} matches found")
-        except Exception as e:
-            print(f"Error: {e}")
-        time.sleep(REQUEST_DELAY)
+    if CONCURRENT_EVENTS > 1:
+        # Pacing comes from the shared rate limiter, so workers can overlap freely
+        with ThreadPoolExecutor(max_workers=CONCURRENT_EVENTS) as pool:
+            future_to_name = {pool.submit(extract_match_urls, url): name for name, url in events}
+            for future in as_completed(future_to_name):
+                name = future_to_name[future]
+                try:
+                    matches = future.result()
+                    all_matches.update(matches)
+                    print(f"→ '{name}': {len(matches)} matches found")
+                except Exception as e:
+                    print(f"→ '{name}': Error: {e}")
+    else:
+        for name, url in events:
+            print(f"→ Scraping matches for '{name}'…", end=" ")
+            try:
+                matches = extract_match_urls(url)
+                all_matches.update(matches)
+                print(f"{len(matches)} matches found")
+            except Exception as e:
+                print(f"Error: {e}")
 
     sorted_matches = sorted(all_matches)
     print(f"\nTotal unique CS2 LAN matches found: {len(sorted_matches)}")
@@ -194,6 +371,9 @@ def main() -> None:
         for match_url in sorted_matches:
             f.write(match_url + "\n")
 
+    for host, rate in rate_limiter.rates().items():
+        print(f"Final pacing for {host}: {rate:.2f} req/s")
+
     if driver:
         driver.quit()
 
@@ -0,0 +1,243 @@
+"""
+Shared HTTP access to HLTV.org
+
+Most HLTV pages we scrape are server-rendered, so a plain HTTP client is enough
+to read them. This module holds one pooled keep-alive requests session, the
+shared on-disk page cache (see http_cache) and the bot-challenge detection the
+scrapers use to decide when they have to fall back to a real browser. Every
+response is also reported to the caller's rate limiter, so an
+AdaptiveRateLimiter can pace requests to what HLTV currently tolerates.
+
+Requirements:
+    - requests
+"""
+
+import threading
+from typing import Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HTTPCache
+from rate_limit import HostRateLimiter, parse_retry_after
+
+# ─────────── Configuration ─────────── #
+BASE: str = "https://www.hltv.org"
+USER_AGENT: str = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+TIMEOUT: float = 15.0  # seconds, per connect/read
+POOL_CONNECTIONS: int = 4  # distinct hosts kept in the pool
+POOL_MAXSIZE: int = 16  # keep-alive connections per host
+CACHE_ENABLED: bool = True  # serve/revalidate pages from the on-disk cache
+THROTTLE_RETRIES: int = 3  # retries of a plain 429 once the limiter has backed off
+
+# Cloudflare answers with one of these statuses and an interstitial page. Only
+# markers specific to the interstitial: normal pages behind Cloudflare load
+# scripts from /cdn-cgi/challenge-platform/ too.
+CHALLENGE_STATUSES = {403, 429, 503}
+CHALLENGE_MARKERS = (
+    "cf-chl",
+    "cf_chl_opt",
+    'id="challenge-form"',
+    "<title>Just a moment...</title>",
+    "Attention Required! | Cloudflare",
+)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_cache: Optional[HTTPCache] = None
+
+
+class ChallengeError(Exception):
+    """
+    Raised when HLTV serves a bot challenge instead of the requested page.
+    """
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"Bot challenge (HTTP {status}) for {url}")
+        self.url = url
+        self.status = status
+
+
+class ThrottledError(Exception):
+    """
+    Raised when HLTV keeps answering 429 Too Many Requests.
+    """
+
+    def __init__(self, url: str, retry_after: Optional[float] = None):
+        super().__init__(f"Throttled (HTTP 429) for {url}")
+        self.url = url
+        self.retry_after = retry_after
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared keep-alive session, creating it on first use.
+
+    Returns:
+        requests.Session: Session with browser-like headers and a connection pool.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_cache() -> Optional[HTTPCache]:
+    """
+    Returns the shared page cache, or None when caching is disabled.
+
+    Returns:
+        Optional[HTTPCache]: The cache, created on first use.
+    """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _session_lock:
+        if _cache is None:
+            _cache = HTTPCache()
+        return _cache
+
+
+def cached_html(url: str) -> Optional[str]:
+    """
+    Returns a page from the cache if it is still fresh, without any network traffic.
+
+    Args:
+        url (str): Page URL.
+
+    Returns:
+        Optional[str]: Cached HTML, or None on a miss or stale entry.
+    """
+    cache = get_cache()
+    entry = cache.get(url) if cache else None
+    return entry.body if entry is not None and entry.fresh else None
+
+
+def store_html(url: str, html: str) -> None:
+    """
+    Adds a page obtained some other way (e.g. through Selenium) to the cache.
+
+    Args:
+        url (str): Page URL.
+        html (str): Page HTML.
+    """
+    cache = get_cache()
+    if cache is not None and not looks_like_challenge(200, html):
+        cache.put(url, html, {})
+
+
+def looks_like_challenge(status: int, text: str) -> bool:
+    """
+    Heuristically detects a Cloudflare challenge or block page.
+
+    Args:
+        status (int): HTTP status code.
+        text (str): Response body (only the start is inspected).
+
+    Returns:
+        bool: True if the response is a challenge rather than real content.
+    """
+    head = text[:20000]
+    if any(marker in head for marker in CHALLENGE_MARKERS):
+        return True
+    return status in CHALLENGE_STATUSES and "cloudflare" in head.lower()
+
+
+def report_response(
+    rate_limiter: Optional[HostRateLimiter],
+    url: str,
+    status: int,
+    headers: Mapping[str, str],
+    text: str,
+) -> bool:
+    """
+    Tells the rate limiter whether a response was clean or throttled.
+
+    A 429, a Retry-After header on an error status, or a challenge page counts as
+    throttling; anything else is a clean response.
+
+    Args:
+        rate_limiter (Optional[HostRateLimiter]): Limiter to inform (nothing happens if None).
+        url (str): Request URL.
+        status (int): HTTP status code (200 for pages read through Selenium).
+        headers (Mapping[str, str]): Response headers.
+        text (str): Response body, or at least its start.
+
+    Returns:
+        bool: True if the response was throttled.
+    """
+    retry_after = parse_retry_after(headers.get("Retry-After")) if status >= 400 else None
+    throttled = status == 429 or retry_after is not None or looks_like_challenge(status, text)
+    if rate_limiter is not None:
+        if throttled:
+            rate_limiter.throttled(url, retry_after)
+        else:
+            rate_limiter.succeeded(url)
+    return throttled
+
+
+def fetch_html(url: str, timeout: float = TIMEOUT, rate_limiter: Optional[HostRateLimiter] = None) -> str:
+    """
+    Fetches a page, going through the on-disk cache.
+
+    Fresh cache hits cost no request at all. Stale entries with an ETag or
+    Last-Modified are revalidated with a conditional GET; a 304 keeps the
+    cached body. A plain 429 is retried up to THROTTLE_RETRIES times after the
+    rate limiter has backed off.
+
+    Args:
+        url (str): Page URL.
+        timeout (float): Connect/read timeout in seconds.
+        rate_limiter (Optional[HostRateLimiter]): Consulted only when a request is actually sent,
+            and told about every response.
+
+    Returns:
+        str: Page HTML.
+
+    Raises:
+        ChallengeError: If HLTV answered with a bot challenge.
+        ThrottledError: If HLTV still answered 429 after all retries.
+        requests.RequestException: On network errors or other HTTP errors.
+    """
+    cache = get_cache()
+    entry = cache.get(url) if cache else None
+    if entry is not None and entry.fresh:
+        return entry.body
+
+    headers = entry.validators() if entry is not None else {}
+    for attempt in range(THROTTLE_RETRIES + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire(url)
+        response = get_session().get(url, headers=headers, timeout=timeout)
+
+        if entry is not None and response.status_code == 304:
+            report_response(rate_limiter, url, 304, response.headers, "")
+            cache.revalidated(entry, response.headers)
+            return entry.body
+
+        report_response(rate_limiter, url, response.status_code, response.headers, response.text)
+        if looks_like_challenge(response.status_code, response.text):
+            raise ChallengeError(url, response.status_code)
+        if response.status_code != 429:
+            break
+        if rate_limiter is None or attempt == THROTTLE_RETRIES:
+            raise ThrottledError(url, parse_retry_after(response.headers.get("Retry-After")))
+    response.raise_for_status()
+
+    if cache is not None:
+        cache.put(url, response.text, response.headers)
+    return response.text
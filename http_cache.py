@@ -0,0 +1,231 @@
+"""
+On-disk HTTP response cache for HLTV pages
+
+Pages are stored one file per URL (body + small JSON metadata) so several
+scripts can share the cache directory at the same time. Freshness is decided
+per URL class: match pages with their demo link never change again and are
+kept effectively forever, while the events archive goes stale within minutes.
+Stale entries that carry an ETag or Last-Modified header are revalidated with
+a conditional request instead of being downloaded again. The cache is bounded
+in size and evicts least-recently-used entries.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Pattern, Tuple
+
+# ─────────── Configuration ─────────── #
+CACHE_DIR: str = ".hltv_cache"
+MAX_CACHE_BYTES: int = 512 * 1024 * 1024
+FOREVER: float = 365 * 24 * 3600.0
+
+# First matching pattern wins; TTLs are in seconds
+TTL_RULES: List[Tuple[Pattern[str], float]] = [
+    (re.compile(r"/events/archive"), 15 * 60.0),
+    (re.compile(r"/results\?"), 6 * 3600.0),
+    (re.compile(r"/events/\d+"), 6 * 3600.0),
+    (re.compile(r"/matches/\d+"), 10 * 60.0),  # upgraded once the match is over, see below
+]
+DEFAULT_TTL: float = 3600.0
+DEMO_MARKER = "data-demo-link"  # the demo is uploaded, the page is final: FOREVER
+MATCH_OVER_MARKER = ">Match over<"
+MATCH_OVER_TTL: float = 3 * 3600.0  # over but no demo yet, HLTV often uploads it hours later
+
+
+def ttl_for(url: str, body: str) -> float:
+    """
+    Picks the time-to-live for a page.
+
+    Args:
+        url (str): Page URL.
+        body (str): Page HTML, used to recognise finished matches.
+
+    Returns:
+        float: Seconds the page stays fresh.
+    """
+    if "/matches/" in url:
+        if DEMO_MARKER in body:
+            return FOREVER
+        if MATCH_OVER_MARKER in body:
+            return MATCH_OVER_TTL
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+
+class CacheEntry:
+    """
+    A cached page and its metadata.
+    """
+
+    def __init__(self, url: str, body: str, meta: Dict[str, Any]):
+        self.url = url
+        self.body = body
+        self.meta = meta
+
+    @property
+    def fresh(self) -> bool:
+        """
+        True while the entry is within its TTL.
+        """
+        return time.time() < self.meta["expires_at"]
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Builds conditional request headers from the stored ETag/Last-Modified.
+
+        Returns:
+            Dict[str, str]: Headers for a revalidation request (possibly empty).
+        """
+        headers: Dict[str, str] = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+
+class HTTPCache:
+    """
+    Size-bounded LRU cache of page bodies keyed by URL.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".html", base + ".json"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Looks a URL up, fresh or stale, and marks it as recently used.
+
+        Args:
+            url (str): Page URL.
+
+        Returns:
+            Optional[CacheEntry]: The entry, or None if the URL is not cached.
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "r", encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("url") != url:
+            return None
+
+        try:
+            # The metadata file's mtime doubles as the LRU timestamp
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return CacheEntry(url, body, meta)
+
+    def put(self, url: str, body: str, headers: Mapping[str, str]) -> None:
+        """
+        Stores a page with a TTL chosen from its URL class.
+
+        Args:
+            url (str): Page URL.
+            body (str): Page HTML.
+            headers (Mapping[str, str]): Response headers (for ETag/Last-Modified).
+        """
+        body_path, meta_path = self._paths(url)
+        now = time.time()
+        meta = {
+            "url": url,
+            "stored_at": now,
+            "expires_at": now + ttl_for(url, body),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "size": len(body.encode("utf-8")),
+        }
+
+        with self._lock:
+            old_size = self._entry_size(meta_path)
+            self._write_atomic(body_path, body)
+            self._write_atomic(meta_path, json.dumps(meta))
+            if self._size is not None:
+                self._size += meta["size"] - old_size
+            self._evict_if_needed()
+
+    def revalidated(self, entry: CacheEntry, headers: Mapping[str, str]) -> None:
+        """
+        Extends a stale entry's lifetime after a 304 Not Modified.
+
+        Args:
+            entry (CacheEntry): The entry that was revalidated.
+            headers (Mapping[str, str]): Headers of the 304 response.
+        """
+        now = time.time()
+        entry.meta["expires_at"] = now + ttl_for(entry.url, entry.body)
+        entry.meta["etag"] = headers.get("ETag") or entry.meta.get("etag")
+        entry.meta["last_modified"] = headers.get("Last-Modified") or entry.meta.get("last_modified")
+        _, meta_path = self._paths(entry.url)
+        with self._lock:
+            self._write_atomic(meta_path, json.dumps(entry.meta))
+
+    @staticmethod
+    def _write_atomic(path: str, text: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _entry_size(meta_path: str) -> int:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return int(json.load(f).get("size", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def _evict_if_needed(self) -> None:
+        """
+        Drops least-recently-used entries until the cache fits in max_bytes.
+        Must be called with the lock held.
+        """
+        if self._size is not None and self._size <= self.max_bytes:
+            return
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            body_path = meta_path[:-len(".json")] + ".html"
+            try:
+                size = os.path.getsize(body_path)
+                entries.append((os.path.getmtime(meta_path), size, body_path, meta_path))
+                total += size
+            except OSError:
+                continue
+
+        entries.sort()
+        for _, size, body_path, meta_path in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+        self._size = total
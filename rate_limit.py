@@ -0,0 +1,297 @@
+"""
+Request rate limiting shared by the HLTV scrapers
+
+A thread-safe token bucket, plus a small registry that keeps one bucket per
+host so concurrent workers hitting the same site share a single budget.
+AdaptiveRateLimiter additionally steers each host's rate from response
+feedback (AIMD): throttling halves the rate and honours Retry-After, clean
+responses add to it again a little at a time.
+"""
+
+import email.utils
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second and up to `burst` of them can
+    be banked, so short bursts go through immediately while the long-run average
+    stays at `rate`.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self._rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """
+        Current refill rate in tokens per second.
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = max(float(value), 1e-6)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        # No tokens accrue while paused
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.burst, self._tokens + (now - start) * self._rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """
+        Empties the bucket and blocks all acquisitions for `seconds`.
+
+        Args:
+            seconds (float): Pause length; a shorter pause never cuts an existing one.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Blocks until `tokens` are available and takes them.
+
+        Requests larger than the burst size are taken in burst-sized pieces.
+
+        Args:
+            tokens (float): Number of tokens to take.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        remaining = float(tokens)
+        while remaining > 0:
+            piece = min(remaining, self.burst)
+            with self._lock:
+                self._refill()
+                paused = self._paused_until - time.monotonic()
+                if paused <= 0 and self._tokens >= piece:
+                    self._tokens -= piece
+                    remaining -= piece
+                    continue
+                delay = max(paused, 0.0) + max(piece - self._tokens, 0.0) / self._rate
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+
+class HostRateLimiter:
+    """
+    Keeps one TokenBucket per host, created on first use.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        overrides: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        """
+        Args:
+            rate (float): Default requests per second per host.
+            burst (float): Default burst size per host.
+            overrides (Optional[Dict[str, Tuple[float, float]]]): (rate, burst) for specific hosts.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        """
+        Returns the bucket for a host.
+
+        Args:
+            host (str): Host name, e.g. "www.hltv.org".
+
+        Returns:
+            TokenBucket: The shared bucket for that host.
+        """
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.overrides.get(host, (self.rate, self.burst))
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> float:
+        """
+        Waits for permission to send one request to the URL's host.
+
+        Args:
+            url (str): Request URL.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        return self.bucket(urlparse(url).netloc).acquire()
+
+    def succeeded(self, url: str) -> None:
+        """
+        Feedback hook: a request to the URL's host got a clean response. No-op here.
+        """
+
+    def throttled(self, url: str, retry_after: Optional[float] = None) -> None:
+        """
+        Feedback hook: the URL's host throttled a request. Honours Retry-After only.
+
+        Args:
+            url (str): Request URL.
+            retry_after (Optional[float]): Seconds the server asked us to wait.
+        """
+        if retry_after:
+            self.bucket(urlparse(url).netloc).pause(retry_after)
+
+    def current_rate(self, url_or_host: str) -> float:
+        """
+        Current requests per second for a host.
+
+        Args:
+            url_or_host (str): A URL or bare host name.
+
+        Returns:
+            float: The host bucket's refill rate.
+        """
+        host = urlparse(url_or_host).netloc or url_or_host
+        return self.bucket(host).rate
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """
+    HostRateLimiter whose per-host rates follow AIMD feedback.
+
+    Every throttled response (429, Retry-After, challenge page) multiplies the
+    host's rate by `decrease` and pauses the host for Retry-After (or
+    `min_pause`). Every clean response adds `increase` requests per second, up
+    to `max_rate`. Once close to the rate that last got throttled, increases
+    shrink to a quarter, so the sustained rate settles just under the
+    threshold instead of repeatedly overshooting it.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        overrides: Optional[Dict[str, Tuple[float, float]]] = None,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        min_pause: float = 5.0,
+        cooldown: float = 2.0,
+    ):
+        """
+        Args:
+            rate (float): Starting requests per second per host.
+            burst (float): Burst size per host.
+            overrides (Optional[Dict[str, Tuple[float, float]]]): Starting (rate, burst) for specific hosts.
+            min_rate (float): Floor for backed-off rates.
+            max_rate (float): Ceiling for ramped-up rates.
+            increase (float): Requests per second added per clean response.
+            decrease (float): Factor applied to the rate when throttled.
+            min_pause (float): Pause after throttling when no Retry-After was given.
+            cooldown (float): Seconds after a decrease in which further throttles (from
+                requests already in flight) do not decrease the rate again.
+        """
+        super().__init__(rate, burst, overrides)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.min_pause = min_pause
+        self.cooldown = cooldown
+        self._throttled_at: Dict[str, float] = {}
+        self._throttle_rate: Dict[str, float] = {}
+
+    def succeeded(self, url: str) -> None:
+        """
+        Additively increases the host's rate after a clean response.
+
+        Args:
+            url (str): Request URL.
+        """
+        host = urlparse(url).netloc
+        bucket = self.bucket(host)
+        with self._lock:
+            ceiling = self._throttle_rate.get(host)
+            step = self.increase
+            if ceiling is not None and bucket.rate >= 0.9 * ceiling:
+                step /= 4
+            new_rate = min(self.max_rate, bucket.rate + step)
+        if new_rate != bucket.rate:
+            bucket.rate = new_rate
+
+    def throttled(self, url: str, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicatively decreases the host's rate and pauses it.
+
+        Args:
+            url (str): Request URL.
+            retry_after (Optional[float]): Seconds the server asked us to wait.
+        """
+        host = urlparse(url).netloc
+        bucket = self.bucket(host)
+        now = time.monotonic()
+        with self._lock:
+            recent = now - self._throttled_at.get(host, float("-inf")) < self.cooldown
+            if not recent:
+                self._throttled_at[host] = now
+                self._throttle_rate[host] = bucket.rate
+        if not recent:
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+            print(f"[pacing] {host} throttled, rate lowered to {bucket.rate:.2f} req/s")
+        bucket.pause(retry_after if retry_after is not None else self.min_pause)
+
+    def rates(self) -> Dict[str, float]:
+        """
+        Current rate of every host seen so far.
+
+        Returns:
+            Dict[str, float]: Requests per second by host.
+        """
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.rate for host, bucket in buckets.items()}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        value (Optional[str]): Header value.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import download_watch
+from demo_store import DemoStore
+
+
+@pytest.fixture(params=["inotify", "scan"])
+def tracker(request, tmp_path, monkeypatch):
+    # watchdog is preferred when installed; these tests cover the built-in backends
+    monkeypatch.setitem(sys.modules, "watchdog.events", None)
+    if request.param == "scan":
+        monkeypatch.setattr(download_watch, "_inotify_watch", lambda directory: None)
+    elif not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    tracker = download_watch.DownloadTracker(str(tmp_path / "downloads"))
+    assert tracker.backend == request.param
+    yield tracker
+    tracker.close()
+
+
+def write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_dedup_links_are_not_taken_for_browser_downloads(tmp_path, tracker):
+    store = DemoStore(str(tmp_path / "store"))
+    downloads = tmp_path / "downloads"
+    first = write(downloads / "first.rar", b"demo")
+    second = write(downloads / "second.rar", b"demo")
+    store.add(first, 1)
+
+    # A browser download is pending while a finished one is deduplicated in the same directory
+    ticket = tracker.expect("https://www.hltv.org/download/demo/2")
+    store.add(second, 2)
+    assert os.path.samefile(first, second)
+    assert tracker.wait_any([ticket], 1.0) == []
+
+    os.rename(write(downloads / "third.rar.crdownload", b"other"), downloads / "third.rar")
+    assert tracker.wait(ticket, timeout=5.0) == str(downloads / "third.rar")
+    store.close()
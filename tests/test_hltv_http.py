@@ -0,0 +1,155 @@
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import get_match_urls
+import hltv_http
+from http_cache import HTTPCache
+from hltv_http import looks_like_challenge
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class StubLimiter:
+    """
+    Records what fetch_html tells the rate limiter, without pacing anything.
+    """
+
+    def __init__(self):
+        self.acquired = 0
+        self.throttles = []
+        self.successes = 0
+
+    def acquire(self, url):
+        self.acquired += 1
+        return 0.0
+
+    def throttled(self, url, retry_after=None):
+        self.throttles.append(retry_after)
+
+    def succeeded(self, url):
+        self.successes += 1
+
+
+class Server:
+    """
+    Local HTTP server answering each path with a scripted list of (status, headers, body).
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                script = server.responses[self.path]
+                status, headers, body = script.pop(0) if len(script) > 1 else script[0]
+                data = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = HTTPCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(hltv_http, "_cache", cache)
+    return cache
+
+
+def test_challenge_page_is_detected():
+    page = read_fixture("cloudflare_challenge.html")
+    assert looks_like_challenge(403, page)
+    assert looks_like_challenge(200, page)
+
+
+def test_normal_page_with_cloudflare_scripts_is_not_a_challenge():
+    page = read_fixture("hltv_match.html")
+    assert "/cdn-cgi/challenge-platform/" in page
+    assert not looks_like_challenge(200, page)
+
+
+def test_fetch_html_returns_and_caches_the_page(server):
+    page = read_fixture("hltv_match.html")
+    server.responses["/events/123/x"] = [(200, {}, page)]
+    limiter = StubLimiter()
+
+    assert hltv_http.fetch_html(server.url("/events/123/x"), rate_limiter=limiter) == page
+    assert hltv_http.fetch_html(server.url("/events/123/x"), rate_limiter=limiter) == page
+    # The second call is a fresh cache hit: no request, no token
+    assert server.requests == ["/events/123/x"]
+    assert limiter.acquired == 1 and limiter.successes == 1
+
+
+def test_fetch_html_retries_a_429_after_the_limiter_backed_off(server):
+    server.responses["/results?offset=0"] = [(429, {"Retry-After": "7"}, ""), (200, {}, "<html>results</html>")]
+    limiter = StubLimiter()
+
+    assert hltv_http.fetch_html(server.url("/results?offset=0"), rate_limiter=limiter) == "<html>results</html>"
+    assert limiter.throttles == [7.0]
+    assert limiter.acquired == 2 and limiter.successes == 1
+
+
+def test_fetch_html_raises_throttled_error_with_retry_after(server):
+    server.responses["/results?offset=50"] = [(429, {"Retry-After": "30"}, "")]
+
+    with pytest.raises(hltv_http.ThrottledError) as error:
+        hltv_http.fetch_html(server.url("/results?offset=50"))
+    assert error.value.retry_after == 30.0
+    assert len(server.requests) == 1
+
+
+def test_challenge_falls_back_to_selenium(server, monkeypatch):
+    server.responses["/events/archive?eventType=INTLLAN"] = [(403, {}, read_fixture("cloudflare_challenge.html"))]
+    url = server.url("/events/archive?eventType=INTLLAN")
+    rendered = "<html>archive rendered by Chrome</html>"
+    loaded = []
+
+    class FakeDriver:
+        page_source = rendered
+
+    def load_page(page_url):
+        loaded.append(page_url)
+        monkeypatch.setattr(get_match_urls, "driver", FakeDriver())
+
+    monkeypatch.setattr(get_match_urls, "ENGINE", "http")
+    monkeypatch.setattr(get_match_urls, "rate_limiter", StubLimiter())
+    monkeypatch.setattr(get_match_urls, "load_page", load_page)
+
+    assert get_match_urls.get_page_source(url, settle=0) == rendered
+    assert loaded == [url]
+    assert server.requests == ["/events/archive?eventType=INTLLAN"]
+    # The browser's page is cached, the challenge is not
+    assert hltv_http.cached_html(url) == rendered